@@ -6,37 +6,200 @@ This tool provides administrative capabilities for managing the PartiVotes Mongo
 including backup, restore, listing polls, and deleting polls.
 """
 
+# Heavy third-party modules (pymongo, bson, tabulate, dotenv) and rarely used
+# stdlib modules (csv) are imported inside the functions that need them, so
+# commands such as `help`, `list-backups` and `verify` start in milliseconds.
 import os
 import sys
 import json
 import argparse
 import datetime
-import time
-import curses
-import csv
-import shutil
-from pymongo import MongoClient
-from bson import ObjectId
-from dotenv import load_dotenv
-from tabulate import tabulate
-
-# Load environment variables from .env file
-load_dotenv()
-
-# MongoDB connection settings
-MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017/partivotes")
-MONGODB_USER = os.getenv("MONGODB_USER")
-MONGODB_PASS = os.getenv("MONGODB_PASS")
+
+# MongoDB connection settings (populated from the environment / .env file by load_settings)
+MONGODB_URI = None
+MONGODB_USER = None
+MONGODB_PASS = None
+
+# Optional offsite backup sink on S3-compatible storage (AWS S3, MinIO, ...); credentials
+# come from the usual AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY environment variables
+OFFSITE_S3_BUCKET = None
+OFFSITE_S3_PREFIX = None
+OFFSITE_S3_ENDPOINT = None
+_SETTINGS_LOADED = False
 
 # Backup directory
 BACKUP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backups")
 
-# Maximum number of backups to keep (for rotation)
-MAX_BACKUPS = 10
+# Backup catalog: metadata recorded for each backup at creation time, so listing and
+# rotation never have to scan the backup directory (until the first backup writes it,
+# older backups are found by scanning)
+BACKUP_CATALOG = os.path.join(BACKUP_DIR, "catalog.json")
+
+# Offsite multipart uploads: part size (S3 minimum is 5 MB), parallel part uploads,
+# and the file tracking unfinished uploads so they can be resumed
+OFFSITE_PART_SIZE = 16 * 1024 * 1024
+OFFSITE_CONCURRENCY = 4
+OFFSITE_UPLOADS_FILE = os.path.join(BACKUP_DIR, "offsite_uploads.json")
+
+# Time-tiered retention: the newest backup of each of the most recent N hours, days,
+# ISO weeks and months is kept (the newest backup overall is always kept)
+RETENTION_POLICY = {"hourly": 24, "daily": 7, "weekly": 4, "monthly": 12}
+
+# Collections stored in a backup file, in file order
+BACKUP_SECTIONS = ["polls", "votes"]
+
+# Document order within each backup section; votes are grouped by poll so that a
+# single poll's votes form one contiguous byte range
+BACKUP_ORDER = {"polls": ["_id"], "votes": ["pollId", "_id"]}
+
+# Fields stored as BSON dates, which a JSON backup holds as ISO strings
+BACKUP_DATE_FIELDS = {"polls": ["startDate", "endDate", "createdAt", "updatedAt"], "votes": ["timestamp"]}
+
+# Documents per insert_many when restoring a backup
+RESTORE_BATCH_SIZE = 1000
+
+# A restore is loaded into <collection><suffix> and renamed over the live collection
+# only once the whole backup has been read and its checksum checked
+RESTORE_STAGING_SUFFIX = "_restore"
+
+# Seekable backup index (<backup>.idx): a header followed by fixed-size records sorted
+# by poll ObjectId: poll id, poll offset, poll length, votes offset, votes length
+BACKUP_INDEX_MAGIC = b"PVIDX001"
+BACKUP_INDEX_RECORD = "<12sQIQQ"
+
+# Documents sorted in memory per run when a backup has to be sorted externally
+DIFF_RUN_SIZE = 100000
+
+# Continuous (change stream) backup: base snapshots, rolling segments and resume state
+TAIL_DIR = os.path.join(BACKUP_DIR, "tail")
+TAIL_STATE_FILE = os.path.join(TAIL_DIR, "state.json")
+
+# Rotate a tail segment once it holds this many uncompressed bytes or is this old
+TAIL_SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+TAIL_SEGMENT_MAX_SECONDS = 3600
+
+# Change events buffered before a segment write (bounds memory under vote bursts)
+TAIL_BATCH_SIZE = 500
+
+# Maximum time events wait in the buffer before being written
+TAIL_FLUSH_SECONDS = 1.0
+
+# Votes newer than this are left for the next rollup run, since client-generated
+# ObjectIds can reach the server slightly out of order
+ROLLUP_SAFETY_LAG_SECONDS = 60
+
+# Aggregation expression for the options a vote selected: single-choice votes
+# carry `option`, multiple/ranked-choice votes carry `options`
+VOTE_SELECTIONS = {"$cond": [
+    {"$gt": [{"$size": {"$ifNull": ["$options", []]}}, 0]},
+    "$options",
+    {"$cond": [{"$ifNull": ["$option", False]}, ["$option"], []]}
+]}
+
+# SQLite export: rows per executemany batch, and rows per transaction
+SQLITE_BATCH_SIZE = 10000
+SQLITE_COMMIT_EVERY = 500000
+
+# Static poll snapshots for nginx (see nginx-config.txt): output directory, polls
+# re-rendered per batch, and the state file recording what has been published
+PUBLISH_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "snapshots")
+PUBLISH_BATCH_SIZE = 500
+PUBLISH_STATE_FILE = ".publish_state.json"
+
+# Schema-normalization migration: polls per batch and pause between batches
+MIGRATION_BATCH_SIZE = 200
+MIGRATION_PAUSE_MS = 100
+
+# Granularities maintained in the vote_rollups collection
+ROLLUP_GRANULARITIES = ["hour", "day"]
+
+# Compound indexes recommended for the query shapes this tool (and the API) issue
+RECOMMENDED_INDEXES = {
+    "polls": [
+        [("status", 1), ("type", 1), ("createdAt", -1)],
+        [("createdAt", -1)],
+        [("status", 1), ("endDate", 1)]
+    ],
+    "votes": [
+        [("pollId", 1), ("voter", 1)],
+        # Backup order (BACKUP_ORDER)
+        [("pollId", 1), ("_id", 1)]
+    ]
+}
+
+# Burst anomaly detection: this many votes on one poll from voters sharing an
+# address prefix within the window are reported as a burst
+BURST_PREFIX_LENGTH = 10
+BURST_WINDOW_SECONDS = 10
+BURST_THRESHOLD = 5
 
 # Export directory
 EXPORT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "exports")
 
+# Cold-storage archive directory for ENDED polls (one compressed file per poll plus an index)
+ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "archives")
+ARCHIVE_INDEX = os.path.join(ARCHIVE_DIR, "index.jsonl")
+
+# Number of polls archived between batched deletes from MongoDB
+ARCHIVE_BATCH_SIZE = 100
+
+# Poll fields copied into the archive index so archived polls can be listed without opening payloads
+ARCHIVE_INDEX_FIELDS = ["title", "description", "type", "status", "creator", "network",
+                        "totalVotes", "createdAt", "startDate", "endDate"]
+
+# Enum values from the Poll and Vote Mongoose models (src/db/models)
+POLL_TYPES = ["SINGLE_CHOICE", "MULTIPLE_CHOICE", "RANKED_CHOICE"]
+POLL_STATUSES = ["ACTIVE", "PENDING", "ENDED", "CANCELLED"]
+VOTE_TYPES = ["Public", "Private"]
+NETWORKS = ["mainnet", "testnet"]
+
+# Fields of the Poll and Vote models (plus _id, timestamps and Mongoose's __v); import
+# drops any other field, as Mongoose strict mode does
+POLL_FIELDS = {"_id", "title", "description", "creator", "options", "startDate", "endDate", "type",
+               "maxSelections", "status", "network", "totalVotes", "createdAt", "updatedAt", "__v"}
+VOTE_FIELDS = {"_id", "pollId", "voter", "option", "options", "timestamp", "txId", "verificationHash",
+               "type", "network", "__v"}
+
+# Largest document MongoDB accepts (16 MB)
+MAX_DOCUMENT_BYTES = 16 * 1024 * 1024
+
+# Worker threads per AsyncDBCore (they share the MongoClient connection pool)
+ASYNC_WORKERS = 8
+
+# Quick mode: documents drawn with $sample per estimate, z-score for the confidence
+# intervals shown (95%), and a server-side time limit for each sampling query
+QUICK_SAMPLE_SIZE = 1000
+QUICK_CONFIDENCE_Z = 1.96
+QUICK_MAX_TIME_MS = 500
+
+# run-script: commands that leave the database unchanged, so they may run concurrently
+# and keep cached results (health counts, polls) valid for the steps that follow
+SCRIPT_READ_ONLY_COMMANDS = {"help", "list", "view", "health", "backup", "list-backups", "verify",
+                             "export", "export-rates", "rates", "scan-duplicates", "diff-backups",
+                             "publish"}
+
+# run-script: read-only commands that still write local files (timestamped names, the
+# backup catalog, the sqlite .tmp file, the publish state), so they run alone
+SCRIPT_EXCLUSIVE_COMMANDS = {"backup", "export", "export-rates", "scan-duplicates", "diff-backups", "publish"}
+
+# Commands that cannot run inside a script (they need the terminal, never finish, or
+# would nest scripts)
+SCRIPT_EXCLUDED_COMMANDS = {"interactive", "dashboard", "run-script", "tail-backup"}
+
+# run-script: commands that ask for confirmation unless --force is given; with
+# --concurrency above 1 the prompt is buffered with the step's output, so they need --force
+SCRIPT_PROMPTING_COMMANDS = {"delete", "delete-all", "restore", "archive", "apply-cleanup"}
+
+# Live dashboard: seconds between background fetches, newest votes kept on screen,
+# and the window (seconds) over which the vote rate is computed
+DASHBOARD_REFRESH_SECONDS = 2.0
+DASHBOARD_RECENT_VOTES = 15
+DASHBOARD_RATE_WINDOW_SECONDS = 60
+
+# Bulk import: documents per insert batch, and batches kept in flight per stage
+IMPORT_BATCH_SIZE = 5000
+IMPORT_WRITERS = 4
+
 # Color definitions for the CLI interface
 COLORS = {
     "HEADER": "\033[95m",
@@ -49,27 +212,559 @@ COLORS = {
     "UNDERLINE": "\033[4m"
 }
 
+def load_settings():
+    """Load MongoDB connection settings from the environment and .env file (once)"""
+    global MONGODB_URI, MONGODB_USER, MONGODB_PASS, _SETTINGS_LOADED
+    global OFFSITE_S3_BUCKET, OFFSITE_S3_PREFIX, OFFSITE_S3_ENDPOINT
+    if _SETTINGS_LOADED:
+        return
+    
+    from dotenv import load_dotenv
+    
+    # Load environment variables from .env file
+    load_dotenv()
+    
+    MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017/partivotes")
+    MONGODB_USER = os.getenv("MONGODB_USER")
+    MONGODB_PASS = os.getenv("MONGODB_PASS")
+    OFFSITE_S3_BUCKET = os.getenv("OFFSITE_S3_BUCKET")
+    OFFSITE_S3_PREFIX = os.getenv("OFFSITE_S3_PREFIX", "partivotes/backups/")
+    OFFSITE_S3_ENDPOINT = os.getenv("OFFSITE_S3_ENDPOINT")
+    _SETTINGS_LOADED = True
+
 class JSONEncoder(json.JSONEncoder):
     """Custom JSON encoder to handle MongoDB ObjectId and dates"""
     def default(self, obj):
-        if isinstance(obj, ObjectId):
-            return str(obj)
         if isinstance(obj, datetime.datetime):
             return obj.isoformat()
+        from bson import ObjectId
+        if isinstance(obj, ObjectId):
+            return str(obj)
         return json.JSONEncoder.default(self, obj)
 
-class DBManager:
-    """Database manager for PartiVotes MongoDB"""
+def snapshot_value(value):
+    """Convert a MongoDB document to the JSON shape the Node API returns (Mongoose toJSON)"""
+    if isinstance(value, dict):
+        return {key: snapshot_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [snapshot_value(item) for item in value]
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        return value.strftime("%Y-%m-%dT%H:%M:%S.") + f"{value.microsecond // 1000:03d}Z"
+    if type(value).__name__ == "ObjectId":
+        return str(value)
+    return value
+
+def write_snapshot(path, data):
+    """Atomically write a JSON snapshot and its pre-gzipped copy (for nginx gzip_static)"""
+    import gzip
+    body = json.dumps(data, separators=(",", ":")).encode()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    for target, payload in ((path + ".gz", gzip.compress(body, mtime=0)), (path, body)):
+        tmp_file = target + ".tmp"
+        with open(tmp_file, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_file, target)
+
+def option_text_votes(option):
+    """Return (text, votes) for a poll option in either stored shape (see the migrate command)"""
+    if isinstance(option, dict):
+        return option.get("text", ""), option.get("votes", 0)
+    return option, 0
+
+def estimate_share(hits, sample_size, total, z=QUICK_CONFIDENCE_Z):
+    """Scale a sampled count to the collection, with a Wilson score confidence interval"""
+    import math
+    if sample_size >= total:
+        # The sample covered the whole collection, so the count is exact
+        return hits, hits, hits
+    p = hits / sample_size
+    denominator = 1 + z * z / sample_size
+    center = (p + z * z / (2 * sample_size)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / sample_size + z * z / (4 * sample_size * sample_size)) / denominator
+    return round(p * total), round(max(0.0, center - margin) * total), round(min(1.0, center + margin) * total)
+
+def format_estimate(estimate):
+    """Format an (estimate, low, high) triple for display"""
+    value, low, high = estimate
+    if low == high:
+        return f"{value:,}"
+    return f"≈ {value:,} (95% CI {low:,}–{high:,})"
+
+def _parse_date(value, field):
+    """Convert an ISO string, epoch milliseconds or datetime to a tz-aware UTC datetime
+    
+    Values without an offset are taken to be UTC, as in the backups.
+    """
+    if isinstance(value, (int, float)):
+        return datetime.datetime.fromtimestamp(value / 1000, datetime.timezone.utc)
+    if isinstance(value, str) and value:
+        try:
+            value = datetime.datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is None:
+            return value.replace(tzinfo=datetime.timezone.utc)
+        return value.astimezone(datetime.timezone.utc)
+    raise ValueError(f"{field}: invalid date {value!r}")
+
+def _parse_object_id(value, field):
+    """Convert a string to an ObjectId"""
+    from bson import ObjectId
+    if isinstance(value, ObjectId):
+        return value
+    try:
+        return ObjectId(value)
+    except Exception:
+        raise ValueError(f"{field}: invalid ObjectId {value!r}")
+
+def _parse_list(value):
+    """Parse a list field: a JSON array string or a ';'-separated string (CSV) or a list"""
+    if isinstance(value, list):
+        return value
+    if not value:
+        return []
+    value = value.strip()
+    if value.startswith("["):
+        return json.loads(value)
+    return [item.strip() for item in value.split(";") if item.strip()]
+
+def _check_enum(doc, field, allowed, default):
+    """Apply an enum default and validate the value"""
+    if doc.get(field) in (None, ""):
+        doc[field] = default
+    if doc[field] not in allowed:
+        raise ValueError(f"{field}: {doc[field]!r} is not one of {', '.join(allowed)}")
+
+def _drop_unknown_fields(doc, allowed, dropped=None):
+    """Drop fields outside the model, like Mongoose strict mode, tallying them in `dropped`
+    
+    A CSV row with more columns than the header (the None key) is malformed and rejected.
+    """
+    if None in doc:
+        raise ValueError("row has more columns than the header")
+    for field in [field for field in doc if field not in allowed]:
+        del doc[field]
+        if dropped is not None:
+            dropped[field] = dropped.get(field, 0) + 1
+
+def _check_strings(doc, fields):
+    """Reject present, non-empty values of string fields that are not strings"""
+    for field in fields:
+        if doc.get(field) not in (None, "") and not isinstance(doc[field], str):
+            raise ValueError(f"{field}: expected a string, got {type(doc[field]).__name__}")
+
+def validate_poll(doc, dropped=None):
+    """Validate and convert a poll document to the Poll model shape, raising ValueError"""
+    _drop_unknown_fields(doc, POLL_FIELDS, dropped)
+    for field in ("title", "description", "creator", "options", "startDate", "endDate", "type"):
+        if doc.get(field) in (None, "", []):
+            raise ValueError(f"{field}: required")
+    _check_strings(doc, ("title", "description", "creator"))
+    
+    if "_id" in doc and doc["_id"] not in (None, ""):
+        doc["_id"] = _parse_object_id(doc["_id"], "_id")
+    else:
+        doc.pop("_id", None)
+    
+    options = []
+    for option in _parse_list(doc["options"]):
+        if isinstance(option, str):
+            options.append({"text": option, "votes": 0})
+        elif isinstance(option, dict) and isinstance(option.get("text"), str) and option["text"]:
+            options.append({"text": option["text"], "votes": int(option.get("votes") or 0)})
+        else:
+            raise ValueError(f"options: invalid option {option!r}")
+    doc["options"] = options
+    
+    _check_enum(doc, "type", POLL_TYPES, None)
+    _check_enum(doc, "status", POLL_STATUSES, "PENDING")
+    _check_enum(doc, "network", NETWORKS, "mainnet")
+    
+    now = datetime.datetime.now(datetime.timezone.utc)
+    for field in ("startDate", "endDate"):
+        doc[field] = _parse_date(doc[field], field)
+    for field in ("createdAt", "updatedAt"):
+        doc[field] = _parse_date(doc[field], field) if doc.get(field) not in (None, "") else now
+    
+    doc["maxSelections"] = int(doc.get("maxSelections") or 1)
+    doc["totalVotes"] = int(doc.get("totalVotes") or 0)
+    return doc
+
+def validate_vote(doc, dropped=None):
+    """Validate and convert a vote document to the Vote model shape, raising ValueError"""
+    _drop_unknown_fields(doc, VOTE_FIELDS, dropped)
+    if doc.get("pollId") in (None, ""):
+        raise ValueError("pollId: required")
+    doc["pollId"] = _parse_object_id(doc["pollId"], "pollId")
+    
+    if "_id" in doc and doc["_id"] not in (None, ""):
+        doc["_id"] = _parse_object_id(doc["_id"], "_id")
+    else:
+        doc.pop("_id", None)
+    
+    if "options" in doc:
+        doc["options"] = _parse_list(doc["options"])
+        if not all(isinstance(option, str) for option in doc["options"]):
+            raise ValueError("options: expected a list of strings")
+        if not doc["options"]:
+            del doc["options"]
+    _check_strings(doc, ("voter", "option", "txId", "verificationHash"))
+    for field in ("voter", "option", "txId", "verificationHash"):
+        if doc.get(field) == "":
+            del doc[field]
+    
+    _check_enum(doc, "type", VOTE_TYPES, "Public")
+    _check_enum(doc, "network", NETWORKS, "mainnet")
+    
+    if doc.get("timestamp") in (None, ""):
+        doc["timestamp"] = datetime.datetime.now(datetime.timezone.utc)
+    else:
+        doc["timestamp"] = _parse_date(doc["timestamp"], "timestamp")
+    return doc
+
+def _parse_import_chunk(collection, fmt, chunk):
+    """Parse and validate a chunk of (line number, raw row) pairs in a worker process
+    
+    Returns (documents, line numbers of the documents, rejected rows,
+    {dropped unknown field: count}).
+    """
+    from bson import BSON, json_util
+    validate = validate_poll if collection == "polls" else validate_vote
+    documents = []
+    line_numbers = []
+    rejected = []
+    dropped = {}
+    for line_number, row in chunk:
+        try:
+            doc = json_util.loads(row) if fmt == "ndjson" else dict(row)
+            if not isinstance(doc, dict):
+                raise ValueError("row is not a JSON object")
+            row_dropped = {}
+            doc = validate(doc, row_dropped)
+            # Encode once here so unencodable or oversized documents never reach insert_many
+            if len(BSON.encode(doc)) > MAX_DOCUMENT_BYTES:
+                raise ValueError(f"document is larger than {MAX_DOCUMENT_BYTES} bytes")
+            documents.append(doc)
+            line_numbers.append(line_number)
+            for field, count in row_dropped.items():
+                dropped[field] = dropped.get(field, 0) + count
+        except Exception as e:
+            rejected.append({"line": line_number, "error": str(e), "row": row})
+    return documents, line_numbers, rejected, dropped
+
+def iter_backup(backup_file, sections=None):
+    """Stream (section, document) pairs from a JSON backup without loading the whole file
+    
+    `backup_file` is a path or an open text stream. Works for both the streamed
+    one-document-per-line format and older indented backups. Sections not listed in
+    `sections` are parsed but not yielded, and reading stops once all requested
+    sections have been seen.
+    """
+    import contextlib
+    decoder = json.JSONDecoder()
+    with open(backup_file, "r") if isinstance(backup_file, str) else contextlib.nullcontext(backup_file) as f:
+        buffer = ""
+        pos = 0
+        eof = False
+        
+        def fill():
+            nonlocal buffer, pos, eof
+            chunk = f.read(1024 * 1024)
+            if not chunk:
+                eof = True
+            buffer = buffer[pos:] + chunk
+            pos = 0
+        
+        def skip_whitespace():
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    return
+                fill()
+        
+        def expect(chars):
+            nonlocal pos
+            skip_whitespace()
+            if pos >= len(buffer) or buffer[pos] not in chars:
+                raise ValueError(f"Invalid backup file format: expected one of {chars!r}")
+            pos += 1
+            return buffer[pos - 1]
+        
+        def decode():
+            nonlocal pos
+            skip_whitespace()
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                    # A number at the end of the buffer may continue in the next chunk
+                    if end < len(buffer) or eof:
+                        pos = end
+                        return value
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                fill()
+        
+        remaining = set(sections or BACKUP_SECTIONS)
+        expect("{")
+        skip_whitespace()
+        if buffer[pos:pos + 1] == "}":
+            return
+        while remaining:
+            key = decode()
+            expect(":")
+            skip_whitespace()
+            if buffer[pos] == "[":
+                pos += 1
+                skip_whitespace()
+                if buffer[pos:pos + 1] == "]":
+                    pos += 1
+                else:
+                    while True:
+                        doc = decode()
+                        if key in remaining:
+                            yield key, doc
+                        if expect(",]") == "]":
+                            break
+            elif key == "meta" and "meta" in remaining:
+                yield key, decode()
+            else:
+                decode()
+            remaining.discard(key)
+            if expect(",}") == "}":
+                break
+
+def iter_backup_documents(backup_file, section):
+    """Stream the documents of one section ("polls" or "votes") of a JSON backup"""
+    for _, doc in iter_backup(backup_file, [section]):
+        yield doc
+
+def restore_document(section, doc):
+    """Convert the string IDs and dates of a backed-up document back to BSON types"""
+    from bson import ObjectId
+    doc["_id"] = ObjectId(doc["_id"])
+    if section == "votes" and doc.get("pollId") is not None:
+        doc["pollId"] = ObjectId(doc["pollId"])
+    for field in BACKUP_DATE_FIELDS[section]:
+        if isinstance(doc.get(field), str):
+            doc[field] = _parse_date(doc[field], field)
+    return doc
+
+class ChecksumReader:
+    """Binary stream wrapper that hashes everything read through it, as backup() does"""
+    def __init__(self, stream):
+        import hashlib
+        self.stream = stream
+        self.sha256 = hashlib.sha256()
+    
+    def read(self, size=None):
+        data = self.stream.read(size)
+        self.sha256.update(data)
+        return data
+    
+    def checksum(self):
+        """Read whatever is left of the stream and return "sha256:<hex>" for all of it"""
+        while self.read(1024 * 1024):
+            pass
+        return f"sha256:{self.sha256.hexdigest()}"
+
+def backup_meta(backup_file):
+    """Return the metadata block of a backup (empty for backups written before it existed)"""
+    for key, value in iter_backup(backup_file, ["meta"]):
+        return value
+    return {}
+
+def iter_sorted_by_id(documents, run_size=DIFF_RUN_SIZE):
+    """Sort a document stream by _id using bounded memory (external merge sort)"""
+    import heapq
+    import tempfile
+    
+    run = []
+    run_files = []
+    with tempfile.TemporaryDirectory(prefix="partivotes_sort_") as tmp_dir:
+        for doc in documents:
+            run.append(doc)
+            if len(run) >= run_size:
+                run.sort(key=lambda d: str(d["_id"]))
+                run_file = os.path.join(tmp_dir, f"run_{len(run_files)}.ndjson")
+                with open(run_file, "w") as f:
+                    for item in run:
+                        f.write(json.dumps(item, cls=JSONEncoder) + "\n")
+                run_files.append(run_file)
+                run = []
+        run.sort(key=lambda d: str(d["_id"]))
+        
+        if not run_files:
+            yield from run
+            return
+        
+        handles = [open(run_file, "r") for run_file in run_files]
+        try:
+            streams = [(json.loads(line) for line in handle) for handle in handles] + [iter(run)]
+            yield from heapq.merge(*streams, key=lambda d: str(d["_id"]))
+        finally:
+            for handle in handles:
+                handle.close()
+
+class Result:
+    """Outcome of a DBCore operation: success flag, counts, elapsed time, errors and warnings
+    
+    Results are truthy when the operation succeeded, so callers can keep writing
+    `if db.backup(): ...`; to_dict() gives a JSON-friendly view for automation.
+    """
+    operation = "operation"
+    fields = ()
     
     def __init__(self):
-        """Initialize the database connection"""
-        self.client = None
+        """Initialize an empty, successful result"""
+        self.ok = True
+        self.counts = {}
+        self.elapsed = 0.0
+        self.errors = []
+        self.warnings = []
+        for field in self.fields:
+            setattr(self, field, None)
+    
+    def __bool__(self):
+        return self.ok
+    
+    def fail(self, message):
+        """Mark the result as failed with an error message"""
+        self.ok = False
+        self.errors.append(message)
+        return self
+    
+    def to_dict(self):
+        """Return the result as a plain dict (documents keep their BSON types; dump with JSONEncoder)"""
+        data = {"operation": self.operation, "ok": self.ok, "counts": self.counts,
+                "elapsed": round(self.elapsed, 6), "errors": self.errors, "warnings": self.warnings}
+        for field in self.fields:
+            data[field] = getattr(self, field)
+        return data
+
+class ConnectResult(Result):
+    operation = "connect"
+    fields = ("database",)
+
+class HealthResult(Result):
+    """Health counts are exact unless `estimated` (quick mode), where `distributions` holds
+    {collection: {field: {value: (estimate, low, high)}}} from sampling"""
+    operation = "health"
+    fields = ("estimated", "database", "collections", "distributions", "invalid_polls", "invalid_polls_estimate")
+
+class PollListResult(Result):
+    operation = "list"
+    fields = ("polls", "matched_estimate")
+
+class PollResult(Result):
+    operation = "view"
+    fields = ("poll", "found")
+
+class DeleteResult(Result):
+    operation = "delete"
+
+class BackupResult(Result):
+    operation = "backup"
+    fields = ("backup_file", "size", "checksum", "offsite_url", "removed_backups")
+
+class ExportResult(Result):
+    operation = "export"
+    fields = ("output_file",)
+
+class RestoreResult(Result):
+    """counts are the restored documents, `existing` the documents replaced
+    
+    `checksum` is the backup's sha256 as read; `verified` says whether it matched a
+    checksum recorded in the backup catalog (None when there was none to compare).
+    """
+    operation = "restore"
+    fields = ("backup_file", "existing", "safety_backup", "cancelled", "checksum", "verified")
+
+class ArchiveResult(Result):
+    operation = "archive"
+    fields = ("archive_dir", "cutoff")
+
+class RehydrateResult(Result):
+    operation = "rehydrate"
+    fields = ("poll_id", "found")
+
+class RollupResult(Result):
+    """`resumed` is set when the run first finished a range left by an interrupted run"""
+    operation = "rollup"
+    fields = ("watermark", "resumed")
+
+class ImportResult(Result):
+    operation = "import"
+    fields = ("collection", "rejected_file", "dropped_fields")
+
+class MigrationResult(Result):
+    operation = "migrate"
+    fields = ("dry_run", "resumed_after", "samples")
+
+def operation(result_class, cached=False):
+    """Decorator for DBCore operations: pass a fresh result in, time the call, and turn
+    exceptions into failed results instead of raising
+    
+    With cached=True, successful results are reused while the core's cache is enabled
+    (see DBCore.cache); callers that change the database must clear it.
+    """
+    import functools
+    
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            import time
+            cache = self.cache if cached else None
+            key = (method.__name__, args, tuple(sorted(kwargs.items())))
+            if cache is not None and key in cache:
+                return cache[key]
+            
+            result = result_class()
+            started = time.perf_counter()
+            try:
+                method(self, result, *args, **kwargs)
+            except Exception as e:
+                result.fail(str(e))
+            result.elapsed = time.perf_counter() - started
+            if cache is not None and result.ok:
+                cache[key] = result
+            return result
+        return wrapper
+    return decorator
+
+class DBCore:
+    """Quiet database core: operations return Result objects and never print or prompt
+    
+    The MongoClient (and its connection pool) is thread-safe, so one DBCore can be
+    shared by threads, AsyncDBCore, or several commands in one process.
+    """
+    
+    def __init__(self, connect=True, uri=None, client=None):
+        """Initialize the core, optionally reusing an existing MongoClient"""
+        self.uri = uri
+        self.client = client
         self.db = None
-        self.connect()
-        
+        # Result cache for read-only operations; None (disabled) unless a caller such as
+        # run-script enables it with a dict and clears it after changing the database
+        self.cache = None
+        if client is not None:
+            self.db = client.get_default_database("partivotes")
+        elif connect:
+            self.connect()
+    
     def connect(self):
         """Connect to MongoDB"""
+        result = ConnectResult()
         try:
+            from pymongo import MongoClient
+            load_settings()
+            uri = self.uri or MONGODB_URI
+            
             # Prepare connection options
             options = {}
             if MONGODB_USER and MONGODB_PASS:
@@ -77,481 +772,3177 @@ class DBManager:
                 options["password"] = MONGODB_PASS
                 
             # Connect to MongoDB
-            self.client = MongoClient(MONGODB_URI, **options)
+            self.client = MongoClient(uri, **options)
             
             # Get database name from URI
-            db_name = MONGODB_URI.split("/")[-1]
-            self.db = self.client[db_name]
+            result.database = uri.split("/")[-1].split("?")[0]
+            self.db = self.client[result.database]
             
             # Test connection
             self.client.admin.command('ping')
-            print(f"{COLORS['GREEN']}✅ Connected to MongoDB database: {db_name}{COLORS['ENDC']}")
-            
-            return True
         except Exception as e:
-            print(f"{COLORS['RED']}❌ Error connecting to MongoDB: {e}{COLORS['ENDC']}")
-            return False
+            result.fail(str(e))
+        return result
     
-    def check_health(self):
-        """Check database health and connection status"""
-        try:
-            # Check if connection is active
-            if not self.client:
-                print(f"{COLORS['RED']}❌ Not connected to MongoDB.{COLORS['ENDC']}")
-                return False
-            
-            # Ping the database to check connection
-            self.client.admin.command('ping')
-            
-            # Get database stats
-            db_stats = self.db.command("dbStats")
-            
-            # Get collection stats
-            polls_count = self.db.polls.count_documents({})
-            votes_count = self.db.votes.count_documents({})
-            
-            # Print health information
-            print(f"{COLORS['GREEN']}✅ MongoDB connection is healthy{COLORS['ENDC']}")
-            print(f"\n{COLORS['BOLD']}Database Statistics:{COLORS['ENDC']}")
-            print(f"  Database Size: {db_stats['dataSize'] / (1024*1024):.2f} MB")
-            print(f"  Storage Size: {db_stats['storageSize'] / (1024*1024):.2f} MB")
-            print(f"  Number of Collections: {len(db_stats['collections'])}")
-            
-            print(f"\n{COLORS['BOLD']}Collection Statistics:{COLORS['ENDC']}")
-            print(f"  Polls: {polls_count} documents")
-            print(f"  Votes: {votes_count} documents")
+    @operation(HealthResult, cached=True)
+    def health(self, result, quick=False):
+        """Check the connection and collect database and collection statistics"""
+        if not self.client:
+            result.fail("Not connected to MongoDB.")
+            return
+        
+        # Ping the database to check connection
+        self.client.admin.command('ping')
+        result.estimated = quick
+        result.collections = {}
+        
+        if quick:
+            # collStats and estimated counts come from metadata, independent of collection size
+            for collection in ["polls", "votes"]:
+                stats = self.db.command("collStats", collection)
+                result.collections[collection] = {"count": stats.get("count", 0), "size": stats.get("size", 0),
+                                                  "storageSize": stats.get("storageSize", 0),
+                                                  "indexes": stats.get("nindexes", 0)}
+                result.counts[collection] = stats.get("count", 0)
             
-            # Check for any polls with issues (missing required fields)
-            invalid_polls = list(self.db.polls.find({"$or": [
+            missing_fields = {"$or": [
                 {"title": {"$exists": False}},
                 {"options": {"$exists": False}},
                 {"status": {"$exists": False}}
-            ]}))
-            
-            if invalid_polls:
-                print(f"\n{COLORS['YELLOW']}⚠️ Found {len(invalid_polls)} polls with missing required fields.{COLORS['ENDC']}")
-                for poll in invalid_polls:
-                    print(f"  Poll ID: {poll['_id']} - Missing fields")
-            
-            return True
-        except Exception as e:
-            print(f"{COLORS['RED']}❌ Database health check failed: {e}{COLORS['ENDC']}")
-            return False
+            ]}
+            result.distributions = {}
+            for collection, fields, query in [("polls", ["status", "type", "network"], missing_fields),
+                                              ("votes", ["network", "type"], None)]:
+                _, distributions = self.sample_distribution(collection, fields, query)
+                result.distributions[collection] = {field: distributions[field] for field in fields}
+                if query is not None:
+                    result.invalid_polls_estimate = distributions.get("matched")
+            return
+        
+        # Get database stats
+        db_stats = self.db.command("dbStats")
+        result.database = {"dataSize": db_stats["dataSize"], "storageSize": db_stats["storageSize"],
+                           "collections": db_stats["collections"]}
+        
+        # Get collection stats
+        result.counts = {"polls": self.db.polls.count_documents({}),
+                         "votes": self.db.votes.count_documents({})}
+        
+        # Check for any polls with issues (missing required fields)
+        result.invalid_polls = [poll["_id"] for poll in self.db.polls.find({"$or": [
+            {"title": {"$exists": False}},
+            {"options": {"$exists": False}},
+            {"status": {"$exists": False}}
+        ]}, {"_id": 1})]
     
-    def list_polls(self, poll_type=None, status=None, limit=10, creator=None, search_term=None, sort_by="createdAt", sort_order=-1):
-        """List polls with enhanced filtering options"""
+    @operation(PollListResult, cached=True)
+    def find_polls(self, result, poll_type=None, status=None, limit=10, creator=None, search_term=None,
+                   sort_by="createdAt", sort_order=-1, include_archived=False, quick=False):
+        """Find polls with filtering, optionally merged with archived polls"""
+        # Prepare filter
+        filter_query = {}
+        if poll_type:
+            filter_query["type"] = poll_type
+        if status:
+            filter_query["status"] = status
+        if creator:
+            filter_query["creator"] = {"$regex": creator, "$options": "i"}
+        if search_term:
+            filter_query["$or"] = [
+                {"title": {"$regex": search_term, "$options": "i"}},
+                {"description": {"$regex": search_term, "$options": "i"}}
+            ]
+        
+        # Get polls with sorting
         try:
-            # Make sure we're connected to the database
-            if not self.client:
-                if not self.connect():
-                    print(f"{COLORS['RED']}❌ Not connected to MongoDB. Please check your connection.{COLORS['ENDC']}")
-                    return []
-            
-            # Prepare filter
-            filter_query = {}
-            if poll_type:
-                filter_query["type"] = poll_type
-            if status:
-                filter_query["status"] = status
-            if creator:
-                filter_query["creator"] = {"$regex": creator, "$options": "i"}
-            if search_term:
-                filter_query["$or"] = [
-                    {"title": {"$regex": search_term, "$options": "i"}},
-                    {"description": {"$regex": search_term, "$options": "i"}}
-                ]
-            
-            # Get polls with sorting
-            try:
-                polls = list(self.db.polls.find(filter_query).sort(sort_by, sort_order).limit(limit))
-            except Exception as e:
-                print(f"{COLORS['RED']}❌ Error querying database: {e}{COLORS['ENDC']}")
-                # Try with default sort if the specified sort field doesn't exist
-                polls = list(self.db.polls.find(filter_query).limit(limit))
-            
-            if not polls:
-                print(f"{COLORS['YELLOW']}No polls found matching the criteria.{COLORS['ENDC']}")
-                return []
-            
-            # Prepare table data
-            table_data = []
-            for i, poll in enumerate(polls, 1):
-                # Add index for easier selection
-                created_at = poll.get("createdAt", "N/A")
-                if created_at != "N/A":
-                    try:
-                        created_at = created_at.strftime("%Y-%m-%d %H:%M")
-                    except:
-                        # Handle case where createdAt is not a datetime object
-                        created_at = str(created_at)
-                
-                table_data.append([
-                    i,  # Add index number for easier selection
-                    str(poll["_id"]),
-                    poll.get("title", "No Title"),
-                    poll.get("type", "Unknown"),
-                    poll.get("status", "Unknown"),
-                    poll.get("totalVotes", 0),
-                    poll.get("creator", "Unknown"),
-                    created_at
-                ])
-            
-            # Print table
-            headers = ["#", "ID", "Title", "Type", "Status", "Votes", "Creator", "Created At"]
-            print(tabulate(table_data, headers=headers, tablefmt="grid"))
-            print(f"Total: {len(polls)} polls")
-            
-            return polls
+            polls = list(self.db.polls.find(filter_query).sort(sort_by, sort_order).limit(limit))
         except Exception as e:
-            print(f"{COLORS['RED']}❌ Error listing polls: {e}{COLORS['ENDC']}")
-            return []
+            result.warnings.append(f"Error querying database: {e}")
+            # Try with default sort if the specified sort field doesn't exist
+            polls = list(self.db.polls.find(filter_query).limit(limit))
+        
+        # Merge in archived polls from the archive index (payloads are never opened)
+        if include_archived:
+            archived = self._filter_archived_polls(poll_type, status, creator, search_term)
+            if archived:
+                polls = self._merge_sorted(polls, archived, sort_by, sort_order)[:limit]
+        
+        # Estimate how many polls match overall without counting them
+        if quick:
+            _, distributions = self.sample_distribution("polls", [], filter_query)
+            result.matched_estimate = distributions.get("matched")
+        
+        result.polls = polls
+        result.counts["polls"] = len(polls)
     
-    def view_poll(self, poll_id):
-        """View details of a specific poll"""
-        try:
-            # Convert string ID to ObjectId
-            obj_id = ObjectId(poll_id)
-            
-            # Get poll
-            poll = self.db.polls.find_one({"_id": obj_id})
-            
-            if not poll:
-                print(f"{COLORS['YELLOW']}Poll with ID {poll_id} not found.{COLORS['ENDC']}")
-                return None
-            
-            # Print poll details
-            print("\n" + "="*50)
-            print(f"{COLORS['BOLD']}Poll ID:{COLORS['ENDC']} {poll_id}")
-            print(f"{COLORS['BOLD']}Title:{COLORS['ENDC']} {poll['title']}")
-            print(f"{COLORS['BOLD']}Description:{COLORS['ENDC']} {poll['description']}")
-            print(f"{COLORS['BOLD']}Type:{COLORS['ENDC']} {poll['type']}")
-            print(f"{COLORS['BOLD']}Status:{COLORS['ENDC']} {poll['status']}")
-            print(f"{COLORS['BOLD']}Creator:{COLORS['ENDC']} {poll['creator']}")
-            print(f"{COLORS['BOLD']}Total Votes:{COLORS['ENDC']} {poll['totalVotes']}")
-            print(f"{COLORS['BOLD']}Created:{COLORS['ENDC']} {poll['createdAt'].strftime('%Y-%m-%d %H:%M') if 'createdAt' in poll else 'N/A'}")
-            print(f"{COLORS['BOLD']}Start Date:{COLORS['ENDC']} {poll['startDate'].strftime('%Y-%m-%d %H:%M') if 'startDate' in poll else 'N/A'}")
-            print(f"{COLORS['BOLD']}End Date:{COLORS['ENDC']} {poll['endDate'].strftime('%Y-%m-%d %H:%M') if 'endDate' in poll else 'N/A'}")
-            
-            # Print options
-            print(f"\n{COLORS['BOLD']}Options:{COLORS['ENDC']}")
-            for i, option in enumerate(poll["options"], 1):
-                print(f"  {i}. {option['text']} - {option['votes']} votes")
-            
-            # Get votes for this poll
-            votes = list(self.db.votes.find({"pollId": obj_id}))
-            print(f"\n{COLORS['BOLD']}Votes:{COLORS['ENDC']} {len(votes)}")
-            
-            print("="*50 + "\n")
-            
-            return poll
-        except Exception as e:
-            print(f"{COLORS['RED']}❌ Error viewing poll: {e}{COLORS['ENDC']}")
-            return None
+    @operation(PollResult, cached=True)
+    def get_poll(self, result, poll_id):
+        """Get a poll and the number of votes stored for it"""
+        from bson import ObjectId
+        obj_id = ObjectId(poll_id)
+        result.poll = self.db.polls.find_one({"_id": obj_id})
+        result.found = result.poll is not None
+        if not result.found:
+            result.fail(f"Poll with ID {poll_id} not found.")
+            return
+        result.counts["votes"] = self.db.votes.count_documents({"pollId": obj_id})
     
-    def delete_poll(self, poll_id, force=False):
+    @operation(DeleteResult)
+    def remove_poll(self, result, poll_id):
         """Delete a poll and its votes"""
+        from bson import ObjectId
+        # Validate poll_id format
+        if not poll_id or not isinstance(poll_id, str) or len(poll_id) != 24:
+            result.fail(f"Invalid poll ID format: {poll_id}")
+            return
+        obj_id = ObjectId(poll_id)
+        
+        # Delete votes first
         try:
-            # Make sure we're connected to the database
-            if not self.client:
-                if not self.connect():
-                    print(f"{COLORS['RED']}❌ Not connected to MongoDB. Please check your connection.{COLORS['ENDC']}")
-                    return False
+            result.counts["votes"] = self.db.votes.delete_many({"pollId": obj_id}).deleted_count
+        except Exception as e:
+            result.warnings.append(f"Error deleting votes: {e}. Continuing with poll deletion.")
+            result.counts["votes"] = 0
+        
+        # Delete poll
+        result.counts["polls"] = self.db.polls.delete_one({"_id": obj_id}).deleted_count
+        if not result.counts["polls"]:
+            result.fail("Failed to delete poll. No documents matched the query.")
+    
+    @operation(DeleteResult)
+    def remove_all_polls(self, result):
+        """Delete all polls and votes"""
+        # Delete votes first
+        result.counts["votes"] = self.db.votes.delete_many({}).deleted_count
+        result.counts["polls"] = self.db.polls.delete_many({}).deleted_count
+    
+    @operation(BackupResult)
+    def backup(self, result, backup_file=None, offsite=False, max_bytes_per_sec=None):
+        """Create a backup of the database, optionally streaming it to offsite storage"""
+        # Create backup directory if it doesn't exist
+        os.makedirs(BACKUP_DIR, exist_ok=True)
+        
+        # Create timestamp for backup filename
+        rotate = backup_file is None
+        if not backup_file:
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            backup_file = os.path.join(BACKUP_DIR, f"partivotes_backup_{timestamp}.json")
+        
+        # Stream each collection in BACKUP_ORDER, one document per line, so memory stays
+        # flat, readers such as diff-backups can merge-join without sorting, and each
+        # poll's document and votes can be indexed by byte range
+        import hashlib
+        from bson import ObjectId
+        counts = result.counts
+        index = {}
+        offset = 0
+        checksum = hashlib.sha256()
+        created_at = datetime.datetime.now()
+        tmp_file = backup_file + ".tmp"
+        
+        # The offsite upload is fed from the same byte stream as the local file;
+        # if it fails, the local backup still completes and the upload can be resumed
+        uploader = self._start_offsite_upload(backup_file, max_bytes_per_sec) if offsite else None
+        
+        with open(tmp_file, "wb") as f:
+            def write(text):
+                nonlocal offset, uploader
+                data = text.encode()
+                f.write(data)
+                checksum.update(data)
+                offset += len(data)
+                if uploader:
+                    try:
+                        uploader.write(data)
+                    except Exception as e:
+                        result.warnings.append(f"Offsite upload interrupted: {e}. Resume it with offsite-upload.")
+                        uploader.abort_pool()
+                        uploader = None
             
-            # Validate poll_id format
-            if not poll_id or not isinstance(poll_id, str) or len(poll_id) != 24:
-                print(f"{COLORS['YELLOW']}Invalid poll ID format: {poll_id}{COLORS['ENDC']}")
-                return False
-                
+            write('{\n  "meta": ' + json.dumps({"order": BACKUP_ORDER}) + ",\n")
+            for name in BACKUP_SECTIONS:
+                write(f'  "{name}": [')
+                counts[name] = 0
+                # Served by the {pollId, _id} index when it exists (indexes --create); without
+                # it the sort spills to disk instead of failing at the 100 MB sort limit
+                order = [(field, 1) for field in BACKUP_ORDER[name]]
+                for doc in self.db[name].find(allow_disk_use=True).sort(order):
+                    write(("," if counts[name] else "") + "\n    ")
+                    line = json.dumps(doc, cls=JSONEncoder)
+                    
+                    # Record byte ranges: [poll offset, poll length, votes offset, votes end]
+                    poll_id = doc["_id"] if name == "polls" else doc.get("pollId")
+                    if isinstance(poll_id, ObjectId):
+                        entry = index.setdefault(poll_id, [0, 0, 0, 0])
+                        if name == "polls":
+                            entry[0:2] = [offset, len(line)]
+                        else:
+                            if not entry[3]:
+                                entry[2] = offset
+                            entry[3] = offset + len(line)
+                    
+                    write(line)
+                    counts[name] += 1
+                write("\n  ]" + ("," if name != BACKUP_SECTIONS[-1] else "") + "\n")
+            write("}\n")
+        self._write_backup_index(backup_file + ".idx", index)
+        os.replace(tmp_file, backup_file)
+        
+        result.backup_file = backup_file
+        result.size = offset
+        result.checksum = f"sha256:{checksum.hexdigest()}"
+        
+        if uploader:
             try:
-                # Convert string ID to ObjectId
-                obj_id = ObjectId(poll_id)
+                result.offsite_url = self._finish_offsite_upload(uploader, backup_file)
             except Exception as e:
-                print(f"{COLORS['YELLOW']}Invalid poll ID: {poll_id} - {str(e)}{COLORS['ENDC']}")
-                return False
-            
-            # Get poll
-            poll = self.db.polls.find_one({"_id": obj_id})
-            
-            if not poll:
-                print(f"{COLORS['YELLOW']}Poll with ID {poll_id} not found.{COLORS['ENDC']}")
-                return False
-            
-            # Confirm deletion
-            if not force:
-                print(f"\n{COLORS['BOLD']}Poll:{COLORS['ENDC']} {poll.get('title', 'Untitled')}")
-                print(f"{COLORS['BOLD']}ID:{COLORS['ENDC']} {poll_id}")
-                print(f"{COLORS['BOLD']}Total Votes:{COLORS['ENDC']} {poll.get('totalVotes', 0)}")
-                confirm = input(f"\n{COLORS['RED']}⚠️ Are you sure you want to delete this poll? This action cannot be undone. (y/N):{COLORS['ENDC']} ")
-                if confirm.lower() != "y":
-                    print(f"{COLORS['YELLOW']}Deletion cancelled.{COLORS['ENDC']}")
-                    return False
-            
-            # Delete votes first
+                result.warnings.append(f"Offsite upload failed: {e}. Resume it with offsite-upload.")
+        
+        # Catalog and rotate backups (explicitly named backups are managed by their caller)
+        if rotate:
+            catalog = self._read_backup_catalog(result.warnings)
+            catalog.append({
+                "file": os.path.basename(backup_file),
+                "createdAt": created_at.isoformat(timespec="seconds"),
+                "kind": "full",
+                "codec": "json",
+                "polls": counts["polls"],
+                "votes": counts["votes"],
+                "size": offset,
+                "checksum": result.checksum,
+                "indexed": True,
+                "offsite": result.offsite_url
+            })
+            self._write_backup_catalog(catalog)
             try:
-                votes_result = self.db.votes.delete_many({"pollId": obj_id})
-                votes_deleted = votes_result.deleted_count
+                result.removed_backups = self._rotate_backups()
             except Exception as e:
-                print(f"{COLORS['YELLOW']}Warning: Error deleting votes: {e}. Continuing with poll deletion.{COLORS['ENDC']}")
-                votes_deleted = 0
+                result.warnings.append(f"Could not rotate backups: {e}")
+    
+    @operation(ExportResult)
+    def export_csv(self, result, output_file=None, quick=False):
+        """Export polls to CSV format for external analysis
+        
+        In quick mode the per-poll vote count queries are skipped and the
+        "Actual Vote Count" column is left out (Total Votes is the stored tally).
+        """
+        import csv
+        # Create export directory if it doesn't exist
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        
+        # Create default filename if not provided
+        if not output_file:
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            output_file = os.path.join(EXPORT_DIR, f"polls_export_{timestamp}.csv")
+        
+        # Get all polls
+        polls = list(self.db.polls.find())
+        result.counts["polls"] = len(polls)
+        
+        if not polls:
+            result.fail("No polls to export.")
+            return
+        
+        # Prepare CSV data
+        csv_data = []
+        for poll in polls:
+            # Get options as a formatted string
+            options_str = "; ".join(["%s (%s votes)" % option_text_votes(opt) for opt in poll["options"]])
             
-            # Delete poll
-            try:
-                poll_result = self.db.polls.delete_one({"_id": obj_id})
+            # Add poll data
+            row = {
+                "Poll ID": str(poll["_id"]),
+                "Title": poll["title"],
+                "Description": poll["description"],
+                "Type": poll["type"],
+                "Status": poll["status"],
+                "Creator": poll["creator"],
+                "Total Votes": poll["totalVotes"]
+            }
+            if not quick:
+                # Count votes for this poll
+                row["Actual Vote Count"] = self.db.votes.count_documents({"pollId": poll["_id"]})
+            row.update({
+                "Created At": poll["createdAt"].strftime("%Y-%m-%d %H:%M") if "createdAt" in poll else "N/A",
+                "Start Date": poll["startDate"].strftime("%Y-%m-%d %H:%M") if "startDate" in poll else "N/A",
+                "End Date": poll["endDate"].strftime("%Y-%m-%d %H:%M") if "endDate" in poll else "N/A",
+                "Options": options_str
+            })
+            csv_data.append(row)
+        
+        # Write to CSV file
+        with open(output_file, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=csv_data[0].keys())
+            writer.writeheader()
+            writer.writerows(csv_data)
+        result.output_file = output_file
+    
+    def _write_backup_index(self, index_file, index):
+        """Write the seekable poll -> byte range index for a backup"""
+        import struct
+        tmp_file = index_file + ".tmp"
+        with open(tmp_file, "wb") as f:
+            f.write(BACKUP_INDEX_MAGIC + struct.pack("<Q", len(index)))
+            for poll_id in sorted(index, key=lambda oid: oid.binary):
+                poll_offset, poll_length, votes_offset, votes_end = index[poll_id]
+                f.write(struct.pack(BACKUP_INDEX_RECORD, poll_id.binary, poll_offset, poll_length,
+                                    votes_offset, votes_end - votes_offset))
+        os.replace(tmp_file, index_file)
+    
+    def _lookup_backup_index(self, index_file, poll_id):
+        """Binary-search a backup index (via mmap) for a poll's byte ranges, or None"""
+        import mmap
+        import struct
+        record_size = struct.calcsize(BACKUP_INDEX_RECORD)
+        header_size = len(BACKUP_INDEX_MAGIC) + 8
+        target = poll_id.binary
+        
+        with open(index_file, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if mm[:len(BACKUP_INDEX_MAGIC)] != BACKUP_INDEX_MAGIC:
+                    raise ValueError(f"Invalid backup index: {index_file}")
+                count = struct.unpack_from("<Q", mm, len(BACKUP_INDEX_MAGIC))[0]
+                low, high = 0, count
+                while low < high:
+                    middle = (low + high) // 2
+                    start = header_size + middle * record_size
+                    key = mm[start:start + 12]
+                    if key < target:
+                        low = middle + 1
+                    elif key > target:
+                        high = middle
+                    else:
+                        return struct.unpack_from(BACKUP_INDEX_RECORD, mm, start)[1:]
+        return None
+    
+    def _read_backup_catalog(self, warnings=None):
+        """Read the backup catalog, or build it in memory from the backup directory if missing
+        
+        Only backup, rotation and offsite uploads write the catalog, so read-only
+        commands never create it. Backups skipped while building it are reported
+        in `warnings`.
+        """
+        if os.path.exists(BACKUP_CATALOG):
+            with open(BACKUP_CATALOG, "r") as f:
+                return json.load(f)
+        
+        # Backups created before the catalog existed
+        catalog = []
+        if os.path.isdir(BACKUP_DIR):
+            for file in sorted(os.listdir(BACKUP_DIR)):
+                if not (file.startswith("partivotes_backup_") and file.endswith(".json")):
+                    continue
+                timestamp = file.replace("partivotes_backup_", "").replace(".json", "")
+                try:
+                    created_at = datetime.datetime.strptime(timestamp, "%Y%m%d_%H%M%S")
+                except ValueError:
+                    if warnings is not None:
+                        warnings.append(f"Skipping backup with a non-standard name: {file}")
+                    continue
+                file_path = os.path.join(BACKUP_DIR, file)
+                catalog.append({
+                    "file": file,
+                    "createdAt": created_at.isoformat(),
+                    "kind": "full",
+                    "codec": "json",
+                    "polls": None,
+                    "votes": None,
+                    "size": os.path.getsize(file_path),
+                    "checksum": None,
+                    "indexed": os.path.exists(file_path + ".idx")
+                })
+        return catalog
+    
+    def _write_backup_catalog(self, catalog):
+        """Atomically write the backup catalog, oldest backup first"""
+        os.makedirs(BACKUP_DIR, exist_ok=True)
+        catalog.sort(key=lambda entry: entry["createdAt"])
+        tmp_file = BACKUP_CATALOG + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(catalog, f, indent=2)
+        os.replace(tmp_file, BACKUP_CATALOG)
+    
+    def _retained_backups(self, catalog, policy=RETENTION_POLICY):
+        """Return the catalog file names kept by a time-tiered retention policy"""
+        periods = {
+            "hourly": lambda t: t.strftime("%Y-%m-%d %H"),
+            "daily": lambda t: t.strftime("%Y-%m-%d"),
+            "weekly": lambda t: "%d-W%02d" % t.isocalendar()[:2],
+            "monthly": lambda t: t.strftime("%Y-%m")
+        }
+        newest_first = sorted(catalog, key=lambda entry: entry["createdAt"], reverse=True)
+        keep = {newest_first[0]["file"]} if newest_first else set()
+        for tier, count in policy.items():
+            buckets = set()
+            for entry in newest_first:
+                if len(buckets) >= count:
+                    break
+                bucket = periods[tier](datetime.datetime.fromisoformat(entry["createdAt"]))
+                if bucket not in buckets:
+                    # The newest backup in each period represents that period
+                    buckets.add(bucket)
+                    keep.add(entry["file"])
+        return keep
+    
+    def _rotate_backups(self):
+        """Rotate backups according to the time-tiered retention policy; returns the removed files"""
+        catalog = self._read_backup_catalog()
+        keep = self._retained_backups(catalog)
+        
+        remaining = []
+        removed = []
+        for entry in catalog:
+            if entry["file"] in keep:
+                remaining.append(entry)
+                continue
+            file_path = os.path.join(BACKUP_DIR, entry["file"])
+            for path in (file_path, file_path + ".idx"):
+                if os.path.exists(path):
+                    os.remove(path)
+            removed.append(entry["file"])
+        
+        if removed:
+            self._write_backup_catalog(remaining)
+        return removed
+    
+    def _offsite_client(self):
+        """Create an S3 client for the offsite backup sink (boto3 is an optional dependency)"""
+        load_settings()
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("Offsite backups need boto3 (pip install boto3)")
+        return boto3.client("s3", endpoint_url=OFFSITE_S3_ENDPOINT)
+    
+    def _offsite_key(self, backup_file):
+        """Object key for a backup file under the offsite prefix"""
+        load_settings()
+        if not OFFSITE_S3_BUCKET:
+            raise RuntimeError("OFFSITE_S3_BUCKET is not set")
+        return OFFSITE_S3_PREFIX + os.path.basename(backup_file)
+    
+    def _read_offsite_uploads(self):
+        """Read the unfinished offsite uploads, keyed by backup file name"""
+        if not os.path.exists(OFFSITE_UPLOADS_FILE):
+            return {}
+        with open(OFFSITE_UPLOADS_FILE, "r") as f:
+            return json.load(f)
+    
+    def _write_offsite_uploads(self, uploads):
+        """Atomically write the unfinished offsite uploads"""
+        os.makedirs(BACKUP_DIR, exist_ok=True)
+        tmp_file = OFFSITE_UPLOADS_FILE + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(uploads, f, indent=2)
+        os.replace(tmp_file, OFFSITE_UPLOADS_FILE)
+    
+    def _start_offsite_upload(self, backup_file, max_bytes_per_sec=None, resume=True):
+        """Start (or resume) a multipart upload of a backup, recording it for resumption"""
+        client = self._offsite_client()
+        key = self._offsite_key(backup_file)
+        uploads = self._read_offsite_uploads()
+        pending = uploads.get(os.path.basename(backup_file)) if resume else None
+        
+        done_parts = {}
+        if pending:
+            try:
+                paginator = client.get_paginator("list_parts")
+                for page in paginator.paginate(Bucket=OFFSITE_S3_BUCKET, Key=key, UploadId=pending["uploadId"]):
+                    for part in page.get("Parts", []):
+                        done_parts[part["PartNumber"]] = part["ETag"]
+            except client.exceptions.NoSuchUpload:
+                pending = None
+        
+        uploader = S3MultipartUploader(client, OFFSITE_S3_BUCKET, key,
+                                       part_size=pending["partSize"] if pending else OFFSITE_PART_SIZE,
+                                       max_bytes_per_sec=max_bytes_per_sec,
+                                       upload_id=pending["uploadId"] if pending else None,
+                                       done_parts=done_parts)
+        uploads[os.path.basename(backup_file)] = {"key": key, "uploadId": uploader.upload_id,
+                                                  "partSize": uploader.part_size}
+        self._write_offsite_uploads(uploads)
+        return uploader
+    
+    def _finish_offsite_upload(self, uploader, backup_file):
+        """Complete an offsite upload, upload the seek index, and clear the resume record
+        
+        Returns the s3:// URL; on failure the resume record is kept and the error re-raised.
+        """
+        try:
+            uploader.close()
+            if os.path.exists(backup_file + ".idx"):
+                with open(backup_file + ".idx", "rb") as f:
+                    uploader.client.put_object(Bucket=uploader.bucket, Key=uploader.key + ".idx", Body=f)
+        except Exception:
+            uploader.abort_pool()
+            raise
+        
+        uploads = self._read_offsite_uploads()
+        uploads.pop(os.path.basename(backup_file), None)
+        self._write_offsite_uploads(uploads)
+        return f"s3://{uploader.bucket}/{uploader.key}"
+    
+    def _read_archive_index(self):
+        """Read the archive index into a dict of poll ID -> index entry"""
+        entries = {}
+        if not os.path.exists(ARCHIVE_INDEX):
+            return entries
+        
+        with open(ARCHIVE_INDEX, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                entry = json.loads(line)
+                # Later entries win, so a re-archived poll replaces its old entry
+                entries[entry["_id"]] = entry
+        return entries
+    
+    def _write_archive_index(self, entries):
+        """Atomically rewrite the archive index"""
+        tmp_file = ARCHIVE_INDEX + ".tmp"
+        with open(tmp_file, "w") as f:
+            for entry in entries.values():
+                f.write(json.dumps(entry, cls=JSONEncoder) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, ARCHIVE_INDEX)
+    
+    def _filter_archived_polls(self, poll_type=None, status=None, creator=None, search_term=None):
+        """Return archived polls from the index matching the list_polls filters"""
+        import re
+        
+        polls = []
+        for entry in self._read_archive_index().values():
+            if poll_type and entry.get("type") != poll_type:
+                continue
+            if status and entry.get("status") != status:
+                continue
+            if creator and not re.search(creator, entry.get("creator") or "", re.IGNORECASE):
+                continue
+            if search_term and not (re.search(search_term, entry.get("title") or "", re.IGNORECASE) or
+                                    re.search(search_term, entry.get("description") or "", re.IGNORECASE)):
+                continue
+            
+            poll = dict(entry)
+            for field in ("createdAt", "startDate", "endDate", "archivedAt"):
+                if isinstance(poll.get(field), str):
+                    try:
+                        poll[field] = datetime.datetime.fromisoformat(poll[field])
+                    except ValueError:
+                        pass
+            poll["archived"] = True
+            polls.append(poll)
+        return polls
+    
+    def _merge_sorted(self, polls, archived, sort_by, sort_order):
+        """Merge live and archived polls on sort_by, keeping polls without the field last"""
+        def sort_key(poll):
+            value = poll[sort_by]
+            if isinstance(value, datetime.datetime):
+                # Index dates are stored as naive UTC, like the dates pymongo returns
+                return value.replace(tzinfo=None)
+            return value
+        
+        with_field = [p for p in polls + archived if p.get(sort_by) is not None]
+        without_field = [p for p in polls + archived if p.get(sort_by) is None]
+        try:
+            with_field.sort(key=sort_key, reverse=sort_order < 0)
+        except TypeError:
+            # Mixed value types for the sort field; fall back to string ordering
+            with_field.sort(key=lambda p: str(p[sort_by]), reverse=sort_order < 0)
+        return with_field + without_field
+    
+    def sample_distribution(self, collection, fields, query=None, sample_size=QUICK_SAMPLE_SIZE):
+        """Estimate value distributions of `fields` (and the share matching `query`) from one $sample
+        
+        Returns the estimated collection size and, per field, {value: (estimate, low, high)};
+        with a query, the "matched" entry holds the estimated number of matching documents.
+        """
+        coll = self.db[collection]
+        total = coll.estimated_document_count()
+        if not total:
+            return 0, {field: {} for field in fields}
+        
+        facets = {field: [{"$group": {"_id": f"${field}", "n": {"$sum": 1}}}] for field in fields}
+        facets["sampled"] = [{"$count": "n"}]
+        if query is not None:
+            facets["matched"] = [{"$match": query}, {"$count": "n"}]
+        
+        result = next(coll.aggregate([{"$sample": {"size": sample_size}}, {"$facet": facets}],
+                                     maxTimeMS=QUICK_MAX_TIME_MS))
+        sampled = result["sampled"][0]["n"] if result["sampled"] else 0
+        if not sampled:
+            return total, {field: {} for field in fields}
+        
+        distributions = {}
+        for field in fields:
+            groups = sorted(result[field], key=lambda group: -group["n"])
+            distributions[field] = {
+                group["_id"] if group["_id"] is not None else "(missing)": estimate_share(group["n"], sampled, total)
+                for group in groups
+            }
+        if query is not None:
+            hits = result["matched"][0]["n"] if result["matched"] else 0
+            distributions["matched"] = estimate_share(hits, sampled, total)
+        return total, distributions
+    
+    @operation(RestoreResult)
+    def restore(self, result, backup_file, confirm=None):
+        """Replace polls and votes with the contents of a backup (a local path or an s3:// URL)
+        
+        The backup is streamed into staging collections and its checksum compared with
+        the catalog; only then are the staging collections renamed over the live ones,
+        so a truncated, corrupt or cancelled restore leaves the database as it was.
+        confirm(result) is called with the staged and existing counts before the swap;
+        returning False cancels. A non-empty database gets a safety backup.
+        """
+        import codecs
+        result.backup_file = backup_file
+        staging = {name: self.db[name + RESTORE_STAGING_SUFFIX] for name in BACKUP_SECTIONS}
+        
+        if backup_file.startswith("s3://"):
+            bucket, key = backup_file[len("s3://"):].split("/", 1)
+            stream = self._offsite_client().get_object(Bucket=bucket, Key=key)["Body"]
+        elif not os.path.exists(backup_file):
+            result.fail(f"Backup file not found: {backup_file}")
+            return
+        else:
+            stream = open(backup_file, "rb")
+        
+        try:
+            reader = ChecksumReader(stream)
+            self._stage_backup(result, codecs.getreader("utf-8")(reader), staging)
+            result.checksum = reader.checksum()
+        except Exception as e:
+            self._drop_staging(staging)
+            result.fail(f"{e}; the live database was not changed")
+            return
+        finally:
+            stream.close()
+        
+        expected = self._catalog_checksum(backup_file)
+        result.verified = None if expected is None else expected == result.checksum
+        if result.verified is False:
+            self._drop_staging(staging)
+            result.fail(f"Checksum does not match the backup catalog ({result.checksum}, expected "
+                        f"{expected}); the live database was not changed")
+            return
+        
+        result.existing = {name: self.db[name].count_documents({}) for name in BACKUP_SECTIONS}
+        if confirm is not None and any(result.existing.values()) and not confirm(result):
+            self._drop_staging(staging)
+            result.cancelled = True
+            return
+        
+        # Create a backup before restoring (safety measure)
+        if any(result.existing.values()):
+            safety = self.backup()
+            if not safety:
+                self._drop_staging(staging)
+                result.fail(f"Safety backup failed: {safety.errors[0]}; the live database was not changed")
+                return
+            result.safety_backup = safety.backup_file
+        
+        # Swap the staging collections in, keeping the live collections' indexes
+        for name in BACKUP_SECTIONS:
+            if not result.counts[name]:
+                # An empty staging collection was never created, so there is nothing to rename
+                self.db[name].delete_many({})
+                continue
+            for index_name, info in self.db[name].index_information().items():
+                if index_name == "_id_":
+                    continue
+                options = {option: info[option] for option in
+                           ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds") if option in info}
+                staging[name].create_index(info["key"], name=index_name, **options)
+            staging[name].rename(name, dropTarget=True)
+    
+    def _stage_backup(self, result, stream, staging):
+        """Load a backup text stream into the staging collections in batches, converting types"""
+        self._drop_staging(staging)
+        result.counts = {name: 0 for name in BACKUP_SECTIONS}
+        batch = []
+        batch_section = None
+        
+        def flush():
+            if batch:
+                staging[batch_section].insert_many(batch)
+                result.counts[batch_section] += len(batch)
+                batch.clear()
+        
+        for section, doc in iter_backup(stream):
+            if section != batch_section:
+                flush()
+                batch_section = section
+            batch.append(restore_document(section, doc))
+            if len(batch) >= RESTORE_BATCH_SIZE:
+                flush()
+        flush()
+    
+    def _drop_staging(self, staging):
+        """Drop the restore staging collections"""
+        for collection in staging.values():
+            collection.drop()
+    
+    def _catalog_checksum(self, backup_file):
+        """Return the checksum the backup catalog records for a local or offsite backup, if any"""
+        if backup_file.startswith("s3://"):
+            entry = next((e for e in self._read_backup_catalog() if e.get("offsite") == backup_file), None)
+        elif os.path.dirname(os.path.abspath(backup_file)) == BACKUP_DIR:
+            entry = next((e for e in self._read_backup_catalog() if e["file"] == os.path.basename(backup_file)), None)
+        else:
+            entry = None
+        return entry.get("checksum") if entry else None
+    
+    def _archive_query(self, older_than_days):
+        """Return (cutoff, query) selecting the ENDED polls that ended before the cutoff"""
+        cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=older_than_days)
+        return cutoff, {"status": "ENDED", "endDate": {"$lt": cutoff}}
+    
+    @operation(ArchiveResult)
+    def archive(self, result, older_than_days, batch_size=ARCHIVE_BATCH_SIZE, progress=None):
+        """Move ENDED polls older than a cutoff, with their votes, to compressed archive files
+        
+        progress(result) is called after each deleted batch.
+        """
+        import gzip
+        from bson import BSON
+        os.makedirs(ARCHIVE_DIR, exist_ok=True)
+        
+        result.cutoff, query = self._archive_query(older_than_days)
+        result.archive_dir = ARCHIVE_DIR
+        result.counts = {"candidates": self.db.polls.count_documents(query), "polls": 0, "votes": 0}
+        if result.counts["candidates"] == 0:
+            return
+        
+        pending_ids = []
+        with open(ARCHIVE_INDEX, "a") as index:
+            # Stream polls in _id order; each poll's votes stream straight into its archive file
+            cursor = self.db.polls.find(query, no_cursor_timeout=True).sort("_id", 1).batch_size(batch_size)
+            try:
+                for poll in cursor:
+                    poll_id = str(poll["_id"])
+                    archive_file = os.path.join(ARCHIVE_DIR, f"poll_{poll_id}.bson.gz")
+                    tmp_file = archive_file + ".tmp"
+                    
+                    # Payload is the poll document followed by its votes, as raw BSON
+                    vote_count = 0
+                    with gzip.open(tmp_file, "wb", compresslevel=6) as f:
+                        f.write(BSON.encode(poll))
+                        for vote in self.db.votes.find({"pollId": poll["_id"]}).batch_size(1000):
+                            f.write(BSON.encode(vote))
+                            vote_count += 1
+                    os.replace(tmp_file, archive_file)
+                    
+                    entry = {field: poll.get(field) for field in ARCHIVE_INDEX_FIELDS}
+                    entry.update({
+                        "_id": poll_id,
+                        "voteCount": vote_count,
+                        "file": os.path.basename(archive_file),
+                        "size": os.path.getsize(archive_file),
+                        "archivedAt": datetime.datetime.utcnow()
+                    })
+                    index.write(json.dumps(entry, cls=JSONEncoder) + "\n")
+                    
+                    pending_ids.append(poll["_id"])
+                    result.counts["polls"] += 1
+                    result.counts["votes"] += vote_count
+                    
+                    if len(pending_ids) >= batch_size:
+                        self._delete_archived_batch(index, pending_ids)
+                        pending_ids = []
+                        if progress:
+                            progress(result)
+            finally:
+                cursor.close()
+            
+            if pending_ids:
+                self._delete_archived_batch(index, pending_ids)
+    
+    def _delete_archived_batch(self, index, poll_ids):
+        """Delete a batch of archived polls and their votes once the archive index is durable"""
+        index.flush()
+        os.fsync(index.fileno())
+        
+        self.db.votes.delete_many({"pollId": {"$in": poll_ids}})
+        self.db.polls.delete_many({"_id": {"$in": poll_ids}})
+    
+    @operation(RehydrateResult)
+    def rehydrate(self, result, poll_id, batch_size=1000):
+        """Reload a single archived poll and its votes into MongoDB"""
+        import gzip
+        from bson import decode_file_iter
+        result.poll_id = poll_id
+        entries = self._read_archive_index()
+        entry = entries.get(poll_id)
+        if not entry:
+            result.found = False
+            result.fail(f"Poll with ID {poll_id} not found in archive.")
+            return
+        result.found = True
+        
+        archive_file = os.path.join(ARCHIVE_DIR, entry["file"])
+        if not os.path.exists(archive_file):
+            result.fail(f"Archive file not found: {archive_file}")
+            return
+        
+        with gzip.open(archive_file, "rb") as f:
+            documents = decode_file_iter(f)
+            poll = next(documents)
+            
+            # Replace rather than insert so an interrupted rehydrate can simply be re-run
+            self.db.polls.replace_one({"_id": poll["_id"]}, poll, upsert=True)
+            self.db.votes.delete_many({"pollId": poll["_id"]})
+            
+            result.counts["votes"] = 0
+            batch = []
+            for vote in documents:
+                batch.append(vote)
+                if len(batch) >= batch_size:
+                    self.db.votes.insert_many(batch, ordered=False)
+                    result.counts["votes"] += len(batch)
+                    batch = []
+            if batch:
+                self.db.votes.insert_many(batch, ordered=False)
+                result.counts["votes"] += len(batch)
+        
+        # Poll is live again: drop it from the index, then remove its payload
+        del entries[poll_id]
+        self._write_archive_index(entries)
+        os.remove(archive_file)
+    
+    @operation(RollupResult)
+    def rollup(self, result):
+        """Incrementally aggregate new votes into per-poll hourly and daily vote_rollups
+        
+        Rollup rows are keyed by (poll, granularity, bucket, option, network); rows with
+        option None count ballots, the others count option selections. Each run only
+        aggregates votes with _id in (watermark, upper]. The planned upper bound is saved
+        as pendingUpper before any row is written, and every row remembers the bound it
+        was last incremented to, so a run after a crash first finishes exactly the
+        interrupted range and never counts a vote twice.
+        """
+        from bson import ObjectId
+        result.counts = {"votes": 0, "rows": 0}
+        result.resumed = False
+        while True:
+            state = self.db.rollup_state.find_one({"_id": "vote_rollups"}) or {}
+            watermark = result.watermark = state.get("watermark")
+            upper = state.get("pendingUpper")
+            resuming = upper is not None
+            
+            if not resuming:
+                # Upper bound for this run: the newest vote, but not newer than the safety lag
+                newest = self.db.votes.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+                if not newest:
+                    break
+                lag_bound = ObjectId.from_datetime(datetime.datetime.now(datetime.timezone.utc) -
+                                                   datetime.timedelta(seconds=ROLLUP_SAFETY_LAG_SECONDS))
+                upper = min(newest["_id"], lag_bound)
+                if watermark is not None and upper <= watermark:
+                    break
+                self.db.rollup_state.update_one({"_id": "vote_rollups"}, {"$set": {"pendingUpper": upper}},
+                                                upsert=True)
+            else:
+                result.resumed = True
+            
+            range_votes, range_rows = self._rollup_range(watermark, upper)
+            result.counts["votes"] += range_votes
+            result.counts["rows"] += range_rows
+            self.db.rollup_state.update_one({"_id": "vote_rollups"},
+                                            {"$set": {"watermark": upper, "updatedAt": datetime.datetime.utcnow()},
+                                             "$unset": {"pendingUpper": ""}},
+                                            upsert=True)
+            result.watermark = upper
+            # After finishing an interrupted range, go on with a fresh one
+            if not resuming:
+                break
+        
+        if result.counts["rows"]:
+            self.db.vote_rollups.create_index([("pollId", 1), ("granularity", 1), ("bucket", 1)])
+    
+    def _rollup_range(self, watermark, upper):
+        """Add the votes with _id in (watermark, upper] to vote_rollups, returning (votes, rows)"""
+        from pymongo import UpdateOne
+        from pymongo.errors import BulkWriteError
+        id_range = {"$lte": upper}
+        if watermark is not None:
+            id_range["$gt"] = watermark
+        
+        # Aggregate new votes server-side into hourly (poll, option, network) counts
+        vote_time = {"$ifNull": ["$timestamp", {"$toDate": "$_id"}]}
+        pipeline = [
+            {"$match": {"_id": id_range}},
+            {"$project": {
+                "pollId": 1,
+                "network": {"$ifNull": ["$network", "mainnet"]},
+                "hour": {"$dateFromParts": {
+                    "year": {"$year": vote_time}, "month": {"$month": vote_time},
+                    "day": {"$dayOfMonth": vote_time}, "hour": {"$hour": vote_time}
+                }},
+                "selections": VOTE_SELECTIONS
+            }},
+            # A null entry stands for the ballot itself
+            {"$project": {"pollId": 1, "network": 1, "hour": 1,
+                          "selections": {"$concatArrays": [[None], "$selections"]}}},
+            {"$unwind": "$selections"},
+            {"$group": {
+                "_id": {"p": "$pollId", "t": "$hour", "o": "$selections", "n": "$network"},
+                "count": {"$sum": 1}
+            }}
+        ]
+        
+        # Fold hourly counts into daily buckets client-side (the result is already small)
+        increments = {}
+        new_votes = 0
+        for row in self.db.votes.aggregate(pipeline, allowDiskUse=True):
+            key = row["_id"]
+            if key["o"] is None:
+                new_votes += row["count"]
+            for granularity in ROLLUP_GRANULARITIES:
+                bucket = key["t"] if granularity == "hour" else key["t"].replace(hour=0)
+                row_id = {"p": key["p"], "g": granularity, "t": bucket, "o": key["o"], "n": key["n"]}
+                row_key = (key["p"], granularity, bucket, key["o"], key["n"])
+                if row_key in increments:
+                    increments[row_key][1] += row["count"]
+                else:
+                    increments[row_key] = [row_id, row["count"]]
+        
+        operations = []
+        for row_id, count in increments.values():
+            operations.append(UpdateOne(
+                {"_id": row_id, "watermark": {"$lt": upper}},
+                {"$inc": {"count": count},
+                 "$set": {"watermark": upper},
+                 "$setOnInsert": {"pollId": row_id["p"], "granularity": row_id["g"], "bucket": row_id["t"],
+                                  "option": row_id["o"], "network": row_id["n"]}},
+                upsert=True
+            ))
+        
+        for start in range(0, len(operations), 1000):
+            try:
+                self.db.vote_rollups.bulk_write(operations[start:start + 1000], ordered=False)
+            except BulkWriteError as e:
+                # Duplicate keys mean the row already includes this range (an interrupted run)
+                if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                    raise
+        return new_votes, len(operations)
+    
+    @operation(ImportResult)
+    def import_file(self, result, input_file, collection, fmt=None, batch_size=IMPORT_BATCH_SIZE, workers=None,
+                    progress=None):
+        """Append polls or votes from an NDJSON or CSV file using pipelined unordered batches
+        
+        The file is read in batch-sized chunks that are parsed and validated on a
+        process pool while earlier batches are being inserted by a small pool of
+        writer threads; at most a few batches per stage are kept in flight. Rows that
+        fail validation or insertion are written to <input>.rejected.ndjson.
+        progress(result) is called as parsed batches complete.
+        """
+        import csv
+        from collections import deque
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+        from bson.errors import InvalidDocument
+        from pymongo.errors import BulkWriteError, DocumentTooLarge, PyMongoError
+        if not os.path.exists(input_file):
+            result.fail(f"Import file not found: {input_file}")
+            return
+        
+        fmt = fmt or ("csv" if input_file.lower().endswith(".csv") else "ndjson")
+        workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        rejected_file = input_file + ".rejected.ndjson"
+        target = self.db[collection]
+        
+        result.collection = collection
+        result.counts = {"imported": 0, "rejected": 0}
+        result.dropped_fields = {}
+        
+        def chunks():
+            with open(input_file, "r", newline="" if fmt == "csv" else None) as f:
+                rows = csv.DictReader(f) if fmt == "csv" else f
+                chunk = []
+                # Line 1 of a CSV file is its header
+                for line_number, row in enumerate(rows, 2 if fmt == "csv" else 1):
+                    if fmt == "ndjson" and not row.strip():
+                        continue
+                    chunk.append((line_number, row))
+                    if len(chunk) >= batch_size:
+                        yield chunk
+                        chunk = []
+                if chunk:
+                    yield chunk
+        
+        def insert(documents, line_numbers):
+            try:
+                inserted = target.insert_many(documents, ordered=False)
+                return len(inserted.inserted_ids), []
+            except BulkWriteError as e:
+                failures = [{"line": line_numbers[error["index"]], "error": error["errmsg"]}
+                            for error in e.details["writeErrors"]]
+                return e.details["nInserted"], failures
+            except (InvalidDocument, DocumentTooLarge):
+                # The whole batch failed to encode; insert one by one to find the bad rows
+                inserted = 0
+                failures = []
+                for document, line_number in zip(documents, line_numbers):
+                    try:
+                        target.insert_one(document)
+                        inserted += 1
+                    except (InvalidDocument, DocumentTooLarge, PyMongoError) as e:
+                        failures.append({"line": line_number, "error": str(e)})
+                return inserted, failures
+        
+        with open(rejected_file, "w") as rejected, \
+             ProcessPoolExecutor(max_workers=workers) as parse_pool, \
+             ThreadPoolExecutor(max_workers=IMPORT_WRITERS) as write_pool:
+            
+            def reject(records):
+                for record in records:
+                    rejected.write(json.dumps(record, cls=JSONEncoder) + "\n")
+                result.counts["rejected"] += len(records)
+            
+            def finish_write(future):
+                inserted, failures = future.result()
+                result.counts["imported"] += inserted
+                reject(failures)
+            
+            def finish_parse(future):
+                documents, line_numbers, failures, dropped = future.result()
+                reject(failures)
+                for field, count in dropped.items():
+                    result.dropped_fields[field] = result.dropped_fields.get(field, 0) + count
+                if documents:
+                    writing.append(write_pool.submit(insert, documents, line_numbers))
+                # Backpressure: wait for the oldest insert once enough are in flight
+                while len(writing) > IMPORT_WRITERS * 2:
+                    finish_write(writing.popleft())
+            
+            parsing = deque()
+            writing = deque()
+            for chunk in chunks():
+                parsing.append(parse_pool.submit(_parse_import_chunk, collection, fmt, chunk))
+                # Bound parsed-but-unwritten batches so memory stays flat on huge files
+                while len(parsing) > workers * 2:
+                    finish_parse(parsing.popleft())
+                    if progress:
+                        progress(result)
+            while parsing:
+                finish_parse(parsing.popleft())
+            while writing:
+                finish_write(writing.popleft())
+        
+        if result.counts["rejected"] == 0:
+            os.remove(rejected_file)
+        else:
+            result.rejected_file = rejected_file
+        if result.dropped_fields:
+            fields = ", ".join(f"{field} ({count})" for field, count in sorted(result.dropped_fields.items()))
+            result.warnings.append(f"Dropped fields not in the {collection} model: {fields}")
+    
+    def _count_selections(self, poll_ids):
+        """Count ballots and per-option selections for a batch of polls in one aggregation
+        
+        Returns ({poll_id: ballots}, {poll_id: {option_text: selections}}).
+        """
+        counts = {}
+        ballots = {}
+        pipeline = [
+            {"$match": {"pollId": {"$in": poll_ids}}},
+            {"$project": {"pollId": 1, "selections": {"$concatArrays": [[None], VOTE_SELECTIONS]}}},
+            {"$unwind": "$selections"},
+            {"$group": {"_id": {"p": "$pollId", "o": "$selections"}, "count": {"$sum": 1}}}
+        ]
+        for row in self.db.votes.aggregate(pipeline):
+            if row["_id"]["o"] is None:
+                ballots[row["_id"]["p"]] = row["count"]
+            else:
+                counts.setdefault(row["_id"]["p"], {})[row["_id"]["o"]] = row["count"]
+        return ballots, counts
+    
+    def _normalize_poll(self, poll, option_counts, ballot_count, now):
+        """Return the $set changes that bring a poll to the Poll model shape, or {}"""
+        changes = {}
+        
+        options = poll.get("options")
+        if isinstance(options, list) and any(not isinstance(o, dict) or "votes" not in o for o in options):
+            normalized = []
+            for option in options:
+                if isinstance(option, dict):
+                    normalized.append(dict(option, votes=option.get("votes", option_counts.get(option.get("text"), 0))))
+                else:
+                    normalized.append({"text": option, "votes": option_counts.get(option, 0)})
+            changes["options"] = normalized
+        
+        if "totalVotes" not in poll:
+            changes["totalVotes"] = ballot_count
+        
+        if not poll.get("status"):
+            start, end = poll.get("startDate"), poll.get("endDate")
+            if isinstance(end, datetime.datetime) and end < now:
+                changes["status"] = "ENDED"
+            elif isinstance(start, datetime.datetime) and start > now:
+                changes["status"] = "PENDING"
+            elif isinstance(start, datetime.datetime):
+                changes["status"] = "ACTIVE"
+            else:
+                changes["status"] = "PENDING"
+        
+        return changes
+    
+    @operation(MigrationResult)
+    def migrate(self, result, dry_run=False, batch_size=MIGRATION_BATCH_SIZE, pause_ms=MIGRATION_PAUSE_MS,
+                restart=False, progress=None):
+        """Normalize poll options to {text, votes} and fill in missing totalVotes/status
+        
+        Polls are scanned in _id order in batches; vote counts for a batch come from one
+        aggregation over the votes collection. Each update only applies if the poll's
+        options are unchanged since they were read, so concurrent API writes win. The
+        last processed _id is checkpointed after every batch (except in dry-run mode),
+        and the pause between batches keeps load on a live cluster low. In dry-run
+        mode, `samples` holds (poll id, changed fields) for the first polls that would
+        change. progress(result) is called after each batch.
+        """
+        import time
+        from pymongo import UpdateOne
+        state = self.db.migration_state.find_one({"_id": "normalize_poll_options"}) or {}
+        last_id = None if restart else state.get("lastId")
+        result.dry_run = dry_run
+        result.resumed_after = last_id
+        result.samples = []
+        result.counts = {"scanned": 0, "updated": 0, "conflicts": 0}
+        
+        while True:
+            query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+            polls = list(self.db.polls.find(query).sort("_id", 1).limit(batch_size))
+            if not polls:
+                break
+            
+            # Count ballots and option selections for the whole batch in one aggregation
+            ballots, counts = self._count_selections([poll["_id"] for poll in polls])
+            
+            now = datetime.datetime.utcnow()
+            operations = []
+            for poll in polls:
+                changes = self._normalize_poll(poll, counts.get(poll["_id"], {}), ballots.get(poll["_id"], 0), now)
+                if not changes:
+                    continue
+                if dry_run:
+                    if len(result.samples) < 10:
+                        result.samples.append((poll["_id"], sorted(changes)))
+                    result.counts["updated"] += 1
+                    continue
+                operations.append(UpdateOne({"_id": poll["_id"], "options": poll.get("options")}, {"$set": changes}))
+            
+            batch_updated = 0
+            if operations:
+                written = self.db.polls.bulk_write(operations, ordered=False)
+                batch_updated = written.modified_count
+                result.counts["updated"] += batch_updated
+                result.counts["conflicts"] += len(operations) - written.matched_count
+            
+            result.counts["scanned"] += len(polls)
+            last_id = polls[-1]["_id"]
+            if not dry_run:
+                self.db.migration_state.update_one(
+                    {"_id": "normalize_poll_options"},
+                    {"$set": {"lastId": last_id, "updatedAt": datetime.datetime.utcnow()},
+                     "$inc": {"updated": batch_updated}},
+                    upsert=True
+                )
+            if progress:
+                progress(result)
+            
+            if pause_ms:
+                time.sleep(pause_ms / 1000)
+        
+        if result.counts["conflicts"]:
+            result.warnings.append(f"{result.counts['conflicts']} polls changed during migration and were skipped; "
+                                   f"re-run with --restart to pick them up.")
+
+class AsyncDBCore:
+    """asyncio front end for DBCore: operations run on a thread pool over one shared client
+    
+        async with AsyncDBCore(DBCore(uri="mongodb://host-a/partivotes")) as a, \\
+                   AsyncDBCore(DBCore(uri="mongodb://host-b/partivotes")) as b:
+            health_a, health_b = await asyncio.gather(a.health(), b.health())
+    """
+    
+    # DBCore operations exposed as coroutines
+    OPERATIONS = ("connect", "health", "find_polls", "get_poll", "remove_poll", "remove_all_polls",
+                  "backup", "export_csv", "sample_distribution", "restore", "archive", "rehydrate",
+                  "rollup", "import_file", "migrate")
+    
+    def __init__(self, core=None, max_workers=ASYNC_WORKERS):
+        """Initialize with an existing core (its client's connection pool is shared)"""
+        from concurrent.futures import ThreadPoolExecutor
+        self.core = core or DBCore()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dbcore")
+    
+    async def run(self, func, *args, **kwargs):
+        """Run a blocking callable on the pool"""
+        import asyncio
+        import functools
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+    
+    def __getattr__(self, name):
+        if name in self.OPERATIONS:
+            method = getattr(self.core, name)
+            return lambda *args, **kwargs: self.run(method, *args, **kwargs)
+        raise AttributeError(name)
+    
+    def close(self):
+        """Shut down the pool (the client stays open for the core's owner)"""
+        self.executor.shutdown(wait=True)
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+class DBManager(DBCore):
+    """Database manager for PartiVotes MongoDB: the CLI presentation layer over DBCore"""
+    
+    def connect(self):
+        """Connect to MongoDB"""
+        result = super().connect()
+        if not result:
+            print(f"{COLORS['RED']}❌ Error connecting to MongoDB: {result.errors[0]}{COLORS['ENDC']}")
+            return False
+        print(f"{COLORS['GREEN']}✅ Connected to MongoDB database: {result.database}{COLORS['ENDC']}")
+        return True
+    
+    def _print_warnings(self, result):
+        """Print a result's warnings"""
+        for warning in result.warnings:
+            print(f"{COLORS['YELLOW']}⚠️ {warning}{COLORS['ENDC']}")
+    
+    def check_health(self, quick=False):
+        """Check database health and connection status"""
+        result = self.health(quick)
+        if not result:
+            print(f"{COLORS['RED']}❌ Database health check failed: {result.errors[0]}{COLORS['ENDC']}")
+            return False
+        
+        # Print health information
+        print(f"{COLORS['GREEN']}✅ MongoDB connection is healthy{COLORS['ENDC']}")
+        if quick:
+            print(f"\n{COLORS['BOLD']}Collection Statistics (estimated):{COLORS['ENDC']}")
+            for collection, stats in result.collections.items():
+                print(f"  {collection.capitalize()}: ~{stats['count']:,} documents, "
+                      f"{stats['size'] / (1024*1024):.2f} MB data, "
+                      f"{stats['storageSize'] / (1024*1024):.2f} MB storage, "
+                      f"{stats['indexes']} indexes")
+            
+            for collection, fields in result.distributions.items():
+                for field, distribution in fields.items():
+                    if not distribution:
+                        continue
+                    print(f"\n{COLORS['BOLD']}{collection.capitalize()} by {field}:{COLORS['ENDC']}")
+                    for value, estimate in distribution.items():
+                        print(f"  {value}: {format_estimate(estimate)}")
+            if result.invalid_polls_estimate and result.invalid_polls_estimate[2]:
+                print(f"\n{COLORS['YELLOW']}⚠️ Polls with missing required fields: "
+                      f"{format_estimate(result.invalid_polls_estimate)}{COLORS['ENDC']}")
+            
+            print(f"\n(Sampled {QUICK_SAMPLE_SIZE} documents per collection; run without --quick for exact counts.)")
+            return True
+        
+        print(f"\n{COLORS['BOLD']}Database Statistics:{COLORS['ENDC']}")
+        print(f"  Database Size: {result.database['dataSize'] / (1024*1024):.2f} MB")
+        print(f"  Storage Size: {result.database['storageSize'] / (1024*1024):.2f} MB")
+        print(f"  Number of Collections: {result.database['collections']}")
+        
+        print(f"\n{COLORS['BOLD']}Collection Statistics:{COLORS['ENDC']}")
+        print(f"  Polls: {result.counts['polls']} documents")
+        print(f"  Votes: {result.counts['votes']} documents")
+        
+        if result.invalid_polls:
+            print(f"\n{COLORS['YELLOW']}⚠️ Found {len(result.invalid_polls)} polls with missing required fields.{COLORS['ENDC']}")
+            for poll_id in result.invalid_polls:
+                print(f"  Poll ID: {poll_id} - Missing fields")
+        
+        return True
+    
+    def list_polls(self, poll_type=None, status=None, limit=10, creator=None, search_term=None, sort_by="createdAt", sort_order=-1, include_archived=False, quick=False):
+        """List polls with enhanced filtering options"""
+        from tabulate import tabulate
+        # Make sure we're connected to the database
+        if not self.client:
+            if not self.connect():
+                print(f"{COLORS['RED']}❌ Not connected to MongoDB. Please check your connection.{COLORS['ENDC']}")
+                return []
+        
+        result = self.find_polls(poll_type, status, limit, creator, search_term, sort_by, sort_order,
+                                 include_archived, quick)
+        for warning in result.warnings:
+            print(f"{COLORS['RED']}❌ {warning}{COLORS['ENDC']}")
+        if not result:
+            print(f"{COLORS['RED']}❌ Error listing polls: {result.errors[0]}{COLORS['ENDC']}")
+            return []
+        
+        polls = result.polls
+        if not polls:
+            print(f"{COLORS['YELLOW']}No polls found matching the criteria.{COLORS['ENDC']}")
+            return []
+        
+        # Prepare table data
+        table_data = []
+        for i, poll in enumerate(polls, 1):
+            # Add index for easier selection
+            created_at = poll.get("createdAt", "N/A")
+            if created_at != "N/A":
+                try:
+                    created_at = created_at.strftime("%Y-%m-%d %H:%M")
+                except:
+                    # Handle case where createdAt is not a datetime object
+                    created_at = str(created_at)
+            
+            status_label = poll.get("status", "Unknown")
+            if poll.get("archived"):
+                status_label += " (archived)"
+            
+            table_data.append([
+                i,  # Add index number for easier selection
+                str(poll["_id"]),
+                poll.get("title", "No Title"),
+                poll.get("type", "Unknown"),
+                status_label,
+                poll.get("totalVotes", 0),
+                poll.get("creator", "Unknown"),
+                created_at
+            ])
+        
+        # Print table
+        headers = ["#", "ID", "Title", "Type", "Status", "Votes", "Creator", "Created At"]
+        print(tabulate(table_data, headers=headers, tablefmt="grid"))
+        print(f"Total: {len(polls)} polls")
+        if result.matched_estimate:
+            print(f"Matching in database: {format_estimate(result.matched_estimate)}")
+        
+        return polls
+    
+    def view_poll(self, poll_id):
+        """View details of a specific poll"""
+        result = self.get_poll(poll_id)
+        if not result:
+            if result.found is False:
+                print(f"{COLORS['YELLOW']}{result.errors[0]}{COLORS['ENDC']}")
+            else:
+                print(f"{COLORS['RED']}❌ Error viewing poll: {result.errors[0]}{COLORS['ENDC']}")
+            return None
+        
+        poll = result.poll
+        try:
+            # Print poll details
+            print("\n" + "="*50)
+            print(f"{COLORS['BOLD']}Poll ID:{COLORS['ENDC']} {poll_id}")
+            print(f"{COLORS['BOLD']}Title:{COLORS['ENDC']} {poll['title']}")
+            print(f"{COLORS['BOLD']}Description:{COLORS['ENDC']} {poll['description']}")
+            print(f"{COLORS['BOLD']}Type:{COLORS['ENDC']} {poll['type']}")
+            print(f"{COLORS['BOLD']}Status:{COLORS['ENDC']} {poll['status']}")
+            print(f"{COLORS['BOLD']}Creator:{COLORS['ENDC']} {poll['creator']}")
+            print(f"{COLORS['BOLD']}Total Votes:{COLORS['ENDC']} {poll['totalVotes']}")
+            print(f"{COLORS['BOLD']}Created:{COLORS['ENDC']} {poll['createdAt'].strftime('%Y-%m-%d %H:%M') if 'createdAt' in poll else 'N/A'}")
+            print(f"{COLORS['BOLD']}Start Date:{COLORS['ENDC']} {poll['startDate'].strftime('%Y-%m-%d %H:%M') if 'startDate' in poll else 'N/A'}")
+            print(f"{COLORS['BOLD']}End Date:{COLORS['ENDC']} {poll['endDate'].strftime('%Y-%m-%d %H:%M') if 'endDate' in poll else 'N/A'}")
+            
+            # Print options
+            print(f"\n{COLORS['BOLD']}Options:{COLORS['ENDC']}")
+            for i, option in enumerate(poll["options"], 1):
+                text, votes = option_text_votes(option)
+                print(f"  {i}. {text} - {votes} votes")
+            
+            print(f"\n{COLORS['BOLD']}Votes:{COLORS['ENDC']} {result.counts['votes']}")
+            
+            print("="*50 + "\n")
+            
+            return poll
+        except Exception as e:
+            print(f"{COLORS['RED']}❌ Error viewing poll: {e}{COLORS['ENDC']}")
+            return None
+    
+    def delete_poll(self, poll_id, force=False):
+        """Delete a poll and its votes"""
+        # Make sure we're connected to the database
+        if not self.client:
+            if not self.connect():
+                print(f"{COLORS['RED']}❌ Not connected to MongoDB. Please check your connection.{COLORS['ENDC']}")
+                return False
+        
+        # Validate poll_id format
+        if not poll_id or not isinstance(poll_id, str) or len(poll_id) != 24:
+            print(f"{COLORS['YELLOW']}Invalid poll ID format: {poll_id}{COLORS['ENDC']}")
+            return False
+        
+        # Get poll
+        found = self.get_poll(poll_id)
+        if not found:
+            print(f"{COLORS['YELLOW']}{found.errors[0] if found.found is False else f'Invalid poll ID: {poll_id} - {found.errors[0]}'}{COLORS['ENDC']}")
+            return False
+        poll = found.poll
+        
+        # Confirm deletion
+        if not force:
+            print(f"\n{COLORS['BOLD']}Poll:{COLORS['ENDC']} {poll.get('title', 'Untitled')}")
+            print(f"{COLORS['BOLD']}ID:{COLORS['ENDC']} {poll_id}")
+            print(f"{COLORS['BOLD']}Total Votes:{COLORS['ENDC']} {poll.get('totalVotes', 0)}")
+            confirm = input(f"\n{COLORS['RED']}⚠️ Are you sure you want to delete this poll? This action cannot be undone. (y/N):{COLORS['ENDC']} ")
+            if confirm.lower() != "y":
+                print(f"{COLORS['YELLOW']}Deletion cancelled.{COLORS['ENDC']}")
+                return False
+        
+        result = self.remove_poll(poll_id)
+        self._print_warnings(result)
+        if not result:
+            print(f"{COLORS['RED']}❌ Error deleting poll: {result.errors[0]}{COLORS['ENDC']}")
+            return False
+        print(f"{COLORS['GREEN']}✅ Poll deleted successfully.{COLORS['ENDC']}")
+        print(f"{COLORS['GREEN']}✅ {result.counts['votes']} votes deleted.{COLORS['ENDC']}")
+        return True
+    
+    def delete_all_polls(self, force=False):
+        """Delete all polls and votes"""
+        try:
+            # Confirm deletion
+            if not force:
+                poll_count = self.db.polls.count_documents({})
+                vote_count = self.db.votes.count_documents({})
+                print(f"\n{COLORS['RED']}⚠️ This will delete ALL {poll_count} polls and {vote_count} votes.{COLORS['ENDC']}")
+                confirm = input("Are you sure you want to proceed? This action cannot be undone. (y/N): ")
+                if confirm.lower() != "y":
+                    print(f"{COLORS['YELLOW']}Deletion cancelled.{COLORS['ENDC']}")
+                    return False
+        except Exception as e:
+            print(f"{COLORS['RED']}❌ Error deleting polls: {e}{COLORS['ENDC']}")
+            return False
+        
+        result = self.remove_all_polls()
+        if not result:
+            print(f"{COLORS['RED']}❌ Error deleting polls: {result.errors[0]}{COLORS['ENDC']}")
+            return False
+        print(f"{COLORS['GREEN']}✅ {result.counts['polls']} polls deleted.{COLORS['ENDC']}")
+        print(f"{COLORS['GREEN']}✅ {result.counts['votes']} votes deleted.{COLORS['ENDC']}")
+        return True
+    
+    def create_backup(self, backup_file=None, offsite=False, max_bytes_per_sec=None):
+        """Create a backup of the database, optionally streaming it to offsite storage"""
+        result = self.backup(backup_file, offsite, max_bytes_per_sec)
+        if not result:
+            print(f"{COLORS['RED']}❌ Error creating backup: {result.errors[0]}{COLORS['ENDC']}")
+            return None
+        
+        print(f"{COLORS['GREEN']}✅ Backup created: {result.backup_file}{COLORS['ENDC']}")
+        print(f"   Polls: {result.counts['polls']}")
+        print(f"   Votes: {result.counts['votes']}")
+        if result.offsite_url:
+            print(f"{COLORS['GREEN']}✅ Uploaded offsite: {result.offsite_url}{COLORS['ENDC']}")
+        for removed in result.removed_backups or []:
+            print(f"{COLORS['YELLOW']}🔄 Removed old backup: {removed}{COLORS['ENDC']}")
+        self._print_warnings(result)
+        return result.backup_file
+    
+    def export_polls_to_csv(self, output_file=None, quick=False):
+        """Export polls to CSV format for external analysis"""
+        result = self.export_csv(output_file, quick)
+        if not result:
+            if result.counts.get("polls") == 0:
+                print(f"{COLORS['YELLOW']}{result.errors[0]}{COLORS['ENDC']}")
+            else:
+                print(f"{COLORS['RED']}❌ Error exporting polls: {result.errors[0]}{COLORS['ENDC']}")
+            return None
+        print(f"{COLORS['GREEN']}✅ Exported {result.counts['polls']} polls to: {result.output_file}{COLORS['ENDC']}")
+        return result.output_file
+    
+    def offsite_upload(self, backup_file, max_bytes_per_sec=None):
+        """Upload an existing local backup offsite, resuming an interrupted upload if there is one"""
+        try:
+            if not os.path.exists(backup_file):
+                print(f"{COLORS['RED']}❌ Backup file not found: {backup_file}{COLORS['ENDC']}")
+                return None
+            
+            uploader = self._start_offsite_upload(backup_file, max_bytes_per_sec)
+            if uploader.done_parts:
+                print(f"{COLORS['YELLOW']}Resuming offsite upload ({len(uploader.done_parts)} parts already uploaded).{COLORS['ENDC']}")
+            with open(backup_file, "rb") as f:
+                part_number = 0
+                while True:
+                    part_number += 1
+                    if part_number in uploader.done_parts:
+                        # Already uploaded: skip the part without reading it
+                        f.seek(uploader.part_size, os.SEEK_CUR)
+                        uploader.skip_part()
+                        continue
+                    chunk = f.read(uploader.part_size)
+                    if not chunk:
+                        break
+                    uploader.write(chunk)
+            
+            try:
+                url = self._finish_offsite_upload(uploader, backup_file)
+            except Exception as e:
+                print(f"{COLORS['YELLOW']}⚠️ Offsite upload failed: {e}. Resume it with offsite-upload.{COLORS['ENDC']}")
+                return None
+            print(f"{COLORS['GREEN']}✅ Uploaded offsite: {url}{COLORS['ENDC']}")
+            if os.path.dirname(os.path.abspath(backup_file)) == BACKUP_DIR:
+                catalog = self._read_backup_catalog()
+                for entry in catalog:
+                    if entry["file"] == os.path.basename(backup_file):
+                        entry["offsite"] = url
+                self._write_backup_catalog(catalog)
+            return url
+        except Exception as e:
+            print(f"{COLORS['RED']}❌ Error uploading backup offsite: {e}{COLORS['ENDC']}")
+            return None
+    
+    def list_offsite_backups(self):
+        """List backups stored offsite"""
+        from tabulate import tabulate
+        try:
+            client = self._offsite_client()
+            prefix = self._offsite_key("")
+            
+            objects = []
+            for page in client.get_paginator("list_objects_v2").paginate(Bucket=OFFSITE_S3_BUCKET, Prefix=prefix):
+                objects.extend(obj for obj in page.get("Contents", []) if obj["Key"].endswith(".json"))
+            
+            if not objects:
+                print(f"{COLORS['YELLOW']}No offsite backups found.{COLORS['ENDC']}")
+                return []
+            
+            objects.sort(key=lambda obj: obj["LastModified"], reverse=True)
+            table_data = []
+            for i, obj in enumerate(objects, 1):
+                table_data.append([i, obj["LastModified"].strftime("%Y-%m-%d %H:%M:%S"),
+                                   f"{obj['Size'] / 1024:.1f} KB", f"s3://{OFFSITE_S3_BUCKET}/{obj['Key']}"])
+            
+            headers = ["#", "Uploaded", "Size", "URL"]
+            print(tabulate(table_data, headers=headers, tablefmt="grid"))
+            
+            return [f"s3://{OFFSITE_S3_BUCKET}/{obj['Key']}" for obj in objects]
+        except Exception as e:
+            print(f"{COLORS['RED']}❌ Error listing offsite backups: {e}{COLORS['ENDC']}")
+            return []
+    
+    def restore_backup(self, backup_file, force=False):
+        """Restore database from backup (a local path or an s3:// URL)"""
+        def confirm(result):
+            if force:
+                return True
+            print(f"\n{COLORS['RED']}⚠️ This will overwrite your existing database with {result.counts['polls']} polls and {result.counts['votes']} votes.{COLORS['ENDC']}")
+            print(f"Current database has {result.existing['polls']} polls and {result.existing['votes']} votes.")
+            return input("Are you sure you want to proceed? (y/N): ").lower() == "y"
+        
+        result = self.restore(backup_file, confirm)
+        if result.safety_backup:
+            print(f"{COLORS['YELLOW']}Safety backup created before restore: {result.safety_backup}{COLORS['ENDC']}")
+        if not result:
+            print(f"{COLORS['RED']}❌ Error restoring backup: {result.errors[0]}{COLORS['ENDC']}")
+            return False
+        if result.cancelled:
+            print(f"{COLORS['YELLOW']}Restore cancelled.{COLORS['ENDC']}")
+            return False
+        print(f"{COLORS['GREEN']}✅ Restored {result.counts['polls']} polls and {result.counts['votes']} votes.{COLORS['ENDC']}")
+        if result.verified is None:
+            print(f"{COLORS['YELLOW']}⚠️ No checksum recorded for this backup; it was restored unverified.{COLORS['ENDC']}")
+        self._print_warnings(result)
+        return True
+    
+    def list_backups(self, remote=False):
+        """List available backups from the backup catalog (or from offsite storage)"""
+        from tabulate import tabulate
+        if remote:
+            return self.list_offsite_backups()
+        try:
+            # Newest first
+            warnings = []
+            catalog = sorted(self._read_backup_catalog(warnings), key=lambda entry: entry["createdAt"], reverse=True)
+            for warning in warnings:
+                print(f"{COLORS['YELLOW']}⚠️ {warning}{COLORS['ENDC']}")
+            
+            if not catalog:
+                print(f"{COLORS['YELLOW']}No backups found.{COLORS['ENDC']}")
+                return []
+            
+            # Print table
+            table_data = []
+            for i, entry in enumerate(catalog, 1):
+                formatted_time = datetime.datetime.fromisoformat(entry["createdAt"]).strftime("%Y-%m-%d %H:%M:%S")
+                table_data.append([
+                    i,
+                    formatted_time,
+                    f"{entry['size'] / 1024:.1f} KB",
+                    entry["polls"] if entry["polls"] is not None else "?",
+                    entry["votes"] if entry["votes"] is not None else "?",
+                    entry["kind"],
+                    entry["file"]
+                ])
+            
+            headers = ["#", "Created", "Size", "Polls", "Votes", "Kind", "Filename"]
+            print(tabulate(table_data, headers=headers, tablefmt="grid"))
+            
+            return [entry["file"] for entry in catalog]
+        except Exception as e:
+            print(f"{COLORS['RED']}❌ Error listing backups: {e}{COLORS['ENDC']}")
+            return []
+    
+    def verify_backup(self, backup_file):
+        """Verify the structure of a backup file without touching the database"""
+        try:
+            # Check if file exists
+            if not os.path.exists(backup_file):
+                print(f"{COLORS['RED']}❌ Backup file not found: {backup_file}{COLORS['ENDC']}")
+                return False
+            
+            # Load backup data
+            with open(backup_file, "rb") as f:
+                raw = f.read()
+            backup_data = json.loads(raw)
+            
+            # Validate backup data
+            if "polls" not in backup_data or "votes" not in backup_data:
+                print(f"{COLORS['RED']}❌ Invalid backup file format.{COLORS['ENDC']}")
+                return False
+            
+            problems = []
+            
+            # Compare against the checksum recorded in the catalog, when there is one
+            if os.path.dirname(os.path.abspath(backup_file)) == BACKUP_DIR:
+                import hashlib
+                entry = next((e for e in self._read_backup_catalog() if e["file"] == os.path.basename(backup_file)), None)
+                if entry and entry.get("checksum"):
+                    if entry["checksum"] != f"sha256:{hashlib.sha256(raw).hexdigest()}":
+                        problems.append("Checksum does not match the backup catalog")
+            poll_ids = set()
+            for poll in backup_data["polls"]:
+                poll_id = poll.get("_id")
+                if not isinstance(poll_id, str) or len(poll_id) != 24:
+                    problems.append(f"Poll with invalid _id: {poll_id}")
+                    continue
+                poll_ids.add(poll_id)
+            
+            orphan_votes = 0
+            for vote in backup_data["votes"]:
+                vote_id = vote.get("_id")
+                if not isinstance(vote_id, str) or len(vote_id) != 24:
+                    problems.append(f"Vote with invalid _id: {vote_id}")
+                elif vote.get("pollId") not in poll_ids:
+                    orphan_votes += 1
+            
+            print(f"{COLORS['BOLD']}Backup:{COLORS['ENDC']} {backup_file}")
+            print(f"   Polls: {len(backup_data['polls'])}")
+            print(f"   Votes: {len(backup_data['votes'])}")
+            if orphan_votes:
+                print(f"{COLORS['YELLOW']}⚠️ {orphan_votes} votes reference polls missing from the backup.{COLORS['ENDC']}")
+            
+            if problems:
+                for problem in problems:
+                    print(f"{COLORS['RED']}❌ {problem}{COLORS['ENDC']}")
+                return False
+            
+            print(f"{COLORS['GREEN']}✅ Backup file is valid.{COLORS['ENDC']}")
+            return True
+        except Exception as e:
+            print(f"{COLORS['RED']}❌ Error verifying backup: {e}{COLORS['ENDC']}")
+            return False
+    
+    def publish_snapshots(self, output_dir=None, full=False):
+        """Render static JSON snapshots of the poll API for nginx to serve from disk
+        
+        Layout (each file also written as .json.gz):
+          polls/index.json            every poll (GET /api/polls)
+          polls/status/<STATUS>.json  GET /api/polls?status=<STATUS>
+          polls/type/<TYPE>.json      GET /api/polls?type=<TYPE>
+          polls/<id>.json             GET /api/polls/<id>, with precomputed tallies
+        
+        Only polls whose updatedAt changed since the last run are re-rendered, and
+        only the list files containing them are rebuilt (from the per-poll files).
+        """
+        import re
+        import time
+        try:
+            output_dir = output_dir or PUBLISH_DIR
+            polls_dir = os.path.join(output_dir, "polls")
+            state_file = os.path.join(output_dir, PUBLISH_STATE_FILE)
+            
+            state = {"lastUpdatedAt": None, "lastIds": [], "polls": {}}
+            if os.path.exists(state_file):
+                with open(state_file, "r") as f:
+                    previous_state = json.load(f)
+                if full:
+                    # Re-render everything, but keep the published ids so deletions are still found
+                    state["polls"] = previous_state["polls"]
+                else:
+                    state = previous_state
+            published = state["polls"]
+            
+            # Polls changed since the last run; $gte so same-millisecond updates are not missed
+            query = {}
+            if state["lastUpdatedAt"]:
+                query["updatedAt"] = {"$gte": datetime.datetime.fromisoformat(state["lastUpdatedAt"])}
+            
+            started = time.monotonic()
+            dirty_lists = set()
+            rendered = 0
+            last_updated = state["lastUpdatedAt"]
+            last_ids = set(state.get("lastIds", []))
+            
+            batch = []
+            def flush(batch):
+                nonlocal rendered, last_updated
+                ballots, counts = self._count_selections([poll["_id"] for poll in batch])
+                for poll in batch:
+                    poll_id = str(poll["_id"])
+                    selections = counts.get(poll["_id"], {})
+                    ballot_count = ballots.get(poll["_id"], 0)
+                    document = snapshot_value(poll)
+                    document["tallies"] = {
+                        "ballots": ballot_count,
+                        "options": [
+                            {"text": text,
+                             "votes": selections.get(text, 0),
+                             "percent": round(100 * selections.get(text, 0) / ballot_count, 2) if ballot_count else 0}
+                            for text, _ in map(option_text_votes, poll.get("options", []))
+                        ]
+                    }
+                    write_snapshot(os.path.join(polls_dir, f"{poll_id}.json"), document)
+                    
+                    previous = published.get(poll_id)
+                    current = {"status": poll.get("status"), "type": poll.get("type")}
+                    for entry in filter(None, (previous, current)):
+                        dirty_lists.add(("status", entry["status"]))
+                        dirty_lists.add(("type", entry["type"]))
+                    published[poll_id] = current
+                    
+                    if poll.get("updatedAt"):
+                        updated = poll["updatedAt"].isoformat()
+                        if last_updated is None or updated > last_updated:
+                            last_updated = updated
+                            last_ids.clear()
+                        if updated == last_updated:
+                            last_ids.add(poll_id)
+                    rendered += 1
+            
+            for poll in self.db.polls.find(query).sort("updatedAt", 1):
+                # Already published at the boundary timestamp of the previous run
+                if (str(poll["_id"]) in last_ids and poll.get("updatedAt")
+                        and poll["updatedAt"].isoformat() == state["lastUpdatedAt"]):
+                    continue
+                batch.append(poll)
+                if len(batch) >= PUBLISH_BATCH_SIZE:
+                    flush(batch)
+                    batch = []
+            if batch:
+                flush(batch)
+            
+            # Deleted (or archived) polls: compare ids only, then drop their files
+            current_ids = {str(doc["_id"]) for doc in self.db.polls.find({}, {"_id": 1})}
+            removed = [poll_id for poll_id in published if poll_id not in current_ids]
+            for poll_id in removed:
+                entry = published.pop(poll_id)
+                dirty_lists.add(("status", entry["status"]))
+                dirty_lists.add(("type", entry["type"]))
+                for suffix in (".json", ".json.gz"):
+                    path = os.path.join(polls_dir, poll_id + suffix)
+                    if os.path.exists(path):
+                        os.remove(path)
+            if full and os.path.isdir(polls_dir):
+                # Per-poll files the state file does not know about (e.g. it was lost)
+                for name in os.listdir(polls_dir):
+                    poll_id = name.split(".")[0]
+                    if re.fullmatch(r"[0-9a-f]{24}", poll_id) and poll_id not in current_ids:
+                        os.remove(os.path.join(polls_dir, name))
+                        if poll_id not in removed:
+                            removed.append(poll_id)
+            
+            # Rebuild affected lists from the per-poll snapshots, without the tallies
+            lists_rebuilt = 0
+            if dirty_lists or full:
+                if full:
+                    dirty_lists |= {("status", status) for status in POLL_STATUSES}
+                    dirty_lists |= {("type", poll_type) for poll_type in POLL_TYPES}
+                documents = {}
+                for poll_id in published:
+                    with open(os.path.join(polls_dir, f"{poll_id}.json"), "r") as f:
+                        document = json.load(f)
+                    document.pop("tallies", None)
+                    documents[poll_id] = document
+                
+                write_snapshot(os.path.join(polls_dir, "index.json"), list(documents.values()))
+                lists_rebuilt += 1
+                for field, value in sorted(dirty_lists, key=lambda item: (item[0], str(item[1]))):
+                    if value is None:
+                        continue
+                    members = [documents[poll_id] for poll_id, entry in published.items() if entry[field] == value]
+                    write_snapshot(os.path.join(polls_dir, field, f"{value}.json"), members)
+                    lists_rebuilt += 1
+            
+            state = {"lastUpdatedAt": last_updated, "lastIds": sorted(last_ids), "polls": published}
+            tmp_file = state_file + ".tmp"
+            with open(tmp_file, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_file, state_file)
+            
+            elapsed = time.monotonic() - started
+            print(f"{COLORS['GREEN']}✅ Published snapshots to {output_dir}{COLORS['ENDC']}")
+            print(f"   Polls re-rendered: {rendered}")
+            print(f"   Polls removed: {len(removed)}")
+            print(f"   Lists rebuilt: {lists_rebuilt}")
+            print(f"   Time: {elapsed:.1f}s")
+            return {"rendered": rendered, "removed": len(removed), "lists": lists_rebuilt}
+        except Exception as e:
+            print(f"{COLORS['RED']}❌ Error publishing snapshots: {e}{COLORS['ENDC']}")
+            return None
+    
+    def export_to_sqlite(self, output_file=None, refresh=False):
+        """Export polls, options and votes into normalized, indexed SQLite tables
+        
+        A full export is built in a temp file (bulk-load pragmas, indexes created at the
+        end) and renamed into place. With refresh, an existing export is updated in
+        place: votes above the stored _id watermark are appended and polls created or
+        updated since the last export are replaced. Deleted documents are only dropped
+        by a full export. Votes newer than ROLLUP_SAFETY_LAG_SECONDS are left for the
+        next refresh, so in-flight inserts with lower _ids are not skipped.
+        """
+        import sqlite3
+        import time
+        try:
+            os.makedirs(EXPORT_DIR, exist_ok=True)
+            output_file = output_file or os.path.join(EXPORT_DIR, "partivotes_export.sqlite")
+            refresh = refresh and os.path.exists(output_file)
+            started = time.monotonic()
+            export_started = datetime.datetime.utcnow()
+            
+            target = output_file if refresh else output_file + ".tmp"
+            if not refresh and os.path.exists(target):
+                os.remove(target)
+            
+            conn = sqlite3.connect(target, isolation_level=None)
+            try:
+                if not refresh:
+                    # Nothing to protect until the rename, so skip journaling and fsyncs
+                    conn.execute("PRAGMA journal_mode = OFF")
+                    conn.execute("PRAGMA synchronous = OFF")
+                conn.executescript("""
+                    CREATE TABLE IF NOT EXISTS polls (
+                        id TEXT PRIMARY KEY, title TEXT, description TEXT, type TEXT, status TEXT,
+                        creator TEXT, network TEXT, total_votes INTEGER, max_selections INTEGER,
+                        start_date TEXT, end_date TEXT, created_at TEXT, updated_at TEXT
+                    );
+                    CREATE TABLE IF NOT EXISTS poll_options (
+                        poll_id TEXT, position INTEGER, text TEXT, votes INTEGER,
+                        PRIMARY KEY (poll_id, position)
+                    );
+                    CREATE TABLE IF NOT EXISTS votes (
+                        id TEXT PRIMARY KEY, poll_id TEXT, voter TEXT, option TEXT, options TEXT,
+                        timestamp TEXT, tx_id TEXT, type TEXT, network TEXT
+                    );
+                    CREATE TABLE IF NOT EXISTS export_state (key TEXT PRIMARY KEY, value TEXT);
+                """)
+                state = dict(conn.execute("SELECT key, value FROM export_state").fetchall())
+                
+                def iso(value):
+                    return value.isoformat() if isinstance(value, datetime.datetime) else value
+                
+                # Polls: everything for a full export, new or updated polls for a refresh
+                poll_query = {}
+                if refresh and state.get("polls_exported_at"):
+                    poll_query = {"$or": [{"updatedAt": {"$gte": datetime.datetime.fromisoformat(state["polls_exported_at"])}},
+                                          {"updatedAt": {"$exists": False}}]}
+                poll_rows = []
+                option_rows = []
+                poll_ids = []
+                poll_count = 0
+                conn.execute("BEGIN")
+                for poll in self.db.polls.find(poll_query).batch_size(SQLITE_BATCH_SIZE):
+                    poll_id = str(poll["_id"])
+                    poll_ids.append((poll_id,))
+                    poll_rows.append((poll_id, poll.get("title"), poll.get("description"), poll.get("type"),
+                                      poll.get("status"), poll.get("creator"), poll.get("network"),
+                                      poll.get("totalVotes"), poll.get("maxSelections"), iso(poll.get("startDate")),
+                                      iso(poll.get("endDate")), iso(poll.get("createdAt")), iso(poll.get("updatedAt"))))
+                    for position, option in enumerate(poll.get("options") or []):
+                        text, votes = option_text_votes(option)
+                        option_rows.append((poll_id, position, text, votes))
+                    poll_count += 1
+                    if len(poll_rows) >= SQLITE_BATCH_SIZE:
+                        conn.executemany("DELETE FROM poll_options WHERE poll_id = ?", poll_ids)
+                        conn.executemany("INSERT OR REPLACE INTO polls VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", poll_rows)
+                        conn.executemany("INSERT OR REPLACE INTO poll_options VALUES (?, ?, ?, ?)", option_rows)
+                        poll_rows, option_rows, poll_ids = [], [], []
+                conn.executemany("DELETE FROM poll_options WHERE poll_id = ?", poll_ids)
+                conn.executemany("INSERT OR REPLACE INTO polls VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", poll_rows)
+                conn.executemany("INSERT OR REPLACE INTO poll_options VALUES (?, ?, ?, ?)", option_rows)
+                conn.execute("INSERT OR REPLACE INTO export_state VALUES ('polls_exported_at', ?)", (export_started.isoformat(),))
+                conn.execute("COMMIT")
+                
+                # Votes: streamed in _id order from the watermark up to the safety lag (as in
+                # rollups), committed in large transactions
+                from bson import ObjectId
+                lag_bound = ObjectId.from_datetime(datetime.datetime.now(datetime.timezone.utc) -
+                                                   datetime.timedelta(seconds=ROLLUP_SAFETY_LAG_SECONDS))
+                vote_query = {"_id": {"$lte": lag_bound}}
+                if refresh and state.get("votes_watermark"):
+                    vote_query["_id"]["$gt"] = ObjectId(state["votes_watermark"])
+                vote_rows = []
+                vote_count = 0
+                last_vote_id = None
+                
+                def flush_votes():
+                    conn.executemany("INSERT OR REPLACE INTO votes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", vote_rows)
+                    if last_vote_id is not None:
+                        conn.execute("INSERT OR REPLACE INTO export_state VALUES ('votes_watermark', ?)", (str(last_vote_id),))
+                    vote_rows.clear()
+                
+                conn.execute("BEGIN")
+                for vote in self.db.votes.find(vote_query).sort("_id", 1).batch_size(SQLITE_BATCH_SIZE):
+                    last_vote_id = vote["_id"]
+                    vote_rows.append((str(vote["_id"]), str(vote.get("pollId")), vote.get("voter"), vote.get("option"),
+                                      json.dumps(vote["options"]) if vote.get("options") else None,
+                                      iso(vote.get("timestamp")), vote.get("txId"), vote.get("type"), vote.get("network")))
+                    vote_count += 1
+                    if len(vote_rows) >= SQLITE_BATCH_SIZE:
+                        flush_votes()
+                        if vote_count % SQLITE_COMMIT_EVERY == 0:
+                            conn.execute("COMMIT")
+                            conn.execute("BEGIN")
+                            print(f"  Exported {vote_count} votes...", end="\r")
+                flush_votes()
+                conn.execute("COMMIT")
+                
+                # Build indexes once at the end (a no-op for refreshes of an indexed export)
+                conn.executescript("""
+                    CREATE INDEX IF NOT EXISTS idx_votes_poll_id ON votes (poll_id);
+                    CREATE INDEX IF NOT EXISTS idx_votes_voter ON votes (voter);
+                    CREATE INDEX IF NOT EXISTS idx_votes_timestamp ON votes (timestamp);
+                    CREATE INDEX IF NOT EXISTS idx_polls_status ON polls (status);
+                    ANALYZE;
+                """)
+            finally:
+                conn.close()
+            
+            if not refresh:
+                os.replace(target, output_file)
+            
+            elapsed = time.monotonic() - started
+            action = "Refreshed" if refresh else "Exported"
+            print(f"{COLORS['GREEN']}✅ {action} {poll_count} polls and {vote_count} votes to: {output_file} ({elapsed:.1f}s){COLORS['ENDC']}")
+            return output_file
+        except Exception as e:
+            print(f"{COLORS['RED']}❌ Error exporting to SQLite: {e}{COLORS['ENDC']}")
+            return None
+    
+    def archive_polls(self, older_than_days, batch_size=ARCHIVE_BATCH_SIZE, force=False):
+        """Move ENDED polls older than a cutoff, with their votes, to compressed archive files"""
+        try:
+            cutoff, query = self._archive_query(older_than_days)
+            poll_count = self.db.polls.count_documents(query)
+            if poll_count == 0:
+                print(f"{COLORS['YELLOW']}No ENDED polls older than {older_than_days} days to archive.{COLORS['ENDC']}")
+                return 0
+            
+            # Confirm archive
+            if not force:
+                print(f"\n{COLORS['YELLOW']}⚠️ This will move {poll_count} ENDED polls (ended before {cutoff.strftime('%Y-%m-%d %H:%M')}) and their votes to {ARCHIVE_DIR}.{COLORS['ENDC']}")
+                confirm = input("Are you sure you want to proceed? (y/N): ")
+                if confirm.lower() != "y":
+                    print(f"{COLORS['YELLOW']}Archive cancelled.{COLORS['ENDC']}")
+                    return 0
+        except Exception as e:
+            print(f"{COLORS['RED']}❌ Error archiving polls: {e}{COLORS['ENDC']}")
+            return None
+        
+        def progress(result):
+            print(f"  Archived {result.counts['polls']}/{result.counts['candidates']} polls ({result.counts['votes']} votes)")
+        
+        result = self.archive(older_than_days, batch_size, progress)
+        if not result:
+            print(f"{COLORS['RED']}❌ Error archiving polls: {result.errors[0]}{COLORS['ENDC']}")
+            return None
+        print(f"{COLORS['GREEN']}✅ Archived {result.counts['polls']} polls and {result.counts['votes']} votes to: {result.archive_dir}{COLORS['ENDC']}")
+        return result.counts["polls"]
+    
+    def rehydrate_poll(self, poll_id, batch_size=1000):
+        """Reload a single archived poll and its votes into MongoDB"""
+        result = self.rehydrate(poll_id, batch_size)
+        if not result:
+            if result.found is False:
+                print(f"{COLORS['YELLOW']}{result.errors[0]}{COLORS['ENDC']}")
+            else:
+                print(f"{COLORS['RED']}❌ Error rehydrating poll: {result.errors[0]}{COLORS['ENDC']}")
+            return False
+        print(f"{COLORS['GREEN']}✅ Rehydrated poll {poll_id} with {result.counts['votes']} votes.{COLORS['ENDC']}")
+        return True
+    
+    def _read_tail_state(self):
+        """Read the tail-backup state (resume token and base snapshots)"""
+        if not os.path.exists(TAIL_STATE_FILE):
+            return {"resume_token": None, "bases": []}
+        
+        from bson import json_util
+        with open(TAIL_STATE_FILE, "r") as f:
+            return json_util.loads(f.read())
+    
+    def _write_tail_state(self, state):
+        """Atomically write the tail-backup state"""
+        from bson import json_util
+        tmp_file = TAIL_STATE_FILE + ".tmp"
+        with open(tmp_file, "w") as f:
+            f.write(json_util.dumps(state, indent=2))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, TAIL_STATE_FILE)
+    
+    def tail_backup(self, new_base=False, batch_size=TAIL_BATCH_SIZE,
+                    segment_max_bytes=TAIL_SEGMENT_MAX_BYTES, segment_max_seconds=TAIL_SEGMENT_MAX_SECONDS):
+        """Continuously back up polls and votes by tailing a change stream into rolling segments
+        
+        Events are pulled from the change stream only after the previous batch has
+        been written, so a vote burst backs up in the oplog rather than in memory.
+        The resume token is saved after every flushed batch, so a restarted daemon
+        continues without gaps (events may be written twice, and replay is idempotent).
+        Requires a replica set (a single-node replica set is enough).
+        """
+        import signal
+        import time
+        from bson import BSON
+        try:
+            os.makedirs(TAIL_DIR, exist_ok=True)
+            state = self._read_tail_state()
+            
+            watch_options = {
+                "pipeline": [{"$match": {"ns.coll": {"$in": ["polls", "votes"]}}}],
+                "full_document": "updateLookup",
+                "batch_size": batch_size,
+                "max_await_time_ms": int(TAIL_FLUSH_SECONDS * 1000)
+            }
+            
+            if state["resume_token"] is not None and not new_base:
+                watch_options["resume_after"] = state["resume_token"]
+                print(f"{COLORS['GREEN']}Resuming change stream from saved token.{COLORS['ENDC']}")
+            else:
+                # Open the stream at a known cluster time before taking the base snapshot,
+                # so that base + segments covers every write with no gap
+                operation_time = self.db.command("ping").get("operationTime")
+                if operation_time is None:
+                    print(f"{COLORS['RED']}❌ Change streams require a replica set (a single-node replica set is enough).{COLORS['ENDC']}")
+                    return False
+                watch_options["start_at_operation_time"] = operation_time
+                
+                timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+                base_file = self.create_backup(os.path.join(TAIL_DIR, f"base_{timestamp}.json"))
+                if not base_file:
+                    return False
+                state["bases"].append({"file": os.path.basename(base_file), "cluster_time": operation_time})
+                state["resume_token"] = None
+                self._write_tail_state(state)
+            
+            # Stop cleanly on SIGTERM (systemd/cron) as well as Ctrl+C
+            stopping = []
+            signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+            
+            writer = TailSegmentWriter(TAIL_DIR, segment_max_bytes, segment_max_seconds)
+            total_events = 0
+            
+            with self.db.watch(**watch_options) as stream:
+                print(f"{COLORS['GREEN']}✅ Tailing polls and votes into: {TAIL_DIR} (Ctrl+C to stop){COLORS['ENDC']}")
+                try:
+                    while stream.alive and not stopping:
+                        batch = []
+                        deadline = time.monotonic() + TAIL_FLUSH_SECONDS
+                        while len(batch) < batch_size and time.monotonic() < deadline and not stopping:
+                            change = stream.try_next()
+                            if change is None:
+                                continue
+                            if change["operationType"] == "invalidate":
+                                print(f"{COLORS['YELLOW']}⚠️ Change stream invalidated; stopping.{COLORS['ENDC']}")
+                                break
+                            batch.append(BSON.encode({
+                                "ct": change["clusterTime"],
+                                "op": change["operationType"],
+                                "coll": change["ns"]["coll"],
+                                "key": change.get("documentKey", {}).get("_id"),
+                                "doc": change.get("fullDocument")
+                            }))
+                        
+                        if batch:
+                            writer.write(batch, now=time.time())
+                            total_events += len(batch)
+                        
+                        # Save the token only once the batch is durable (also advances it while idle)
+                        if stream.resume_token is not None and stream.resume_token != state["resume_token"]:
+                            state["resume_token"] = stream.resume_token
+                            self._write_tail_state(state)
+                except KeyboardInterrupt:
+                    pass
+                finally:
+                    writer.close()
+            
+            print(f"\n{COLORS['GREEN']}✅ Tail backup stopped after {total_events} events.{COLORS['ENDC']}")
+            return True
+        except Exception as e:
+            print(f"{COLORS['RED']}❌ Error in tail backup: {e}{COLORS['ENDC']}")
+            return False
+    
+    def replay_tail(self, backup_file, until=None, force=False, batch_size=1000):
+        """Restore a tail base snapshot, then replay change segments up to a point in time"""
+        import gzip
+        from bson import Timestamp, decode_file_iter
+        from pymongo import DeleteOne, ReplaceOne
+        try:
+            state = self._read_tail_state()
+            base = next((b for b in state["bases"] if b["file"] == os.path.basename(backup_file)), None)
+            if base is None:
+                print(f"{COLORS['RED']}❌ {backup_file} is not a tail-backup base snapshot.{COLORS['ENDC']}")
+                return False
+            
+            if not self.restore_backup(os.path.join(TAIL_DIR, base["file"]), force):
+                return False
+            
+            start = base["cluster_time"]
+            end = Timestamp(int(until.timestamp()) + 1, 0) if until else None
+            
+            segments = sorted(f for f in os.listdir(TAIL_DIR) if f.startswith("segment_") and f.endswith(".bson.gz"))
+            ops = {"polls": [], "votes": []}
+            applied = 0
+            
+            def flush():
+                for collection, pending in ops.items():
+                    if pending:
+                        self.db[collection].bulk_write(pending, ordered=True)
+                        pending.clear()
+            
+            done = False
+            for segment in segments:
+                try:
+                    with gzip.open(os.path.join(TAIL_DIR, segment), "rb") as f:
+                        for event in decode_file_iter(f):
+                            if event["ct"] < start:
+                                continue
+                            if end is not None and event["ct"] >= end:
+                                done = True
+                                break
+                            
+                            if event["op"] == "delete":
+                                ops[event["coll"]].append(DeleteOne({"_id": event["key"]}))
+                            elif event.get("doc") is not None:
+                                ops[event["coll"]].append(ReplaceOne({"_id": event["key"]}, event["doc"], upsert=True))
+                            applied += 1
+                            
+                            if applied % batch_size == 0:
+                                flush()
+                except (EOFError, gzip.BadGzipFile):
+                    # A daemon killed mid-write leaves a truncated final gzip member
+                    print(f"{COLORS['YELLOW']}⚠️ Segment {segment} is truncated; replayed up to the damaged record.{COLORS['ENDC']}")
+                if done:
+                    break
+            flush()
+            
+            print(f"{COLORS['GREEN']}✅ Replayed {applied} change events on top of {base['file']}.{COLORS['ENDC']}")
+            return True
+        except Exception as e:
+            print(f"{COLORS['RED']}❌ Error replaying tail backup: {e}{COLORS['ENDC']}")
+            return False
+    
+    def update_rollups(self):
+        """Incrementally aggregate new votes into per-poll hourly and daily vote_rollups"""
+        result = self.rollup()
+        if not result:
+            print(f"{COLORS['RED']}❌ Error updating vote rollups: {result.errors[0]}{COLORS['ENDC']}")
+            return None
+        if result.resumed:
+            print(f"{COLORS['YELLOW']}Finished the interrupted rollup run before rolling up new votes.{COLORS['ENDC']}")
+        if result.counts["rows"]:
+            print(f"{COLORS['GREEN']}✅ Rolled up {result.counts['votes']} new votes into {result.counts['rows']} rollup rows in {result.elapsed:.2f}s.{COLORS['ENDC']}")
+        elif result.watermark is None:
+            print(f"{COLORS['YELLOW']}No votes to roll up.{COLORS['ENDC']}")
+        else:
+            print(f"{COLORS['GREEN']}✅ Vote rollups are up to date.{COLORS['ENDC']}")
+        return result.counts["votes"]
+    
+    def get_vote_rates(self, poll_id=None, granularity="hour", since=None):
+        """Read per-bucket vote counts from vote_rollups, grouped by poll and bucket"""
+        from bson import ObjectId
+        query = {"granularity": granularity}
+        if poll_id:
+            query["pollId"] = ObjectId(poll_id)
+        if since:
+            query["bucket"] = {"$gte": since}
+        
+        rates = {}
+        for row in self.db.vote_rollups.find(query).sort([("pollId", 1), ("bucket", 1)]):
+            key = (row["pollId"], row["bucket"])
+            rate = rates.setdefault(key, {"pollId": row["pollId"], "bucket": row["bucket"],
+                                          "ballots": 0, "options": {}, "networks": {}})
+            if row["option"] is None:
+                rate["ballots"] += row["count"]
+                rate["networks"][row["network"]] = rate["networks"].get(row["network"], 0) + row["count"]
+            else:
+                rate["options"][row["option"]] = rate["options"].get(row["option"], 0) + row["count"]
+        return list(rates.values())
+    
+    def view_vote_rates(self, poll_id=None, granularity="hour", since=None):
+        """Print vote rates from the rollup collection"""
+        from tabulate import tabulate
+        try:
+            rates = self.get_vote_rates(poll_id, granularity, since)
+            if not rates:
+                print(f"{COLORS['YELLOW']}No rollup data found. Run the rollup command first.{COLORS['ENDC']}")
+                return []
+            
+            table_data = []
+            for rate in rates:
+                table_data.append([
+                    str(rate["pollId"]),
+                    rate["bucket"].strftime("%Y-%m-%d %H:00" if granularity == "hour" else "%Y-%m-%d"),
+                    rate["ballots"],
+                    ", ".join(f"{network}: {count}" for network, count in sorted(rate["networks"].items())),
+                    ", ".join(f"{option}: {count}" for option, count in sorted(rate["options"].items()))
+                ])
+            
+            headers = ["Poll ID", "Hour" if granularity == "hour" else "Day", "Votes", "Networks", "Options"]
+            print(tabulate(table_data, headers=headers, tablefmt="grid"))
+            print(f"Total: {sum(rate['ballots'] for rate in rates)} votes in {len(rates)} buckets")
+            return rates
+        except Exception as e:
+            print(f"{COLORS['RED']}❌ Error viewing vote rates: {e}{COLORS['ENDC']}")
+            return []
+    
+    def export_vote_rates_to_csv(self, poll_id=None, granularity="hour", since=None, output_file=None):
+        """Export vote rates from the rollup collection to CSV"""
+        import csv
+        try:
+            os.makedirs(EXPORT_DIR, exist_ok=True)
+            
+            if not output_file:
+                timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+                output_file = os.path.join(EXPORT_DIR, f"vote_rates_{granularity}_{timestamp}.csv")
+            
+            rates = self.get_vote_rates(poll_id, granularity, since)
+            if not rates:
+                print(f"{COLORS['YELLOW']}No rollup data found. Run the rollup command first.{COLORS['ENDC']}")
+                return None
+            
+            # One row per (poll, bucket, option); the ballot total is repeated on each row
+            with open(output_file, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["Poll ID", "Bucket", "Votes", "Mainnet Votes", "Testnet Votes", "Option", "Option Votes"])
+                for rate in rates:
+                    base = [str(rate["pollId"]), rate["bucket"].isoformat(), rate["ballots"],
+                            rate["networks"].get("mainnet", 0), rate["networks"].get("testnet", 0)]
+                    for option, count in sorted(rate["options"].items()) or [("", "")]:
+                        writer.writerow(base + [option, count])
+            
+            print(f"{COLORS['GREEN']}✅ Exported {len(rates)} vote-rate buckets to: {output_file}{COLORS['ENDC']}")
+            return output_file
+        except Exception as e:
+            print(f"{COLORS['RED']}❌ Error exporting vote rates: {e}{COLORS['ENDC']}")
+            return None
+    
+    def scan_duplicates(self, prefix_length=BURST_PREFIX_LENGTH, window_seconds=BURST_WINDOW_SECONDS,
+                        threshold=BURST_THRESHOLD, plan_file=None):
+        """Stream votes in sorted order to find duplicate ballots and voter-prefix bursts
+        
+        Duplicates: votes are sorted by (pollId, voter) server-side (through a {pollId,
+        voter} index when one exists, otherwise with allowDiskUse), so only one voter's
+        ballots are held at a time. Bursts: a second pass sorts by (pollId, voter prefix,
+        time) server-side, and only the votes inside the sliding window are held.
+        Findings are written as NDJSON; with plan_file, a cleanup plan that keeps the
+        earliest ballot of each duplicate group is written too.
+        """
+        from collections import deque
+        from tabulate import tabulate
+        try:
+            os.makedirs(EXPORT_DIR, exist_ok=True)
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            report_file = os.path.join(EXPORT_DIR, f"vote_anomalies_{timestamp}.ndjson")
+            
+            indexed = any(info["key"][:2] == [("pollId", 1), ("voter", 1)]
+                          for info in self.db.votes.index_information().values())
+            if not indexed:
+                print(f"{COLORS['YELLOW']}⚠️ No {{pollId, voter}} index; sorting server-side with allowDiskUse (see indexes --create).{COLORS['ENDC']}")
+            
+            pipeline = [
+                {"$match": {"voter": {"$type": "string"}}},
+                {"$sort": {"pollId": 1, "voter": 1}},
+                {"$project": {"pollId": 1, "voter": 1, "timestamp": 1, "option": 1, "options": 1}}
+            ]
+            burst_pipeline = [
+                {"$match": {"voter": {"$type": "string"}}},
+                {"$project": {"pollId": 1, "prefix": {"$substrCP": ["$voter", 0, prefix_length]},
+                              "time": {"$ifNull": ["$timestamp", {"$toDate": "$_id"}]}}},
+                {"$sort": {"pollId": 1, "prefix": 1, "time": 1}}
+            ]
+            
+            stats = {"votes": 0, "duplicate_groups": 0, "duplicate_votes": 0, "bursts": 0}
+            top_duplicates = []
+            window = datetime.timedelta(seconds=window_seconds)
+            
+            report = open(report_file, "w")
+            plan = open(plan_file, "w") if plan_file else None
+            try:
+                def write(handle, record):
+                    handle.write(json.dumps(record, cls=JSONEncoder) + "\n")
+                
+                def vote_time(vote):
+                    return vote.get("timestamp") or vote["_id"].generation_time.replace(tzinfo=None)
+                
+                def check_duplicates(group):
+                    if len(group) < 2:
+                        return
+                    group.sort(key=lambda v: (vote_time(v), v["_id"]))
+                    stats["duplicate_groups"] += 1
+                    stats["duplicate_votes"] += len(group) - 1
+                    record = {"kind": "duplicate", "pollId": group[0]["pollId"], "voter": group[0]["voter"],
+                              "count": len(group), "keep": group[0]["_id"], "voteIds": [v["_id"] for v in group]}
+                    write(report, record)
+                    top_duplicates.append(record)
+                    top_duplicates.sort(key=lambda r: -r["count"])
+                    del top_duplicates[10:]
+                    if plan:
+                        for vote in group[1:]:
+                            write(plan, {"_id": vote["_id"], "pollId": vote["pollId"],
+                                         "options": vote.get("options") or ([vote["option"]] if vote.get("option") else [])})
+                
+                def report_burst(key, burst):
+                    stats["bursts"] += 1
+                    write(report, {"kind": "burst", "pollId": key[0], "prefix": key[1], "count": burst[2],
+                                   "start": burst[0], "end": burst[1]})
+                
+                voter_group = []
+                for vote in self.db.votes.aggregate(pipeline, allowDiskUse=True, batchSize=10000):
+                    stats["votes"] += 1
+                    if voter_group and (vote["pollId"] != voter_group[0]["pollId"] or vote["voter"] != voter_group[0]["voter"]):
+                        check_duplicates(voter_group)
+                        voter_group = []
+                    voter_group.append(vote)
+                    
+                    if stats["votes"] % 1000000 == 0:
+                        print(f"  Scanned {stats['votes']} votes...")
+                check_duplicates(voter_group)
                 
-                if poll_result.deleted_count > 0:
-                    print(f"{COLORS['GREEN']}✅ Poll deleted successfully.{COLORS['ENDC']}")
-                    print(f"{COLORS['GREEN']}✅ {votes_deleted} votes deleted.{COLORS['ENDC']}")
-                    return True
-                else:
-                    print(f"{COLORS['RED']}❌ Failed to delete poll. No documents matched the query.{COLORS['ENDC']}")
-                    return False
-            except Exception as e:
-                print(f"{COLORS['RED']}❌ Error deleting poll: {e}{COLORS['ENDC']}")
-                return False
+                # Bursts: slide a window over each (poll, prefix) group in time order and
+                # report its first burst once, extended to every vote within the window
+                group_key = None
+                times = deque()
+                burst = None
+                reported = False
+                for vote in self.db.votes.aggregate(burst_pipeline, allowDiskUse=True, batchSize=10000):
+                    key = (vote["pollId"], vote["prefix"])
+                    if key != group_key:
+                        if burst:
+                            report_burst(group_key, burst)
+                        group_key, burst, reported = key, None, False
+                        times.clear()
+                    if reported and not burst:
+                        continue
+                    if burst:
+                        if vote["time"] - burst[0] <= window:
+                            burst[1] = vote["time"]
+                            burst[2] += 1
+                        else:
+                            report_burst(group_key, burst)
+                            burst = None
+                        continue
+                    times.append(vote["time"])
+                    while vote["time"] - times[0] > window:
+                        times.popleft()
+                    if len(times) >= threshold:
+                        burst = [times[0], vote["time"], len(times)]
+                        reported = True
+                        times.clear()
+                if burst:
+                    report_burst(group_key, burst)
+            finally:
+                report.close()
+                if plan:
+                    plan.close()
             
+            print(f"{COLORS['BOLD']}Scanned {stats['votes']} votes{COLORS['ENDC']}")
+            print(f"  Duplicate ballots: {stats['duplicate_votes']} extra votes in {stats['duplicate_groups']} (poll, voter) groups")
+            print(f"  Burst anomalies: {stats['bursts']}")
+            if top_duplicates:
+                table_data = [[str(r["pollId"]), r["voter"], r["count"]] for r in top_duplicates]
+                print(tabulate(table_data, headers=["Poll ID", "Voter", "Votes"], tablefmt="grid"))
+            print(f"{COLORS['GREEN']}✅ Report written to: {report_file}{COLORS['ENDC']}")
+            if plan_file:
+                print(f"{COLORS['GREEN']}✅ Cleanup plan written to: {plan_file}{COLORS['ENDC']}")
+            return stats
         except Exception as e:
-            print(f"{COLORS['RED']}❌ Error in delete_poll: {e}{COLORS['ENDC']}")
-            return False
+            print(f"{COLORS['RED']}❌ Error scanning for duplicate votes: {e}{COLORS['ENDC']}")
+            return None
     
-    def delete_all_polls(self, force=False):
-        """Delete all polls and votes"""
+    def apply_cleanup_plan(self, plan_file, batch_size=1000, force=False):
+        """Delete the duplicate votes listed in a cleanup plan and correct poll vote counters"""
+        from bson import ObjectId
+        from pymongo import UpdateOne
         try:
-            # Count polls and votes
-            poll_count = self.db.polls.count_documents({})
-            vote_count = self.db.votes.count_documents({})
+            if not os.path.exists(plan_file):
+                print(f"{COLORS['RED']}❌ Cleanup plan not found: {plan_file}{COLORS['ENDC']}")
+                return False
             
             # Confirm deletion
             if not force:
-                print(f"\n{COLORS['RED']}⚠️ This will delete ALL {poll_count} polls and {vote_count} votes.{COLORS['ENDC']}")
+                with open(plan_file, "r") as f:
+                    planned = sum(1 for line in f if line.strip())
+                print(f"\n{COLORS['RED']}⚠️ This will delete {planned} duplicate votes listed in {plan_file}.{COLORS['ENDC']}")
                 confirm = input("Are you sure you want to proceed? This action cannot be undone. (y/N): ")
                 if confirm.lower() != "y":
-                    print(f"{COLORS['YELLOW']}Deletion cancelled.{COLORS['ENDC']}")
+                    print(f"{COLORS['YELLOW']}Cleanup cancelled.{COLORS['ENDC']}")
                     return False
             
-            # Delete votes first
-            votes_result = self.db.votes.delete_many({})
+            deleted = 0
             
-            # Delete polls
-            polls_result = self.db.polls.delete_many({})
+            def apply(batch):
+                # Only count votes that still exist, so re-running a plan does not decrement twice
+                ids = [ObjectId(entry["_id"]) for entry in batch]
+                present = {vote["_id"] for vote in self.db.votes.find({"_id": {"$in": ids}}, {"_id": 1})}
+                if not present:
+                    return 0
+                result = self.db.votes.delete_many({"_id": {"$in": list(present)}})
+                
+                decrements = {}
+                for entry in batch:
+                    if ObjectId(entry["_id"]) not in present:
+                        continue
+                    poll = decrements.setdefault(entry["pollId"], {"totalVotes": 0, "options": {}})
+                    poll["totalVotes"] += 1
+                    for option in entry["options"]:
+                        poll["options"][option] = poll["options"].get(option, 0) + 1
+                
+                operations = []
+                for poll_id, counts in decrements.items():
+                    operations.append(UpdateOne({"_id": ObjectId(poll_id)}, {"$inc": {"totalVotes": -counts["totalVotes"]}}))
+                    for option, count in counts["options"].items():
+                        operations.append(UpdateOne({"_id": ObjectId(poll_id)},
+                                                    {"$inc": {"options.$[opt].votes": -count}},
+                                                    array_filters=[{"opt.text": option}]))
+                self.db.polls.bulk_write(operations, ordered=False)
+                return result.deleted_count
             
-            print(f"{COLORS['GREEN']}✅ {polls_result.deleted_count} polls deleted.{COLORS['ENDC']}")
-            print(f"{COLORS['GREEN']}✅ {votes_result.deleted_count} votes deleted.{COLORS['ENDC']}")
-            return True
+            batch = []
+            with open(plan_file, "r") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    batch.append(json.loads(line))
+                    if len(batch) >= batch_size:
+                        deleted += apply(batch)
+                        batch = []
+            if batch:
+                deleted += apply(batch)
             
+            print(f"{COLORS['GREEN']}✅ Deleted {deleted} duplicate votes.{COLORS['ENDC']}")
+            return True
         except Exception as e:
-            print(f"{COLORS['RED']}❌ Error deleting polls: {e}{COLORS['ENDC']}")
+            print(f"{COLORS['RED']}❌ Error applying cleanup plan: {e}{COLORS['ENDC']}")
             return False
     
-    def create_backup(self):
-        """Create a backup of the database"""
+    def _query_shapes(self):
+        """Representative query shapes issued by DBManager, for explain()"""
+        from bson import ObjectId
+        sample_id = ObjectId()
+        return [
+            ("list", "polls", {}, [("createdAt", -1)]),
+            ("list --status", "polls", {"status": "ACTIVE"}, [("createdAt", -1)]),
+            ("list --status --type", "polls", {"status": "ACTIVE", "type": "SINGLE_CHOICE"}, [("createdAt", -1)]),
+            ("view/delete poll", "polls", {"_id": sample_id}, None),
+            ("view/delete/export poll votes", "votes", {"pollId": sample_id}, None),
+            ("archive", "polls", {"status": "ENDED", "endDate": {"$lt": datetime.datetime.utcnow()}}, [("_id", 1)]),
+            ("scan-duplicates", "votes", {"voter": {"$type": "string"}}, [("pollId", 1), ("voter", 1)]),
+            ("rollup", "votes", {"_id": {"$gt": sample_id}}, None),
+            ("backup votes", "votes", {}, [("pollId", 1), ("_id", 1)])
+        ]
+    
+    def _plan_stages(self, plan):
+        """Collect all stage names in an explain plan tree (classic or SBE format)"""
+        stages = []
+        if isinstance(plan, dict):
+            if "stage" in plan:
+                stages.append(plan["stage"])
+            for value in plan.values():
+                stages.extend(self._plan_stages(value))
+        elif isinstance(plan, list):
+            for item in plan:
+                stages.extend(self._plan_stages(item))
+        return stages
+    
+    def check_indexes(self):
+        """List indexes with usage counters and explain the tool's query shapes"""
+        from tabulate import tabulate
         try:
-            # Create backup directory if it doesn't exist
-            os.makedirs(BACKUP_DIR, exist_ok=True)
-            
-            # Create timestamp for backup filename
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_file = os.path.join(BACKUP_DIR, f"partivotes_backup_{timestamp}.json")
+            # Existing indexes with $indexStats usage counters
+            table_data = []
+            for collection in ("polls", "votes"):
+                try:
+                    usage = {stat["name"]: stat["accesses"] for stat in self.db[collection].aggregate([{"$indexStats": {}}])}
+                except Exception:
+                    # $indexStats needs the clusterMonitor role or equivalent
+                    usage = {}
+                for name, info in self.db[collection].index_information().items():
+                    accesses = usage.get(name)
+                    table_data.append([
+                        collection,
+                        name,
+                        ", ".join(f"{field}:{direction}" for field, direction in info["key"]),
+                        accesses["ops"] if accesses else "N/A",
+                        accesses["since"].strftime("%Y-%m-%d %H:%M") if accesses else "N/A"
+                    ])
             
-            # Get all collections
-            collections = {
-                "polls": list(self.db.polls.find()),
-                "votes": list(self.db.votes.find())
-            }
+            print(f"\n{COLORS['BOLD']}Existing Indexes:{COLORS['ENDC']}")
+            print(tabulate(table_data, headers=["Collection", "Name", "Keys", "Ops", "Since"], tablefmt="grid"))
             
-            # Write to file
-            with open(backup_file, "w") as f:
-                json.dump(collections, f, cls=JSONEncoder, indent=2)
+            # Explain each query shape (queryPlanner only, so nothing is executed)
+            problems = 0
+            table_data = []
+            for name, collection, query, sort in self._query_shapes():
+                explain_cmd = {"find": collection, "filter": query, "limit": 50}
+                if sort:
+                    explain_cmd["sort"] = dict(sort)
+                plan = self.db.command("explain", explain_cmd, verbosity="queryPlanner")
+                stages = self._plan_stages(plan["queryPlanner"]["winningPlan"])
+                
+                flags = []
+                if "COLLSCAN" in stages:
+                    flags.append("COLLSCAN")
+                if "SORT" in stages:
+                    flags.append("in-memory SORT")
+                problems += 1 if flags else 0
+                
+                status = f"{COLORS['YELLOW']}{', '.join(flags)}{COLORS['ENDC']}" if flags else f"{COLORS['GREEN']}OK{COLORS['ENDC']}"
+                table_data.append([name, collection, " > ".join(dict.fromkeys(stages)), status])
             
-            print(f"{COLORS['GREEN']}✅ Backup created: {backup_file}{COLORS['ENDC']}")
-            print(f"   Polls: {len(collections['polls'])}")
-            print(f"   Votes: {len(collections['votes'])}")
+            print(f"\n{COLORS['BOLD']}Query Plans:{COLORS['ENDC']}")
+            print(tabulate(table_data, headers=["Query", "Collection", "Stages", "Status"], tablefmt="grid"))
             
-            # Rotate backups if needed
-            self._rotate_backups()
+            missing = self._missing_indexes()
+            if missing:
+                print(f"\n{COLORS['YELLOW']}⚠️ Recommended indexes missing:{COLORS['ENDC']}")
+                for collection, keys in missing:
+                    print(f"  {collection}: {{{', '.join(f'{field}: {direction}' for field, direction in keys)}}}")
+                print(f"Run with --create to build them.")
+            elif not problems:
+                print(f"\n{COLORS['GREEN']}✅ All query shapes are served by indexes.{COLORS['ENDC']}")
             
-            return backup_file
+            return {"problems": problems, "missing": missing}
         except Exception as e:
-            print(f"{COLORS['RED']}❌ Error creating backup: {e}{COLORS['ENDC']}")
+            print(f"{COLORS['RED']}❌ Error checking indexes: {e}{COLORS['ENDC']}")
             return None
     
-    def _rotate_backups(self):
-        """Rotate backups to keep only the most recent ones"""
-        try:
-            # Get all backup files
-            backup_files = [os.path.join(BACKUP_DIR, f) for f in os.listdir(BACKUP_DIR) 
-                           if f.startswith("partivotes_backup_") and f.endswith(".json")]
-            
-            # Sort by modification time (oldest first)
-            backup_files.sort(key=os.path.getmtime)
-            
-            # Remove oldest backups if we have too many
-            if len(backup_files) > MAX_BACKUPS:
-                files_to_remove = backup_files[0:len(backup_files) - MAX_BACKUPS]
-                for file_path in files_to_remove:
-                    os.remove(file_path)
-                    print(f"{COLORS['YELLOW']}🔄 Removed old backup: {os.path.basename(file_path)}{COLORS['ENDC']}")
-        except Exception as e:
-            print(f"{COLORS['YELLOW']}⚠️ Warning: Could not rotate backups: {e}{COLORS['ENDC']}")
+    def _missing_indexes(self):
+        """Return the recommended indexes that do not exist yet, as (collection, keys) pairs"""
+        missing = []
+        for collection, recommended in RECOMMENDED_INDEXES.items():
+            existing = [info["key"] for info in self.db[collection].index_information().values()]
+            for keys in recommended:
+                if not any(list(key) == keys for key in existing):
+                    missing.append((collection, keys))
+        return missing
     
-    def restore_backup(self, backup_file, force=False):
-        """Restore database from backup"""
+    def ensure_indexes(self):
+        """Create the missing recommended indexes, reporting build progress"""
+        import threading
+        import time
         try:
-            # Check if file exists
-            if not os.path.exists(backup_file):
-                print(f"{COLORS['RED']}❌ Backup file not found: {backup_file}{COLORS['ENDC']}")
-                return False
-            
-            # Load backup data
-            with open(backup_file, "r") as f:
-                backup_data = json.load(f)
-            
-            # Validate backup data
-            if "polls" not in backup_data or "votes" not in backup_data:
-                print(f"{COLORS['RED']}❌ Invalid backup file format.{COLORS['ENDC']}")
-                return False
-            
-            # Count existing data
-            existing_polls = self.db.polls.count_documents({})
-            existing_votes = self.db.votes.count_documents({})
-            
-            # Confirm restore
-            if not force and (existing_polls > 0 or existing_votes > 0):
-                print(f"\n{COLORS['RED']}⚠️ This will overwrite your existing database with {len(backup_data['polls'])} polls and {len(backup_data['votes'])} votes.{COLORS['ENDC']}")
-                print(f"Current database has {existing_polls} polls and {existing_votes} votes.")
-                confirm = input("Are you sure you want to proceed? (y/N): ")
-                if confirm.lower() != "y":
-                    print(f"{COLORS['YELLOW']}Restore cancelled.{COLORS['ENDC']}")
-                    return False
-            
-            # Create a backup before restoring (safety measure)
-            if existing_polls > 0 or existing_votes > 0:
-                print(f"{COLORS['YELLOW']}Creating safety backup before restore...{COLORS['ENDC']}")
-                self.create_backup()
+            missing = self._missing_indexes()
+            if not missing:
+                print(f"{COLORS['GREEN']}✅ All recommended indexes already exist.{COLORS['ENDC']}")
+                return True
             
-            # Delete existing data
-            self.db.polls.delete_many({})
-            self.db.votes.delete_many({})
-            
-            # Convert string IDs back to ObjectIds
-            for poll in backup_data["polls"]:
-                poll["_id"] = ObjectId(poll["_id"])
+            for collection, keys in missing:
+                label = f"{collection} {{{', '.join(f'{field}: {direction}' for field, direction in keys)}}}"
+                print(f"{COLORS['BOLD']}Building index on {label}...{COLORS['ENDC']}")
                 
-            for vote in backup_data["votes"]:
-                vote["_id"] = ObjectId(vote["_id"])
-                vote["pollId"] = ObjectId(vote["pollId"])
-            
-            # Insert backup data
-            if backup_data["polls"]:
-                self.db.polls.insert_many(backup_data["polls"])
-            
-            if backup_data["votes"]:
-                self.db.votes.insert_many(backup_data["votes"])
+                # Build in a worker thread and poll $currentOp for the server's progress counters
+                errors = []
+                def build():
+                    try:
+                        self.db[collection].create_index(keys)
+                    except Exception as e:
+                        errors.append(e)
+                
+                started = time.monotonic()
+                worker = threading.Thread(target=build, daemon=True)
+                worker.start()
+                while worker.is_alive():
+                    worker.join(2)
+                    if not worker.is_alive():
+                        break
+                    try:
+                        ops = self.client.admin.aggregate([
+                            {"$currentOp": {}},
+                            {"$match": {"command.createIndexes": collection, "ns": f"{self.db.name}.{collection}"}}
+                        ])
+                        for op in ops:
+                            progress = op.get("progress")
+                            if progress and progress.get("total"):
+                                print(f"  {op.get('msg', 'Building')}: {progress['done']}/{progress['total']} "
+                                      f"({progress['done'] * 100 / progress['total']:.1f}%)")
+                    except Exception:
+                        # $currentOp needs extra privileges; keep waiting without progress output
+                        print(f"  Still building ({time.monotonic() - started:.0f}s)...")
+                
+                if errors:
+                    print(f"{COLORS['RED']}❌ Failed to build index on {label}: {errors[0]}{COLORS['ENDC']}")
+                    return False
+                print(f"{COLORS['GREEN']}✅ Built index on {label} in {time.monotonic() - started:.1f}s{COLORS['ENDC']}")
             
-            print(f"{COLORS['GREEN']}✅ Restored {len(backup_data['polls'])} polls and {len(backup_data['votes'])} votes.{COLORS['ENDC']}")
             return True
-            
         except Exception as e:
-            print(f"{COLORS['RED']}❌ Error restoring backup: {e}{COLORS['ENDC']}")
+            print(f"{COLORS['RED']}❌ Error creating indexes: {e}{COLORS['ENDC']}")
             return False
     
-    def list_backups(self):
-        """List available backups"""
+    def import_documents(self, input_file, collection, fmt=None, batch_size=IMPORT_BATCH_SIZE, workers=None):
+        """Append polls or votes from an NDJSON or CSV file using pipelined unordered batches"""
+        import time
+        started = time.monotonic()
+        
+        def progress(result):
+            elapsed = time.monotonic() - started
+            print(f"  {result.counts['imported']} imported, {result.counts['rejected']} rejected "
+                  f"({result.counts['imported'] / max(elapsed, 0.001):,.0f} docs/sec)", end="\r")
+        
+        result = self.import_file(input_file, collection, fmt, batch_size, workers, progress)
+        if not result:
+            print(f"{COLORS['RED']}❌ Error importing {collection}: {result.errors[0]}{COLORS['ENDC']}")
+            return None
+        print()
+        imported = result.counts["imported"]
+        print(f"{COLORS['GREEN']}✅ Imported {imported} {collection} in {result.elapsed:.1f}s "
+              f"({imported / max(result.elapsed, 0.001):,.0f} docs/sec).{COLORS['ENDC']}")
+        self._print_warnings(result)
+        if result.counts["rejected"]:
+            print(f"{COLORS['YELLOW']}⚠️ {result.counts['rejected']} rows rejected; see {result.rejected_file}{COLORS['ENDC']}")
+        return dict(result.counts, dropped_fields=result.dropped_fields)
+    
+    def _diff_fields(self, old, new):
+        """Return {field: [old, new]} for changed fields, with per-option vote counts for polls"""
+        changes = {}
+        for field in sorted(set(old) | set(new)):
+            if field == "options" and isinstance(old.get(field), list) and isinstance(new.get(field), list):
+                def option_votes(options):
+                    return {(o.get("text") if isinstance(o, dict) else o): (o.get("votes") if isinstance(o, dict) else None)
+                            for o in options}
+                old_options, new_options = option_votes(old[field]), option_votes(new[field])
+                for text in sorted(set(old_options) | set(new_options), key=str):
+                    if text not in new_options:
+                        changes[f"options[{text}]"] = ["present", None]
+                    elif text not in old_options:
+                        changes[f"options[{text}]"] = [None, "present"]
+                    elif old_options[text] != new_options[text]:
+                        changes[f"options[{text}].votes"] = [old_options[text], new_options[text]]
+            elif old.get(field) != new.get(field):
+                changes[field] = [old.get(field), new.get(field)]
+        return changes
+    
+    def diff_backups(self, backup_a, backup_b, output_file=None):
+        """Stream two backups in key order and merge-join them into a change list"""
+        from tabulate import tabulate
         try:
-            # Create backup directory if it doesn't exist
-            os.makedirs(BACKUP_DIR, exist_ok=True)
+            for backup_file in (backup_a, backup_b):
+                if not os.path.exists(backup_file):
+                    print(f"{COLORS['RED']}❌ Backup file not found: {backup_file}{COLORS['ENDC']}")
+                    return None
             
-            # Get all backup files
-            backup_files = [f for f in os.listdir(BACKUP_DIR) if f.startswith("partivotes_backup_") and f.endswith(".json")]
+            os.makedirs(EXPORT_DIR, exist_ok=True)
+            if not output_file:
+                timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+                output_file = os.path.join(EXPORT_DIR, f"backup_diff_{timestamp}.ndjson")
             
-            if not backup_files:
-                print(f"{COLORS['YELLOW']}No backups found.{COLORS['ENDC']}")
-                return []
+            meta_a, meta_b = backup_meta(backup_a), backup_meta(backup_b)
             
-            # Sort by timestamp (newest first)
-            backup_files.sort(reverse=True)
+            def sorted_documents(backup_file, meta, section, key_fields):
+                documents = iter_backup_documents(backup_file, section)
+                # Backups written by create_backup are already in BACKUP_ORDER
+                if meta.get("order", {}).get(section) == key_fields:
+                    return documents
+                return iter_sorted_by_id(documents)
             
-            # Print table
-            table_data = []
-            for i, file in enumerate(backup_files, 1):
-                # Extract timestamp from filename
-                timestamp = file.replace("partivotes_backup_", "").replace(".json", "")
-                formatted_time = datetime.datetime.strptime(timestamp, "%Y%m%d_%H%M%S").strftime("%Y-%m-%d %H:%M:%S")
-                
-                # Get file size
-                file_path = os.path.join(BACKUP_DIR, file)
-                size_kb = os.path.getsize(file_path) / 1024
-                
-                table_data.append([i, formatted_time, f"{size_kb:.1f} KB", file])
+            summary = {}
+            field_counts = {}
+            with open(output_file, "w") as out:
+                for section in BACKUP_SECTIONS:
+                    counts = summary[section] = {"added": 0, "removed": 0, "modified": 0, "unchanged": 0}
+                    
+                    # Merge-join on the order both backups share, otherwise sort both by _id
+                    key_fields = meta_a.get("order", {}).get(section)
+                    if not key_fields or key_fields != meta_b.get("order", {}).get(section):
+                        key_fields = ["_id"]
+                    key = lambda doc: tuple(str(doc.get(field)) for field in key_fields)
+                    
+                    old_docs = sorted_documents(backup_a, meta_a, section, key_fields)
+                    new_docs = sorted_documents(backup_b, meta_b, section, key_fields)
+                    old = next(old_docs, None)
+                    new = next(new_docs, None)
+                    
+                    while old is not None or new is not None:
+                        if new is None or (old is not None and key(old) < key(new)):
+                            record = {"collection": section, "change": "removed", "_id": old["_id"]}
+                            old = next(old_docs, None)
+                        elif old is None or key(new) < key(old):
+                            record = {"collection": section, "change": "added", "_id": new["_id"]}
+                            new = next(new_docs, None)
+                        else:
+                            fields = self._diff_fields(old, new) if old != new else {}
+                            record = {"collection": section, "change": "modified", "_id": old["_id"], "fields": fields}
+                            old = next(old_docs, None)
+                            new = next(new_docs, None)
+                            if not fields:
+                                counts["unchanged"] += 1
+                                continue
+                            for field in fields:
+                                count_key = (section, field.split("[")[0] if field.startswith("options[") else field)
+                                field_counts[count_key] = field_counts.get(count_key, 0) + 1
+                        
+                        counts[record["change"]] += 1
+                        out.write(json.dumps(record, cls=JSONEncoder) + "\n")
             
-            headers = ["#", "Created", "Size", "Filename"]
-            print(tabulate(table_data, headers=headers, tablefmt="grid"))
+            print(f"\n{COLORS['BOLD']}Diff:{COLORS['ENDC']} {backup_a} -> {backup_b}")
+            table_data = [[section, c["added"], c["removed"], c["modified"], c["unchanged"]] for section, c in summary.items()]
+            print(tabulate(table_data, headers=["Collection", "Added", "Removed", "Modified", "Unchanged"], tablefmt="grid"))
             
-            return backup_files
+            if field_counts:
+                print(f"\n{COLORS['BOLD']}Changed fields:{COLORS['ENDC']}")
+                table_data = [[section, field, count] for (section, field), count in
+                              sorted(field_counts.items(), key=lambda item: -item[1])]
+                print(tabulate(table_data, headers=["Collection", "Field", "Documents"], tablefmt="grid"))
+            
+            print(f"{COLORS['GREEN']}✅ Change list written to: {output_file}{COLORS['ENDC']}")
+            return summary
         except Exception as e:
-            print(f"{COLORS['RED']}❌ Error listing backups: {e}{COLORS['ENDC']}")
-            return []
+            print(f"{COLORS['RED']}❌ Error comparing backups: {e}{COLORS['ENDC']}")
+            return None
     
-    def export_polls_to_csv(self, output_file=None):
-        """Export polls to CSV format for external analysis"""
+    def restore_poll(self, backup_file, poll_id):
+        """Upsert a single poll and its votes from a backup, seeking via the backup index"""
+        from pymongo import ReplaceOne
         try:
-            # Create export directory if it doesn't exist
-            os.makedirs(EXPORT_DIR, exist_ok=True)
-            
-            # Create default filename if not provided
-            if not output_file:
-                timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                output_file = os.path.join(EXPORT_DIR, f"polls_export_{timestamp}.csv")
-            
-            # Get all polls
-            polls = list(self.db.polls.find())
-            
-            if not polls:
-                print(f"{COLORS['YELLOW']}No polls to export.{COLORS['ENDC']}")
-                return None
+            if not os.path.exists(backup_file):
+                print(f"{COLORS['RED']}❌ Backup file not found: {backup_file}{COLORS['ENDC']}")
+                return False
+            obj_id = _parse_object_id(poll_id, "poll ID")
             
-            # Prepare CSV data
-            csv_data = []
-            for poll in polls:
-                # Count votes for this poll
-                vote_count = self.db.votes.count_documents({"pollId": poll["_id"]})
-                
-                # Get options as a formatted string
-                options_str = "; ".join([f"{opt['text']} ({opt['votes']} votes)" for opt in poll["options"]])
+            index_file = backup_file + ".idx"
+            if os.path.exists(index_file):
+                ranges = self._lookup_backup_index(index_file, obj_id)
+                if ranges is None or not ranges[1]:
+                    print(f"{COLORS['YELLOW']}Poll with ID {poll_id} not found in backup.{COLORS['ENDC']}")
+                    return False
+                poll_offset, poll_length, votes_offset, votes_length = ranges
                 
-                # Add poll data
-                csv_data.append({
-                    "Poll ID": str(poll["_id"]),
-                    "Title": poll["title"],
-                    "Description": poll["description"],
-                    "Type": poll["type"],
-                    "Status": poll["status"],
-                    "Creator": poll["creator"],
-                    "Total Votes": poll["totalVotes"],
-                    "Actual Vote Count": vote_count,
-                    "Created At": poll["createdAt"].strftime("%Y-%m-%d %H:%M") if "createdAt" in poll else "N/A",
-                    "Start Date": poll["startDate"].strftime("%Y-%m-%d %H:%M") if "startDate" in poll else "N/A",
-                    "End Date": poll["endDate"].strftime("%Y-%m-%d %H:%M") if "endDate" in poll else "N/A",
-                    "Options": options_str
-                })
+                with open(backup_file, "rb") as f:
+                    f.seek(poll_offset)
+                    poll = json.loads(f.read(poll_length))
+                    f.seek(votes_offset)
+                    # Vote lines are "{...}," separated by newlines and indentation
+                    votes = [json.loads(line.strip().rstrip(b",")) for line in f.read(votes_length).split(b"\n")
+                             if line.strip()] if votes_length else []
+            else:
+                # Older backups have no index; fall back to a full streaming scan
+                print(f"{COLORS['YELLOW']}⚠️ No backup index found; scanning the whole backup.{COLORS['ENDC']}")
+                poll = None
+                votes = []
+                for section, doc in iter_backup(backup_file):
+                    if section == "polls" and doc["_id"] == poll_id:
+                        poll = doc
+                    elif section == "votes" and doc.get("pollId") == poll_id:
+                        votes.append(doc)
+                if poll is None:
+                    print(f"{COLORS['YELLOW']}Poll with ID {poll_id} not found in backup.{COLORS['ENDC']}")
+                    return False
             
-            # Write to CSV file
-            with open(output_file, "w", newline="") as f:
-                writer = csv.DictWriter(f, fieldnames=csv_data[0].keys())
-                writer.writeheader()
-                writer.writerows(csv_data)
+            # Convert string IDs and dates back to BSON types
+            restore_document("polls", poll)
+            for vote in votes:
+                restore_document("votes", vote)
             
-            print(f"{COLORS['GREEN']}✅ Exported {len(polls)} polls to: {output_file}{COLORS['ENDC']}")
-            return output_file
+            self.db.polls.replace_one({"_id": obj_id}, poll, upsert=True)
+            if votes:
+                self.db.votes.bulk_write([ReplaceOne({"_id": vote["_id"]}, vote, upsert=True) for vote in votes],
+                                         ordered=False)
+            
+            print(f"{COLORS['GREEN']}✅ Restored poll {poll_id} ({poll.get('title', 'Untitled')}) with {len(votes)} votes.{COLORS['ENDC']}")
+            return True
         except Exception as e:
-            print(f"{COLORS['RED']}❌ Error exporting polls: {e}{COLORS['ENDC']}")
+            print(f"{COLORS['RED']}❌ Error restoring poll: {e}{COLORS['ENDC']}")
+            return False
+    
+    def migrate_polls(self, dry_run=False, batch_size=MIGRATION_BATCH_SIZE, pause_ms=MIGRATION_PAUSE_MS, restart=False):
+        """Normalize poll options to {text, votes} and fill in missing totalVotes/status (resumable)"""
+        def progress(result):
+            print(f"  Scanned {result.counts['scanned']} polls, {result.counts['updated']} "
+                  f"{'to update' if dry_run else 'updated'}", end="\r")
+        
+        result = self.migrate(dry_run, batch_size, pause_ms, restart, progress)
+        print()
+        if not result:
+            print(f"{COLORS['RED']}❌ Error migrating polls: {result.errors[0]}{COLORS['ENDC']}")
             return None
+        if result.resumed_after is not None:
+            print(f"{COLORS['YELLOW']}Resumed migration after poll {result.resumed_after}.{COLORS['ENDC']}")
+        if dry_run:
+            for poll_id, fields in result.samples:
+                print(f"  {poll_id}: {', '.join(fields)}")
+            print(f"{COLORS['YELLOW']}Dry run: {result.counts['updated']} of {result.counts['scanned']} polls would be updated.{COLORS['ENDC']}")
+        else:
+            print(f"{COLORS['GREEN']}✅ Migrated {result.counts['updated']} of {result.counts['scanned']} polls in {result.elapsed:.1f}s.{COLORS['ENDC']}")
+            self._print_warnings(result)
+        return result.counts
+
+class RateLimiter:
+    """Thread-safe byte-rate limiter: each caller reserves its share of the bandwidth"""
+    
+    def __init__(self, bytes_per_sec):
+        """Initialize the limiter"""
+        import threading
+        self.bytes_per_sec = bytes_per_sec
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+    
+    def acquire(self, size):
+        """Block until `size` bytes may be sent"""
+        import time
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_slot)
+            self.next_slot = start + size / self.bytes_per_sec
+        if start > now:
+            time.sleep(start - now)
+
+class S3MultipartUploader:
+    """Streams bytes to an S3 multipart upload, uploading parts in parallel"""
+    
+    def __init__(self, client, bucket, key, part_size=OFFSITE_PART_SIZE, concurrency=OFFSITE_CONCURRENCY,
+                 max_bytes_per_sec=None, upload_id=None, done_parts=None):
+        """Initialize the uploader, creating the multipart upload unless resuming one"""
+        from collections import deque
+        from concurrent.futures import ThreadPoolExecutor
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(max_bytes_per_sec) if max_bytes_per_sec else None
+        self.upload_id = upload_id or client.create_multipart_upload(Bucket=bucket, Key=key)["UploadId"]
+        self.done_parts = dict(done_parts or {})
+        self.parts = dict(self.done_parts)
+        self.part_number = 0
+        self.buffer = bytearray()
+        self.pending = deque()
+        self.pool = ThreadPoolExecutor(max_workers=concurrency)
+    
+    def write(self, data):
+        """Buffer data, submitting a part upload whenever a full part is available"""
+        self.buffer += data
+        while len(self.buffer) >= self.part_size:
+            self._submit(bytes(self.buffer[:self.part_size]))
+            del self.buffer[:self.part_size]
+    
+    def skip_part(self):
+        """Advance past a part that a resumed upload already has"""
+        self.part_number += 1
+    
+    def _submit(self, body):
+        """Submit the next part, blocking while too many parts are in flight (backpressure)"""
+        self.part_number += 1
+        if self.part_number in self.done_parts:
+            return
+        while len(self.pending) >= self.concurrency * 2:
+            self._collect(self.pending.popleft())
+        self.pending.append(self.pool.submit(self._upload_part, self.part_number, body))
+    
+    def _upload_part(self, part_number, body):
+        """Upload one part (runs in the worker pool)"""
+        if self.limiter:
+            self.limiter.acquire(len(body))
+        response = self.client.upload_part(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                                           PartNumber=part_number, Body=body)
+        return part_number, response["ETag"]
+    
+    def _collect(self, future):
+        """Record a finished part (re-raising its error, if any)"""
+        part_number, etag = future.result()
+        self.parts[part_number] = etag
+    
+    def close(self):
+        """Upload the final part and complete the multipart upload"""
+        if self.buffer or not self.part_number:
+            self._submit(bytes(self.buffer))
+            self.buffer = bytearray()
+        while self.pending:
+            self._collect(self.pending.popleft())
+        self.pool.shutdown()
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            MultipartUpload={"Parts": [{"PartNumber": n, "ETag": self.parts[n]} for n in sorted(self.parts)]}
+        )
+    
+    def abort_pool(self):
+        """Stop local work after a failure, leaving the remote upload in place for resumption"""
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+class TailSegmentWriter:
+    """Appends batches of BSON change events to rolling gzip segment files"""
+    
+    def __init__(self, directory, max_bytes, max_seconds):
+        """Initialize the writer; the first segment is opened on the first write"""
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.file = None
+        self.bytes_written = 0
+        self.opened_at = 0
+    
+    def write(self, batch, now):
+        """Write a batch of encoded events as one gzip member, rotating the segment if needed"""
+        import gzip
+        if self.file is None or self.bytes_written >= self.max_bytes or now - self.opened_at >= self.max_seconds:
+            self.close()
+            name = datetime.datetime.now().strftime("segment_%Y%m%d_%H%M%S_%f.bson.gz")
+            self.file = open(os.path.join(self.directory, name), "ab")
+            self.bytes_written = 0
+            self.opened_at = now
+        
+        # Each batch is a complete gzip member, so a crash can only damage the last batch
+        data = b"".join(batch)
+        self.file.write(gzip.compress(data, compresslevel=6))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.bytes_written += len(data)
+    
+    def close(self):
+        """Close the current segment"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+class DashboardFeed:
+    """Background thread keeping an incrementally updated snapshot for the dashboard
+    
+    Only documents newer than what was already seen are fetched on each refresh:
+    votes by `_id`, active polls by `updatedAt`.
+    """
+    
+    def __init__(self, db, interval=DASHBOARD_REFRESH_SECONDS):
+        """Initialize the feed"""
+        import threading
+        from collections import deque
+        self.db = db
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.wake_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="dashboard-feed", daemon=True)
+        
+        self.active_polls = {}
+        self.recent_votes = deque(maxlen=DASHBOARD_RECENT_VOTES)
+        self.vote_times = deque()
+        self.counts = {}
+        self.latency_ms = None
+        self.last_refresh = None
+        self.error = None
+        self.last_vote_id = None
+        self.last_poll_update = None
+    
+    def start(self):
+        """Start fetching in the background"""
+        self.thread.start()
+    
+    def stop(self):
+        """Stop the background thread"""
+        self.stop_event.set()
+        self.wake_event.set()
+        self.thread.join(timeout=self.interval + 1)
+    
+    def refresh_now(self):
+        """Ask the background thread for an immediate refresh"""
+        self.wake_event.set()
+    
+    def snapshot(self):
+        """Return a consistent copy of the current data for drawing"""
+        import time
+        with self.lock:
+            cutoff = time.time() - DASHBOARD_RATE_WINDOW_SECONDS
+            rate = sum(1 for t in self.vote_times if t >= cutoff) * 60 / DASHBOARD_RATE_WINDOW_SECONDS
+            polls = sorted(self.active_polls.values(), key=lambda poll: -poll.get("totalVotes", 0))
+            return {
+                "polls": polls,
+                "votes": list(reversed(self.recent_votes)),
+                "rate": rate,
+                "counts": dict(self.counts),
+                "latency_ms": self.latency_ms,
+                "last_refresh": self.last_refresh,
+                "error": self.error
+            }
+    
+    def _run(self):
+        """Fetch loop; errors are shown on the dashboard instead of stopping the thread"""
+        while not self.stop_event.is_set():
+            try:
+                self._fetch()
+                with self.lock:
+                    self.error = None
+            except Exception as e:
+                with self.lock:
+                    self.error = str(e)
+            self.wake_event.wait(self.interval)
+            self.wake_event.clear()
+    
+    def _fetch(self):
+        """Fetch only what changed since the previous refresh"""
+        import time
+        from bson import ObjectId
+        
+        started = time.monotonic()
+        self.db.client.admin.command("ping")
+        latency_ms = (time.monotonic() - started) * 1000
+        counts = {"polls": self.db.polls.estimated_document_count(),
+                  "votes": self.db.votes.estimated_document_count()}
+        
+        # Votes newer than the last one seen (the first refresh seeds the rate window)
+        projection = {"pollId": 1, "voter": 1, "network": 1}
+        if self.last_vote_id is None:
+            since = ObjectId.from_datetime(datetime.datetime.now(datetime.timezone.utc) -
+                                           datetime.timedelta(seconds=DASHBOARD_RATE_WINDOW_SECONDS))
+            new_votes = list(self.db.votes.find({"_id": {"$gt": since}}, projection).sort("_id", 1))
+            if not new_votes:
+                new_votes = list(self.db.votes.find({}, projection).sort("_id", -1).limit(DASHBOARD_RECENT_VOTES))[::-1]
+        else:
+            new_votes = list(self.db.votes.find({"_id": {"$gt": self.last_vote_id}}, projection).sort("_id", 1))
+        
+        # Active polls: full load once, then only polls updated since the last refresh
+        poll_projection = {"title": 1, "status": 1, "type": 1, "totalVotes": 1, "endDate": 1, "updatedAt": 1}
+        if self.last_poll_update is None:
+            changed_polls = list(self.db.polls.find({"status": "ACTIVE"}, poll_projection))
+        else:
+            changed_polls = list(self.db.polls.find({"updatedAt": {"$gt": self.last_poll_update}}, poll_projection))
+        
+        with self.lock:
+            for vote in new_votes:
+                self.vote_times.append(vote["_id"].generation_time.timestamp())
+                self.recent_votes.append(vote)
+            cutoff = time.time() - DASHBOARD_RATE_WINDOW_SECONDS
+            while self.vote_times and self.vote_times[0] < cutoff:
+                self.vote_times.popleft()
+            if new_votes:
+                self.last_vote_id = new_votes[-1]["_id"]
+            elif self.last_vote_id is None:
+                self.last_vote_id = ObjectId.from_datetime(datetime.datetime.now(datetime.timezone.utc))
+            
+            for poll in changed_polls:
+                if poll.get("status") == "ACTIVE":
+                    self.active_polls[poll["_id"]] = poll
+                else:
+                    self.active_polls.pop(poll["_id"], None)
+                if poll.get("updatedAt") and (self.last_poll_update is None or poll["updatedAt"] > self.last_poll_update):
+                    self.last_poll_update = poll["updatedAt"]
+            if self.last_poll_update is None:
+                self.last_poll_update = datetime.datetime.utcnow()
+            
+            self.counts = counts
+            self.latency_ms = latency_ms
+            self.last_refresh = time.time()
+
+class Dashboard:
+    """Live-refreshing curses dashboard: active polls, vote rate, newest votes and health"""
+    
+    def __init__(self, db_manager, interval=DASHBOARD_REFRESH_SECONDS):
+        """Initialize the dashboard"""
+        self.db_manager = db_manager
+        self.interval = interval
+    
+    def run(self):
+        """Run the dashboard until the user presses q"""
+        try:
+            import curses
+        except ImportError:
+            print(f"{COLORS['RED']}❌ The dashboard needs the curses module (on Windows: pip install windows-curses).{COLORS['ENDC']}")
+            return False
+        
+        feed = DashboardFeed(self.db_manager.db, self.interval)
+        feed.start()
+        try:
+            curses.wrapper(self._loop, feed)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            feed.stop()
+        return True
+    
+    def _loop(self, stdscr, feed):
+        """Redraw from the latest snapshot; the screen never waits on the database"""
+        import curses
+        curses.curs_set(0)
+        curses.use_default_colors()
+        curses.init_pair(1, curses.COLOR_GREEN, -1)
+        curses.init_pair(2, curses.COLOR_RED, -1)
+        curses.init_pair(3, curses.COLOR_CYAN, -1)
+        stdscr.timeout(250)
+        
+        while True:
+            self._draw(stdscr, feed.snapshot())
+            key = stdscr.getch()
+            if key in (ord("q"), ord("Q"), 27):
+                break
+            if key in (ord("r"), ord("R")):
+                feed.refresh_now()
+    
+    def _draw(self, stdscr, data):
+        """Draw one frame"""
+        import curses
+        import time
+        stdscr.erase()
+        height, width = stdscr.getmaxyx()
+        
+        def line(y, text, attr=0):
+            if 0 <= y < height:
+                stdscr.addnstr(y, 0, text, width - 1, attr)
+        
+        line(0, " PartiVotes Live Dashboard ".center(width - 1, "="), curses.A_BOLD | curses.color_pair(3))
+        
+        # Health
+        if data["error"]:
+            health = ("DB ERROR: " + data["error"], curses.color_pair(2) | curses.A_BOLD)
+        elif data["last_refresh"] is None:
+            health = ("Connecting...", 0)
+        else:
+            health = (f"DB OK  ping {data['latency_ms']:.0f} ms  "
+                      f"polls ~{data['counts'].get('polls', 0):,}  votes ~{data['counts'].get('votes', 0):,}",
+                      curses.color_pair(1))
+        line(1, health[0], health[1])
+        age = f"{time.time() - data['last_refresh']:.0f}s ago" if data["last_refresh"] else "never"
+        line(2, f"Vote rate: {data['rate']:.1f}/min   Last refresh: {age}   (r: refresh, q: quit)")
+        
+        # Active polls take the top half, newest votes the rest
+        y = 4
+        polls_rows = max(1, (height - 8) // 2)
+        line(y, f"Active polls ({len(data['polls'])})", curses.A_BOLD)
+        y += 1
+        for poll in data["polls"][:polls_rows]:
+            end = poll["endDate"].strftime("%Y-%m-%d %H:%M") if poll.get("endDate") else "N/A"
+            line(y, f"  {poll.get('totalVotes', 0):>7}  {end}  {poll.get('type', ''):<16}  {poll.get('title', 'No Title')}")
+            y += 1
+        
+        y += 1
+        line(y, "Newest votes", curses.A_BOLD)
+        y += 1
+        titles = {poll["_id"]: poll.get("title", "") for poll in data["polls"]}
+        for vote in data["votes"]:
+            when = vote["_id"].generation_time.astimezone().strftime("%H:%M:%S")
+            poll_label = titles.get(vote.get("pollId")) or str(vote.get("pollId"))
+            line(y, f"  {when}  {vote.get('network', ''):<8}  {str(vote.get('voter') or '(private)')[:20]:<20}  {poll_label}")
+            y += 1
+        
+        stdscr.refresh()
 
 class InteractiveMenu:
     """Interactive menu for the database manager"""
     
-    def __init__(self):
+    def __init__(self, db_manager=None):
         """Initialize the interactive menu"""
-        self.db_manager = DBManager()
+        self.db_manager = db_manager or DBManager()
         self.current_polls = []
         self.current_backups = []
         
@@ -607,7 +3998,8 @@ class InteractiveMenu:
                 "List Backups",
                 "Restore from Backup",
                 "Export Polls to CSV",
-                "Check Database Health"
+                "Check Database Health",
+                "Live Dashboard"
             ]
             self.print_menu("Main Menu", options)
             
@@ -635,6 +4027,8 @@ class InteractiveMenu:
                 self.export_polls_menu()
             elif choice == 9:
                 self.check_health_menu()
+            elif choice == 10:
+                self.dashboard_menu()
                 
     def list_polls_menu(self):
         """Display the list polls menu"""
@@ -707,7 +4101,7 @@ class InteractiveMenu:
             elif filter_choice == 2:
                 # Filter by poll type
                 self.print_header()
-                type_options = ["SINGLE_CHOICE", "MULTIPLE_CHOICE", "RANKED_CHOICE"]
+                type_options = POLL_TYPES
                 self.print_menu("Select Poll Type", type_options)
                 type_choice = self.get_choice(len(type_options))
                 if type_choice > 0:
@@ -720,7 +4114,7 @@ class InteractiveMenu:
             elif filter_choice == 3:
                 # Filter by status
                 self.print_header()
-                status_options = ["ACTIVE", "PENDING", "ENDED", "CANCELLED"]
+                status_options = POLL_STATUSES
                 self.print_menu("Select Status", status_options)
                 status_choice = self.get_choice(len(status_options))
                 if status_choice > 0:
@@ -970,77 +4364,533 @@ class InteractiveMenu:
         self.db_manager.check_health()
         self.wait_for_key()
 
-def main():
-    """Main CLI entry point"""
-    parser = argparse.ArgumentParser(description="PartiVotes Database Manager")
-    parser.add_argument("command", nargs="?", default="help", 
-                      help="Command to run (list, view, delete, delete-all, backup, list-backups, restore, interactive)")
-    parser.add_argument("--type", choices=["SINGLE_CHOICE", "MULTIPLE_CHOICE", "RANKED_CHOICE"], 
-                      help="Filter by poll type")
-    parser.add_argument("--status", choices=["ACTIVE", "PENDING", "ENDED", "CANCELLED"], 
-                      help="Filter by poll status")
-    parser.add_argument("--limit", type=int, default=10, 
-                      help="Maximum number of polls to list")
-    parser.add_argument("--poll-id", help="Poll ID for view/delete commands")
-    parser.add_argument("--backup-file", help="Backup file path for restore command")
-    parser.add_argument("--force", action="store_true", 
-                      help="Skip confirmation for destructive actions")
+    def dashboard_menu(self):
+        """Open the live dashboard"""
+        if not self.db_manager.client and not self.db_manager.connect():
+            self.wait_for_key()
+            return
+        if not Dashboard(self.db_manager).run():
+            self.wait_for_key()
+
+# Command registry
+#
+# Each CLI command registers its handler together with the options it accepts and
+# whether it needs a live MongoDB connection. main() only connects (and pays for
+# the pymongo import and server round trip) for commands that declare needs_db.
+
+# Shared option definitions, referenced by name from command registrations
+OPTIONS = {
+    "type": (("--type",), {"choices": POLL_TYPES,
+                           "help": "Filter by poll type"}),
+    "status": (("--status",), {"choices": POLL_STATUSES,
+                               "help": "Filter by poll status"}),
+    "limit": (("--limit",), {"type": int, "default": 10,
+                             "help": "Maximum number of polls to list"}),
+    "poll-id": (("--poll-id",), {"help": "Poll ID for view/delete commands"}),
+    "backup-file": (("--backup-file",), {"help": "Backup file path for restore command"}),
+    "force": (("--force",), {"action": "store_true",
+                             "help": "Skip confirmation for destructive actions"}),
+    "include-archived": (("--include-archived",), {"action": "store_true",
+                                                   "help": "Include archived polls from the archive index"}),
+    "older-than": (("--older-than",), {"type": int, "default": 90,
+                                       "help": "Archive ENDED polls that ended more than this many days ago"}),
+    "batch-size": (("--batch-size",), {"type": int,
+                                       "help": "Number of documents processed per batch"}),
+    "new-base": (("--new-base",), {"action": "store_true",
+                                   "help": "Take a new base snapshot instead of resuming"}),
+    "segment-mb": (("--segment-mb",), {"type": int, "default": TAIL_SEGMENT_MAX_BYTES // (1024 * 1024),
+                                       "help": "Rotate tail segments after this many MB"}),
+    "segment-minutes": (("--segment-minutes",), {"type": int, "default": TAIL_SEGMENT_MAX_SECONDS // 60,
+                                                 "help": "Rotate tail segments after this many minutes"}),
+    "replay-tail": (("--replay-tail",), {"action": "store_true",
+                                         "help": "Replay tail-backup segments on top of a base snapshot"}),
+    "granularity": (("--granularity",), {"choices": ROLLUP_GRANULARITIES, "default": "hour",
+                                         "help": "Vote-rate bucket size"}),
+    "since": (("--since",), {"type": datetime.datetime.fromisoformat,
+                             "help": "Only include buckets from this time (ISO format, UTC)"}),
+    "prefix-length": (("--prefix-length",), {"type": int, "default": BURST_PREFIX_LENGTH,
+                                             "help": "Voter address prefix length used for burst detection"}),
+    "window": (("--window",), {"type": int, "default": BURST_WINDOW_SECONDS,
+                               "help": "Burst detection window in seconds"}),
+    "threshold": (("--threshold",), {"type": int, "default": BURST_THRESHOLD,
+                                     "help": "Votes within the window that count as a burst"}),
+    "file": (("--file",), {"help": "Input file for the import command"}),
+    "collection": (("--collection",), {"choices": ["polls", "votes"], "default": "polls",
+                                       "help": "Collection to import into"}),
+    "format": (("--format",), {"choices": ["ndjson", "csv"],
+                               "help": "Input format (default: from the file extension)"}),
+    "export-format": (("--format",), {"choices": ["csv", "sqlite"], "default": "csv",
+                                      "help": "Export format"}),
+    "output": (("--output",), {"help": "Output file path (default: in the exports directory)"}),
+    "quick": (("--quick",), {"action": "store_true",
+                             "help": "Use estimated counts and sampling instead of exact counts (fast on large collections)"}),
+    "publish-dir": (("--output-dir",), {"dest": "output_dir",
+                                        "help": "Snapshot directory (default: snapshots/)"}),
+    "full": (("--full",), {"action": "store_true",
+                           "help": "Re-render every poll instead of only changed ones"}),
+    "interval": (("--interval",), {"type": float, "default": DASHBOARD_REFRESH_SECONDS,
+                                   "help": "Seconds between dashboard refreshes"}),
+    "refresh": (("--refresh",), {"action": "store_true",
+                                 "help": "Incrementally refresh an existing SQLite export"}),
+    "offsite": (("--offsite",), {"action": "store_true",
+                                 "help": "Also stream the backup to S3-compatible storage (OFFSITE_S3_* settings)"}),
+    "remote": (("--remote",), {"action": "store_true",
+                               "help": "List backups in offsite storage"}),
+    "bandwidth-mbps": (("--bandwidth-mbps",), {"type": float,
+                                               "help": "Limit offsite upload bandwidth (megabits per second)"}),
+    "workers": (("--workers",), {"type": int,
+                                 "help": "Parser processes (default: CPU count - 1)"}),
+    "backups": (("backups",), {"nargs": 2, "metavar": "BACKUP",
+                               "help": "Backup files to compare (paths or names in the backup directory)"}),
+    "dry-run": (("--dry-run",), {"action": "store_true",
+                                 "help": "Report what would change without writing"}),
+    "pause-ms": (("--pause-ms",), {"type": int, "default": MIGRATION_PAUSE_MS,
+                                   "help": "Pause between batches in milliseconds (throttling)"}),
+    "restart": (("--restart",), {"action": "store_true",
+                                 "help": "Ignore the saved checkpoint and start from the first poll"}),
+    "create": (("--create",), {"action": "store_true",
+                               "help": "Create the missing recommended indexes"}),
+    "script": (("script",), {"nargs": "?", "default": "-",
+                             "help": "Script file with one command per line (default: stdin)"}),
+    "concurrency": (("--concurrency",), {"type": int, "default": 1,
+                                         "help": "Read-only steps to run at once (changes always run alone, in order)"}),
+    "keep-going": (("--keep-going",), {"action": "store_true",
+                                       "help": "Continue after a failed step"}),
+    "report": (("--report",), {"help": "Write per-step timings and status as JSON"}),
+    "plan-file": (("--plan-file",), {"help": "Cleanup plan file (NDJSON) to write or apply"}),
+    "until": (("--until",), {"type": datetime.datetime.fromisoformat,
+                             "help": "Replay changes up to this time (ISO format, local time unless an offset is given)"}),
+}
+
+# Options of the original single-parser CLI, still accepted before the command name
+# (e.g. "db_manager.py --status ACTIVE list") as well as after it
+GLOBAL_OPTIONS = ("type", "status", "limit", "poll-id", "backup-file", "force")
+
+COMMANDS = {}
+
+class Command:
+    """A registered CLI command"""
     
-    # Parse arguments
-    args = parser.parse_args()
+    def __init__(self, name, handler, help, needs_db, options):
+        self.name = name
+        self.handler = handler
+        self.help = help
+        self.needs_db = needs_db
+        self.options = options
+
+def command(name, help, needs_db=True, options=()):
+    """Register a CLI command handler taking (db_manager, args)"""
+    def register(handler):
+        COMMANDS[name] = Command(name, handler, help, needs_db, options)
+        return handler
+    return register
+
+def require(value, label, command_name):
+    """Check that a required option was given, printing an error if not"""
+    if not value:
+        print(f"{COLORS['RED']}Error: {label} is required for {command_name} command.{COLORS['ENDC']}")
+        return False
+    return True
+
+@command("help", "Show this help message", needs_db=False)
+def _cmd_help(db_manager, args):
+    print(f"{COLORS['BOLD']}PartiVotes Database Manager{COLORS['ENDC']}")
+    print(f"\nUsage: {sys.argv[0]} [command] [options]\n")
+    print(f"Commands:")
+    width = max(len(name) for name in COMMANDS) + 3
+    for name, cmd in COMMANDS.items():
+        if name != "help":
+            print(f"  {name.ljust(width)}{cmd.help}")
+    print(f"\nUse [command] --help for more information on options.")
+    return True
+
+@command("interactive", "Run in interactive menu mode")
+def _cmd_interactive(db_manager, args):
+    menu = InteractiveMenu(db_manager)
+    menu.main_menu()
+    return True
+
+@command("list", "List polls", options=("type", "status", "limit", "include-archived", "quick"))
+def _cmd_list(db_manager, args):
+    db_manager.list_polls(args.type, args.status, args.limit, include_archived=args.include_archived,
+                          quick=args.quick)
+    return True
+
+@command("view", "View poll details", options=("poll-id",))
+def _cmd_view(db_manager, args):
+    if not require(args.poll_id, "Poll ID", "view"):
+        return False
+    return db_manager.view_poll(args.poll_id) is not None
+
+@command("delete", "Delete a poll", options=("poll-id", "force"))
+def _cmd_delete(db_manager, args):
+    if not require(args.poll_id, "Poll ID", "delete"):
+        return False
+    return db_manager.delete_poll(args.poll_id, args.force)
+
+@command("delete-all", "Delete all polls", options=("force",))
+def _cmd_delete_all(db_manager, args):
+    return db_manager.delete_all_polls(args.force)
+
+def _bandwidth_limit(args):
+    """Convert --bandwidth-mbps to bytes per second"""
+    return args.bandwidth_mbps * 1000 * 1000 / 8 if args.bandwidth_mbps else None
+
+@command("backup", "Create a database backup", options=("offsite", "bandwidth-mbps"))
+def _cmd_backup(db_manager, args):
+    return db_manager.create_backup(offsite=args.offsite, max_bytes_per_sec=_bandwidth_limit(args)) is not None
+
+@command("list-backups", "List available backups", needs_db=False, options=("remote",))
+def _cmd_list_backups(db_manager, args):
+    db_manager.list_backups(args.remote)
+    return True
+
+@command("offsite-upload", "Upload a local backup offsite, resuming an interrupted upload", needs_db=False,
+         options=("backup-file", "bandwidth-mbps"))
+def _cmd_offsite_upload(db_manager, args):
+    if not require(args.backup_file, "Backup file path", "offsite-upload"):
+        return False
+    return db_manager.offsite_upload(args.backup_file, _bandwidth_limit(args)) is not None
+
+@command("verify", "Verify a backup file without connecting", needs_db=False, options=("backup-file",))
+def _cmd_verify(db_manager, args):
+    if not require(args.backup_file, "Backup file path", "verify"):
+        return False
+    return db_manager.verify_backup(args.backup_file)
+
+@command("restore", "Restore from backup", options=("backup-file", "force", "replay-tail", "until"))
+def _cmd_restore(db_manager, args):
+    if not require(args.backup_file, "Backup file path", "restore"):
+        return False
+    if args.replay_tail or args.until:
+        return db_manager.replay_tail(args.backup_file, args.until, args.force)
+    return db_manager.restore_backup(args.backup_file, args.force)
+
+@command("restore-poll", "Restore a single poll and its votes from a backup",
+         options=("backup-file", "poll-id"))
+def _cmd_restore_poll(db_manager, args):
+    if not require(args.backup_file, "Backup file path", "restore-poll") or not require(args.poll_id, "Poll ID", "restore-poll"):
+        return False
+    return db_manager.restore_poll(args.backup_file, args.poll_id)
+
+@command("tail-backup", "Continuously back up changes from a change stream",
+         options=("new-base", "segment-mb", "segment-minutes"))
+def _cmd_tail_backup(db_manager, args):
+    return db_manager.tail_backup(args.new_base,
+                                  segment_max_bytes=args.segment_mb * 1024 * 1024,
+                                  segment_max_seconds=args.segment_minutes * 60)
+
+@command("archive", "Move old ENDED polls and their votes to cold storage",
+         options=("older-than", "batch-size", "force"))
+def _cmd_archive(db_manager, args):
+    return db_manager.archive_polls(args.older_than, args.batch_size or ARCHIVE_BATCH_SIZE, args.force) is not None
+
+@command("rehydrate", "Reload an archived poll into the database", options=("poll-id",))
+def _cmd_rehydrate(db_manager, args):
+    if not require(args.poll_id, "Poll ID", "rehydrate"):
+        return False
+    return db_manager.rehydrate_poll(args.poll_id)
+
+@command("rollup", "Incrementally update per-poll hourly/daily vote rollups")
+def _cmd_rollup(db_manager, args):
+    return db_manager.update_rollups() is not None
+
+@command("rates", "View vote rates from the rollup collection", options=("poll-id", "granularity", "since"))
+def _cmd_rates(db_manager, args):
+    db_manager.view_vote_rates(args.poll_id, args.granularity, args.since)
+    return True
+
+@command("export-rates", "Export vote rates from the rollup collection to CSV",
+         options=("poll-id", "granularity", "since"))
+def _cmd_export_rates(db_manager, args):
+    return db_manager.export_vote_rates_to_csv(args.poll_id, args.granularity, args.since) is not None
+
+@command("scan-duplicates", "Find duplicate ballots and voter-prefix vote bursts",
+         options=("prefix-length", "window", "threshold", "plan-file"))
+def _cmd_scan_duplicates(db_manager, args):
+    return db_manager.scan_duplicates(args.prefix_length, args.window, args.threshold, args.plan_file) is not None
+
+@command("apply-cleanup", "Delete duplicate votes listed in a cleanup plan", options=("plan-file", "force"))
+def _cmd_apply_cleanup(db_manager, args):
+    if not require(args.plan_file, "Cleanup plan file", "apply-cleanup"):
+        return False
+    return db_manager.apply_cleanup_plan(args.plan_file, force=args.force)
+
+@command("indexes", "Check indexes and query plans, optionally creating recommended indexes",
+         options=("create",))
+def _cmd_indexes(db_manager, args):
+    if args.create:
+        return db_manager.ensure_indexes()
+    return db_manager.check_indexes() is not None
+
+@command("import", "Append polls or votes from an NDJSON or CSV file",
+         options=("file", "collection", "format", "batch-size", "workers"))
+def _cmd_import(db_manager, args):
+    if not require(args.file, "Input file", "import"):
+        return False
+    stats = db_manager.import_documents(args.file, args.collection, args.format,
+                                        args.batch_size or IMPORT_BATCH_SIZE, args.workers)
+    return stats is not None and stats["rejected"] == 0
+
+@command("diff-backups", "Compare two backups and write an NDJSON change list", needs_db=False,
+         options=("backups",))
+def _cmd_diff_backups(db_manager, args):
+    backup_a, backup_b = (path if os.path.exists(path) else os.path.join(BACKUP_DIR, path) for path in args.backups)
+    return db_manager.diff_backups(backup_a, backup_b) is not None
+
+@command("migrate", "Normalize poll options to {text, votes} and fill missing fields (resumable)",
+         options=("dry-run", "batch-size", "pause-ms", "restart"))
+def _cmd_migrate(db_manager, args):
+    return db_manager.migrate_polls(args.dry_run, args.batch_size or MIGRATION_BATCH_SIZE,
+                                    args.pause_ms, args.restart) is not None
+
+@command("export", "Export polls to CSV or an indexed SQLite database",
+         options=("export-format", "output", "refresh", "quick"))
+def _cmd_export(db_manager, args):
+    if args.format == "sqlite":
+        return db_manager.export_to_sqlite(args.output, args.refresh) is not None
+    return db_manager.export_polls_to_csv(args.output, args.quick) is not None
+
+@command("dashboard", "Show a live-refreshing dashboard of polls, votes and health", options=("interval",))
+def _cmd_dashboard(db_manager, args):
+    return Dashboard(db_manager, args.interval).run()
+
+@command("publish", "Publish static JSON poll snapshots for nginx (incremental)",
+         options=("publish-dir", "full"))
+def _cmd_publish(db_manager, args):
+    return db_manager.publish_snapshots(args.output_dir, args.full) is not None
+
+@command("run-script", "Run commands from a file or stdin over one connection", needs_db=False,
+         options=("script", "concurrency", "keep-going", "report"))
+def _cmd_run_script(db_manager, args):
+    import time
+    from tabulate import tabulate
+    try:
+        steps = load_script(args.script)
+    except (OSError, ValueError) as e:
+        print(f"{COLORS['RED']}❌ Invalid script: {e}{COLORS['ENDC']}")
+        return False
     
-    # Initialize database manager
-    db_manager = DBManager()
+    started = time.perf_counter()
+    reports = run_script(db_manager, steps, args.concurrency, args.keep_going)
+    if reports is None:
+        return False
+    elapsed = time.perf_counter() - started
     
-    # Run in interactive mode if requested
-    if args.command == "interactive":
-        menu = InteractiveMenu()
-        menu.main_menu()
-        return
+    table_data = [[report["step"], report["command"], "ok" if report["ok"] else "FAILED", f"{report['elapsed']:.3f}"]
+                  for report in reports]
+    print(f"\n{COLORS['BOLD']}Script summary:{COLORS['ENDC']}")
+    print(tabulate(table_data, headers=["#", "Command", "Status", "Time (s)"], tablefmt="grid"))
+    
+    failures = sum(1 for report in reports if not report["ok"])
+    skipped = len(steps) - len(reports)
+    color = COLORS["GREEN"] if not failures and not skipped else COLORS["RED"]
+    print(f"{color}{len(reports) - failures} ok, {failures} failed, {skipped} skipped in {elapsed:.2f}s{COLORS['ENDC']}")
+    
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"script": args.script, "elapsed": round(elapsed, 3), "steps": reports,
+                       "skipped": skipped}, f, indent=2)
+    return not failures and not skipped
+
+@command("health", "Check database health", options=("quick",))
+def _cmd_health(db_manager, args):
+    return db_manager.check_health(args.quick)
+
+class ScriptOutput:
+    """sys.stdout proxy that sends each concurrently running script step's output to its own buffer"""
+    
+    def __init__(self, stream):
+        """Initialize the proxy around the real stream"""
+        import threading
+        self.stream = stream
+        self.local = threading.local()
+    
+    def write(self, text):
+        return (getattr(self.local, "buffer", None) or self.stream).write(text)
+    
+    def flush(self):
+        self.stream.flush()
+    
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+def load_script(script_file):
+    """Parse a script (one command per line, '#' comments) into (line, text, args) steps
+    
+    Every line is parsed before anything runs, so a typo fails the script up front.
+    """
+    import shlex
+    parser = build_parser()
+    handle = sys.stdin if script_file == "-" else open(script_file, "r")
+    try:
+        lines = handle.read().splitlines()
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+    
+    steps = []
+    for line_number, line in enumerate(lines, 1):
+        text = line.strip()
+        if not text or text.startswith("#"):
+            continue
+        tokens = shlex.split(text, comments=True)
+        if tokens and tokens[0] in ("db_manager.py", "tools/db_manager.py"):
+            tokens = tokens[1:]
+        if not tokens or tokens[0] not in COMMANDS:
+            raise ValueError(f"line {line_number}: unknown command {tokens[0] if tokens else text!r}")
+        if tokens[0] in SCRIPT_EXCLUDED_COMMANDS:
+            raise ValueError(f"line {line_number}: {tokens[0]} cannot run inside a script")
+        try:
+            args = parser.parse_args(tokens)
+        except SystemExit:
+            raise ValueError(f"line {line_number}: invalid arguments: {text}")
+        steps.append((line_number, text, args))
+    return steps
+
+def _step_is_read_only(args):
+    """True if a parsed script step leaves the database unchanged"""
+    if args.command == "indexes":
+        return not args.create
+    if args.command == "migrate":
+        return args.dry_run
+    return args.command in SCRIPT_READ_ONLY_COMMANDS
+
+def run_script(db_manager, steps, concurrency=1, keep_going=False):
+    """Run parsed script steps over one connection and return per-step reports
+    
+    Read-only steps run up to `concurrency` at a time; a step that changes the
+    database waits for the running steps, runs alone, and clears the result cache.
+    Steps that write local files (SCRIPT_EXCLUSIVE_COMMANDS) also run alone. With
+    concurrency above 1, steps that would prompt must be given --force.
+    """
+    import io
+    import time
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+    
+    if concurrency > 1:
+        prompting = [f"line {line_number}: {text}" for line_number, text, args in steps
+                     if args.command in SCRIPT_PROMPTING_COMMANDS and not args.force]
+        if prompting:
+            print(f"{COLORS['RED']}❌ These steps ask for confirmation, which cannot be answered with --concurrency "
+                  f"above 1; add --force to them or run the script with --concurrency 1:{COLORS['ENDC']}")
+            for step in prompting:
+                print(f"   {step}")
+            return None
+    
+    # One client for the whole script: connect once if any step needs the database
+    if any(COMMANDS[args.command].needs_db for _, _, args in steps) and db_manager.client is None:
+        if not db_manager.connect():
+            return None
+    db_manager.cache = {}
+    
+    reports = []
+    output = ScriptOutput(sys.stdout) if concurrency > 1 else None
+    
+    def execute(index, line_number, text, args):
+        if output:
+            output.local.buffer = io.StringIO()
+        started = time.perf_counter()
+        error = None
+        try:
+            ok = run_command(args, db_manager)
+        except (Exception, SystemExit, EOFError) as e:
+            ok = False
+            error = str(e) or type(e).__name__
+        report = {"step": index, "line": line_number, "command": text, "ok": ok,
+                  "elapsed": round(time.perf_counter() - started, 3)}
+        if error:
+            report["error"] = error
+        if output:
+            report["output"] = output.local.buffer.getvalue()
+            output.local.buffer = None
+        return report
+    
+    def finish(report):
+        if output:
+            output.stream.write(f"{COLORS['BOLD']}▶ [{report['step']}/{len(steps)}] {report['command']}{COLORS['ENDC']}\n")
+            output.stream.write(report.pop("output"))
+        if "error" in report:
+            print(f"{COLORS['RED']}❌ Step {report['step']} failed: {report['error']}{COLORS['ENDC']}")
+        reports.append(report)
+        return report["ok"]
+    
+    failed = False
+    if output:
+        sys.stdout = output
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            running = set()
+            
+            def drain(limit):
+                nonlocal running, failed
+                while len(running) > limit:
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if not finish(future.result()):
+                            failed = True
+            
+            for index, (line_number, text, args) in enumerate(steps, 1):
+                if failed and not keep_going:
+                    break
+                if concurrency <= 1:
+                    print(f"{COLORS['BOLD']}▶ [{index}/{len(steps)}] {text}{COLORS['ENDC']}")
+                    failed = not finish(execute(index, line_number, text, args)) or failed
+                elif _step_is_read_only(args) and args.command not in SCRIPT_EXCLUSIVE_COMMANDS:
+                    drain(concurrency - 1)
+                    running.add(pool.submit(execute, index, line_number, text, args))
+                else:
+                    # Changes and local file writers run alone and in script order
+                    drain(0)
+                    if failed and not keep_going:
+                        break
+                    failed = not finish(pool.submit(execute, index, line_number, text, args).result()) or failed
+                if not _step_is_read_only(args):
+                    db_manager.cache.clear()
+            drain(0)
+    finally:
+        if output:
+            sys.stdout = output.stream
+        db_manager.cache = None
+    
+    reports.sort(key=lambda report: report["step"])
+    return reports
+
+def build_parser():
+    """Build the argument parser from the command registry"""
+    parser = argparse.ArgumentParser(description="PartiVotes Database Manager")
+    for option in GLOBAL_OPTIONS:
+        flags, kwargs = OPTIONS[option]
+        parser.add_argument(*flags, **kwargs)
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    for name, cmd in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=cmd.help, description=cmd.help)
+        for option in cmd.options:
+            flags, kwargs = OPTIONS[option]
+            if option in GLOBAL_OPTIONS:
+                # No subcommand default, so a value given before the command is kept
+                kwargs = dict(kwargs, default=argparse.SUPPRESS)
+            subparser.add_argument(*flags, **kwargs)
+    return parser
+
+def run_command(args, db_manager=None):
+    """Run a parsed command, connecting to MongoDB only if the command needs it"""
+    cmd = COMMANDS[args.command or "help"]
+    if db_manager is None:
+        db_manager = DBManager(connect=False)
+    if cmd.needs_db and db_manager.client is None and not db_manager.connect():
+        return False
+    return bool(cmd.handler(db_manager, args))
+
+def main(argv=None):
+    """Main CLI entry point"""
+    parser = build_parser()
+    
+    # Parse arguments
+    args = parser.parse_args(argv)
     
     # Execute command
-    if args.command == "list":
-        db_manager.list_polls(args.type, args.status, args.limit)
-    elif args.command == "view":
-        if not args.poll_id:
-            print(f"{COLORS['RED']}Error: Poll ID is required for view command.{COLORS['ENDC']}")
-            return
-        db_manager.view_poll(args.poll_id)
-    elif args.command == "delete":
-        if not args.poll_id:
-            print(f"{COLORS['RED']}Error: Poll ID is required for delete command.{COLORS['ENDC']}")
-            return
-        db_manager.delete_poll(args.poll_id, args.force)
-    elif args.command == "delete-all":
-        db_manager.delete_all_polls(args.force)
-    elif args.command == "backup":
-        db_manager.create_backup()
-    elif args.command == "list-backups":
-        db_manager.list_backups()
-    elif args.command == "restore":
-        if not args.backup_file:
-            print(f"{COLORS['RED']}Error: Backup file path is required for restore command.{COLORS['ENDC']}")
-            return
-        db_manager.restore_backup(args.backup_file, args.force)
-    elif args.command == "export":
-        db_manager.export_polls_to_csv()
-    elif args.command == "health":
-        db_manager.check_health()
-    else:
-        print(f"{COLORS['BOLD']}PartiVotes Database Manager{COLORS['ENDC']}")
-        print(f"\nUsage: {sys.argv[0]} [command] [options]\n")
-        print(f"Commands:")
-        print(f"  interactive    Run in interactive menu mode")
-        print(f"  list           List polls")
-        print(f"  view           View poll details")
-        print(f"  delete         Delete a poll")
-        print(f"  delete-all     Delete all polls")
-        print(f"  backup         Create a database backup")
-        print(f"  list-backups   List available backups")
-        print(f"  restore        Restore from backup")
-        print(f"  export         Export polls to CSV")
-        print(f"  health         Check database health")
-        print(f"\nUse --help for more information on options.")
+    return 0 if run_command(args) else 1
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+PartiVotes API Load Tester
+
+Replays a configurable mix of reads and writes against a local server.js
+(GET /api/polls, GET /api/polls/:id, POST /api/polls) at a fixed concurrency
+(closed loop) or a fixed arrival rate (open loop), and reports throughput and
+coordinated-omission-corrected latency percentiles as JSON.
+
+Usage:
+  python tools/load_test.py --seed-polls 5000 --seed-votes 50 --concurrency 64 --duration 30
+  python tools/load_test.py --rate 500 --mix list=20,get=70,create=10 --output run.json
+"""
+
+# Only the standard library is needed for the HTTP side; the database (seeding and
+# poll IDs) is reached through db_manager, which imports pymongo lazily.
+import os
+import sys
+import json
+import random
+import asyncio
+import argparse
+import datetime
+import tempfile
+
+from db_manager import COLORS, DBManager
+
+# Target server and default workload
+DEFAULT_URL = "http://localhost:3000"
+DEFAULT_MIX = "list=40,list-status=10,get=40,create=10"
+DEFAULT_DURATION = 30
+DEFAULT_CONCURRENCY = 32
+
+# Open-loop mode: requests allowed in flight before new arrivals queue (their latency
+# still counts from the scheduled arrival time)
+DEFAULT_MAX_IN_FLIGHT = 1000
+
+# Poll IDs loaded from the database for GET /api/polls/:id
+POLL_ID_SAMPLE = 10000
+
+# Histogram bucket upper bounds in milliseconds (roughly logarithmic)
+HISTOGRAM_BUCKETS_MS = [1, 2, 3, 5, 7, 10, 15, 20, 30, 50, 75, 100, 150, 200, 300, 500,
+                        750, 1000, 1500, 2000, 3000, 5000, 10000]
+
+OPERATIONS = ["list", "list-status", "get", "create"]
+
+def parse_mix(text):
+    """Parse "op=weight,..." into a list of (operation, weight)"""
+    mix = []
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation {name!r} (choose from {', '.join(OPERATIONS)})")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+def correct_for_omission(latencies, expected_interval):
+    """Back-fill the samples a closed-loop client failed to send while it was stalled
+
+    Same rule as HdrHistogram's recordValueWithExpectedInterval: a response that
+    took L seconds when requests were expected every `expected_interval` seconds
+    also stands for requests that would have seen L - interval, L - 2*interval, ...
+    """
+    corrected = list(latencies)
+    if not expected_interval:
+        return corrected
+    for latency in latencies:
+        missing = latency - expected_interval
+        while missing >= expected_interval:
+            corrected.append(missing)
+            missing -= expected_interval
+    return corrected
+
+def summarize(latencies):
+    """Latency percentiles (ms) and a bucketed histogram for a list of seconds"""
+    values = sorted(latency * 1000 for latency in latencies)
+    if not values:
+        return {"count": 0}
+    histogram = []
+    index = 0
+    for bound in HISTOGRAM_BUCKETS_MS + [float("inf")]:
+        start = index
+        while index < len(values) and values[index] <= bound:
+            index += 1
+        histogram.append({"le_ms": bound if bound != float("inf") else "+Inf", "count": index - start})
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 3),
+        "p50": round(percentile(values, 0.50), 3),
+        "p95": round(percentile(values, 0.95), 3),
+        "p99": round(percentile(values, 0.99), 3),
+        "p999": round(percentile(values, 0.999), 3),
+        "max": round(values[-1], 3),
+        "histogram": histogram
+    }
+
+class HTTPConnection:
+    """Minimal keep-alive HTTP/1.1 client connection on asyncio streams"""
+
+    def __init__(self, host, port):
+        """Initialize the connection (opened lazily)"""
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, body=None):
+        """Send a request and read the full response; returns the status code"""
+        if self.writer is None:
+            import socket
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            # Small request/response pairs: don't let Nagle's algorithm add latency
+            self.writer.get_extra_info("socket").setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        payload = json.dumps(body).encode() if body is not None else b""
+        headers = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}",
+                   "Accept: application/json", "Connection: keep-alive"]
+        if body is not None:
+            headers += ["Content-Type: application/json", f"Content-Length: {len(payload)}"]
+        self.writer.write(("\r\n".join(headers) + "\r\n\r\n").encode() + payload)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed by server")
+        status = int(status_line.split()[1])
+
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        # Drain the body so the connection can be reused
+        if response_headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif "content-length" in response_headers:
+            await self.reader.readexactly(int(response_headers["content-length"]))
+        else:
+            await self.reader.read()
+            self.close()
+
+        if response_headers.get("connection", "").lower() == "close":
+            self.close()
+        return status
+
+    def close(self):
+        """Close the socket"""
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+class LoadTester:
+    """Drives the request mix and records per-operation latencies"""
+
+    def __init__(self, url, mix, poll_ids):
+        """Initialize the load tester"""
+        from urllib.parse import urlsplit
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.operations = [name for name, _ in mix]
+        self.weights = [weight for _, weight in mix]
+        self.poll_ids = poll_ids
+        self.connections = []
+        self.latencies = {name: [] for name in self.operations}
+        self.status_codes = {name: {} for name in self.operations}
+        self.errors = {name: 0 for name in self.operations}
+
+    def next_request(self):
+        """Pick an operation from the mix and build its request"""
+        operation = random.choices(self.operations, self.weights)[0]
+        if operation == "list":
+            return operation, "GET", "/api/polls", None
+        if operation == "list-status":
+            return operation, "GET", f"/api/polls?status={random.choice(['ACTIVE', 'ENDED', 'PENDING'])}", None
+        if operation == "get" and self.poll_ids:
+            return operation, "GET", f"/api/polls/{random.choice(self.poll_ids)}", None
+        if operation == "get":
+            return operation, "GET", "/api/polls/000000000000000000000000", None
+        return operation, "POST", "/api/polls", generate_poll(random.randrange(1 << 30), api=True)
+
+    async def send(self, connection, request, started):
+        """Send one request and record its latency measured from `started`"""
+        loop = asyncio.get_running_loop()
+        operation, method, path, body = request
+        try:
+            status = await connection.request(method, path, body)
+            codes = self.status_codes[operation]
+            codes[status] = codes.get(status, 0) + 1
+            if status >= 500:
+                self.errors[operation] += 1
+        except (OSError, ValueError, asyncio.IncompleteReadError) as e:
+            connection.close()
+            self.errors[operation] += 1
+            codes = self.status_codes[operation]
+            codes[type(e).__name__] = codes.get(type(e).__name__, 0) + 1
+        self.latencies[operation].append(loop.time() - started)
+
+    async def run_closed(self, concurrency, duration):
+        """Closed loop: each worker sends its next request as soon as the previous one returns"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + duration
+
+        async def worker():
+            connection = HTTPConnection(self.host, self.port)
+            self.connections.append(connection)
+            while loop.time() < deadline:
+                await self.send(connection, self.next_request(), loop.time())
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    async def run_open(self, rate, duration, max_in_flight):
+        """Open loop: requests arrive on a fixed schedule whether or not earlier ones finished
+
+        Latency is measured from the scheduled arrival time, so time spent queued
+        behind a slow server is counted (no coordinated omission).
+        """
+        loop = asyncio.get_running_loop()
+        idle = []
+        in_flight = asyncio.Semaphore(max_in_flight)
+
+        async def arrival(intended):
+            async with in_flight:
+                connection = idle.pop() if idle else HTTPConnection(self.host, self.port)
+                if connection not in self.connections:
+                    self.connections.append(connection)
+                await self.send(connection, self.next_request(), intended)
+                idle.append(connection)
+
+        start = loop.time()
+        tasks = []
+        count = int(rate * duration)
+        for i in range(count):
+            intended = start + i / rate
+            delay = intended - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(arrival(intended)))
+        await asyncio.gather(*tasks)
+
+    def close(self):
+        """Close all connections"""
+        for connection in self.connections:
+            connection.close()
+
+def generate_poll(seed, api=False):
+    """Generate a benchmark poll (import NDJSON shape, or the POST /api/polls body)"""
+    rng = random.Random(seed)
+    now = datetime.datetime.utcnow()
+    start = now - datetime.timedelta(days=rng.randint(0, 60))
+    poll_type = rng.choice(["SINGLE_CHOICE", "MULTIPLE_CHOICE", "RANKED_CHOICE"])
+    options = [f"Option {chr(65 + i)}" for i in range(rng.randint(2, 6))]
+    return {
+        "title": f"Benchmark poll {seed}",
+        "description": "Generated by tools/load_test.py " + "lorem ipsum " * rng.randint(1, 20),
+        "creator": f"addr_test1{seed:020d}",
+        "options": options,
+        "startDate": start.isoformat(),
+        "endDate": (start + datetime.timedelta(days=rng.randint(1, 30))).isoformat(),
+        "type": poll_type,
+        "maxSelections": len(options) if poll_type != "SINGLE_CHOICE" else 1,
+        "status": rng.choice(["ACTIVE", "ACTIVE", "ENDED", "PENDING"]) if not api else "ACTIVE",
+        "network": rng.choice(["mainnet", "testnet"])
+    }
+
+def seed_database(db_manager, polls, votes_per_poll):
+    """Seed the local database through the bulk import path"""
+    from bson import ObjectId
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        polls_file = os.path.join(tmp_dir, "polls.ndjson")
+        votes_file = os.path.join(tmp_dir, "votes.ndjson")
+        with open(polls_file, "w") as pf, open(votes_file, "w") as vf:
+            for i in range(polls):
+                poll = generate_poll(i)
+                poll["_id"] = str(ObjectId())
+                poll["totalVotes"] = votes_per_poll
+                pf.write(json.dumps(poll) + "\n")
+                for j in range(votes_per_poll):
+                    vote = {"pollId": poll["_id"], "voter": f"addr_test1voter{i:08d}{j:08d}",
+                            "network": poll["network"], "type": "Public",
+                            "timestamp": datetime.datetime.utcnow().isoformat()}
+                    if poll["type"] == "SINGLE_CHOICE":
+                        vote["option"] = random.choice(poll["options"])
+                    else:
+                        vote["options"] = random.sample(poll["options"], random.randint(1, len(poll["options"])))
+                    vf.write(json.dumps(vote) + "\n")
+
+        if db_manager.import_documents(polls_file, "polls") is None:
+            return False
+        if votes_per_poll and db_manager.import_documents(votes_file, "votes") is None:
+            return False
+    return True
+
+def load_poll_ids(db_manager):
+    """Load a sample of existing poll IDs for GET /api/polls/:id"""
+    return [str(doc["_id"]) for doc in db_manager.db.polls.find({}, {"_id": 1}).limit(POLL_ID_SAMPLE)]
+
+def build_report(tester, args, elapsed):
+    """Build the JSON report"""
+    closed_loop = not args.rate
+    all_raw = [latency for name in tester.operations for latency in tester.latencies[name]]
+
+    # Closed loop: correct with the requested pacing, or by default the median latency
+    expected_interval = None
+    if closed_loop:
+        if args.expected_interval_ms:
+            expected_interval = args.expected_interval_ms / 1000
+        elif all_raw:
+            expected_interval = sorted(all_raw)[len(all_raw) // 2]
+
+    operations = {}
+    for name in tester.operations:
+        raw = tester.latencies[name]
+        operations[name] = {
+            "requests": len(raw),
+            "errors": tester.errors[name],
+            "status_codes": {str(code): count for code, count in tester.status_codes[name].items()},
+            "latency_ms": summarize(correct_for_omission(raw, expected_interval) if closed_loop else raw)
+        }
+        if closed_loop:
+            operations[name]["uncorrected_latency_ms"] = summarize(raw)
+
+    total = len(all_raw)
+    return {
+        "url": args.url,
+        "mode": "closed" if closed_loop else "open",
+        "concurrency": args.concurrency if closed_loop else None,
+        "target_rate": args.rate,
+        "expected_interval_ms": round(expected_interval * 1000, 3) if expected_interval else None,
+        "mix": args.mix,
+        "duration_s": round(elapsed, 3),
+        "requests": total,
+        "errors": sum(tester.errors.values()),
+        "throughput_rps": round(total / elapsed, 1) if elapsed else 0,
+        "latency_ms": summarize(correct_for_omission(all_raw, expected_interval) if closed_loop else all_raw),
+        "operations": operations,
+        "finished_at": datetime.datetime.utcnow().isoformat() + "Z"
+    }
+
+def run(args):
+    """Seed, warm up, run the load and write the report"""
+    import time
+    mix = parse_mix(args.mix)
+
+    db_manager = DBManager(connect=False)
+    if not db_manager.connect():
+        return False
+    if args.seed_polls and not seed_database(db_manager, args.seed_polls, args.seed_votes):
+        return False
+    poll_ids = load_poll_ids(db_manager)
+    print(f"Loaded {len(poll_ids)} poll IDs for GET /api/polls/:id", file=sys.stderr)
+
+    async def drive(duration):
+        tester = LoadTester(args.url, mix, poll_ids)
+        try:
+            if args.rate:
+                await tester.run_open(args.rate, duration, args.max_in_flight)
+            else:
+                await tester.run_closed(args.concurrency, duration)
+        finally:
+            tester.close()
+        return tester
+
+    if args.warmup:
+        print(f"Warming up for {args.warmup}s...", file=sys.stderr)
+        asyncio.run(drive(args.warmup))
+
+    mode = f"{args.rate} req/s" if args.rate else f"{args.concurrency} connections"
+    print(f"Running {args.mix} at {mode} for {args.duration}s against {args.url}...", file=sys.stderr)
+    started = time.monotonic()
+    tester = asyncio.run(drive(args.duration))
+    report = build_report(tester, args, time.monotonic() - started)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        print(f"{COLORS['GREEN']}✅ Report written to {args.output}{COLORS['ENDC']}", file=sys.stderr)
+    else:
+        print(output)
+
+    latency = report["latency_ms"]
+    if latency.get("count"):
+        print(f"{report['throughput_rps']} req/s, p50 {latency['p50']} ms, p95 {latency['p95']} ms, "
+              f"p99 {latency['p99']} ms, {report['errors']} errors", file=sys.stderr)
+    return report["requests"] > 0
+
+def main(argv=None):
+    """Main CLI entry point"""
+    parser = argparse.ArgumentParser(description="PartiVotes API Load Tester")
+    parser.add_argument("--url", default=DEFAULT_URL, help=f"Server base URL (default: {DEFAULT_URL})")
+    parser.add_argument("--mix", default=DEFAULT_MIX,
+                        help=f"Weighted operations: {', '.join(OPERATIONS)} (default: {DEFAULT_MIX})")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="Seconds to run")
+    parser.add_argument("--warmup", type=float, default=0, help="Seconds of unrecorded warm-up load")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Connections for the closed-loop mode")
+    parser.add_argument("--rate", type=float, help="Fixed arrival rate in requests/sec (open-loop mode)")
+    parser.add_argument("--max-in-flight", type=int, default=DEFAULT_MAX_IN_FLIGHT,
+                        help="Open-loop cap on concurrent requests")
+    parser.add_argument("--expected-interval-ms", type=float,
+                        help="Closed-loop pacing used for coordinated-omission correction (default: median latency)")
+    parser.add_argument("--seed-polls", type=int, default=0, help="Import this many generated polls first")
+    parser.add_argument("--seed-votes", type=int, default=0, help="Generated votes per seeded poll")
+    parser.add_argument("--output", help="Write the JSON report to a file instead of stdout")
+    args = parser.parse_args(argv)
+
+    try:
+        return 0 if run(args) else 1
+    except ValueError as e:
+        print(f"{COLORS['RED']}❌ {e}{COLORS['ENDC']}", file=sys.stderr)
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
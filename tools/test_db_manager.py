@@ -0,0 +1,836 @@
+#!/usr/bin/env python3
+"""
+Regression checks for the PartiVotes Database Manager that run without MongoDB
+
+Run with: python -m unittest discover tools
+"""
+
+import io
+import copy
+import gzip
+import os
+import sys
+import json
+import shutil
+import datetime
+import tempfile
+import time
+import types
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import db_manager
+from bson import BSON, ObjectId, Timestamp
+from pymongo import DeleteOne, ReplaceOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+def write_backup(path, polls, votes=()):
+    """Write a backup file in the create_backup layout"""
+    with open(path, "w") as f:
+        json.dump({"meta": {"order": db_manager.BACKUP_ORDER}, "polls": list(polls), "votes": list(votes)}, f)
+
+class ParserTest(unittest.TestCase):
+    def test_global_options_before_the_command(self):
+        parser = db_manager.build_parser()
+        args = parser.parse_args(["--status", "ACTIVE", "--limit", "3", "list"])
+        self.assertEqual((args.command, args.status, args.limit), ("list", "ACTIVE", 3))
+        args = parser.parse_args(["list", "--status", "ENDED"])
+        self.assertEqual((args.status, args.limit), ("ENDED", 10))
+
+class DiffBackupsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.manager = db_manager.DBManager(connect=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_several_modified_documents(self):
+        polls = [{"_id": "%024x" % i, "title": f"Poll {i}", "totalVotes": i} for i in range(1, 4)]
+        changed = [dict(poll, totalVotes=poll["totalVotes"] + 10) for poll in polls]
+        old_file = os.path.join(self.tmp_dir, "old.json")
+        new_file = os.path.join(self.tmp_dir, "new.json")
+        write_backup(old_file, polls)
+        write_backup(new_file, changed)
+
+        summary = self.manager.diff_backups(old_file, new_file, os.path.join(self.tmp_dir, "diff.ndjson"))
+
+        self.assertIsNotNone(summary)
+        self.assertEqual(summary["polls"]["modified"], 3)
+        self.assertEqual(summary["polls"]["unchanged"], 0)
+
+class ImportValidationTest(unittest.TestCase):
+    def vote(self, **fields):
+        return dict({"pollId": "%024x" % 1, "voter": "addr1", "option": "Yes"}, **fields)
+
+    def test_valid_vote(self):
+        documents, _, rejected, _ = db_manager._parse_import_chunk("votes", "ndjson", [(1, json.dumps(self.vote()))])
+        self.assertEqual(len(documents), 1)
+        self.assertEqual(rejected, [])
+
+    def test_drops_unknown_fields(self):
+        dropped = {}
+        doc = db_manager.validate_vote(self.vote(isAdmin=True), dropped)
+        self.assertNotIn("isAdmin", doc)
+        self.assertEqual(dropped, {"isAdmin": 1})
+
+    def test_imports_polls_from_the_repo_backup(self):
+        backup_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backups",
+                                   "partivotes_backup_20250331_163044.json")
+        with open(backup_file) as f:
+            polls = json.load(f)["polls"]
+        chunk = [(n, json.dumps(poll)) for n, poll in enumerate(polls, 1)]
+        documents, _, rejected, dropped = db_manager._parse_import_chunk("polls", "ndjson", chunk)
+        self.assertEqual((len(documents), rejected), (len(polls), []))
+        self.assertEqual(sorted(dropped), ["endTime", "startTime", "votes"])
+
+    def test_dates_are_utc_aware(self):
+        doc = db_manager.validate_poll({"title": "T", "description": "D", "creator": "c", "options": "A;B",
+                                        "startDate": "2025-04-01T00:00:00", "endDate": 1743465600000,
+                                        "type": "SINGLE_CHOICE"})
+        for field in ("startDate", "endDate", "createdAt", "updatedAt"):
+            self.assertEqual(doc[field].utcoffset(), datetime.timedelta(0))
+
+    def test_rejects_non_string_fields(self):
+        for field, value in (("voter", {"$ne": None}), ("option", 1), ("txId", ["a"])):
+            with self.assertRaisesRegex(ValueError, field):
+                db_manager.validate_vote(self.vote(**{field: value}))
+
+    def test_csv_row_with_extra_column_is_rejected(self):
+        row = self.vote()
+        row[None] = ["extra"]
+        documents, _, rejected, _ = db_manager._parse_import_chunk("votes", "csv", [(2, row)])
+        self.assertEqual(documents, [])
+        self.assertEqual([record["line"] for record in rejected], [2])
+
+def matches(doc, query):
+    """Evaluate the subset of MongoDB query syntax the manager uses"""
+    for field, condition in (query or {}).items():
+        if field == "$or":
+            if not any(matches(doc, branch) for branch in condition):
+                return False
+            continue
+        value = doc.get(field)
+        if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+            for op, operand in condition.items():
+                if op == "$exists":
+                    if (field in doc) != bool(operand):
+                        return False
+                elif op == "$in":
+                    if value not in operand:
+                        return False
+                elif op == "$type":
+                    if not isinstance(value, {"string": str, "date": datetime.datetime}[operand]):
+                        return False
+                elif op == "$ne":
+                    if value == operand:
+                        return False
+                elif value is None:
+                    return False
+                elif not {"$gt": value > operand, "$gte": value >= operand,
+                          "$lt": value < operand, "$lte": value <= operand}[op]:
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+def sort_key(value):
+    # None sorts first, as in MongoDB
+    return (value is not None, value)
+
+class FakeCursor(list):
+    def sort(self, key, direction=1):
+        keys = key if isinstance(key, list) else [(key, direction)]
+        documents = list(self)
+        for field, field_direction in reversed(keys):
+            documents.sort(key=lambda doc: sort_key(doc.get(field)), reverse=field_direction < 0)
+        return FakeCursor(documents)
+
+    def limit(self, count):
+        return FakeCursor(self[:count]) if count else self
+
+    def batch_size(self, size):
+        return self
+
+    def close(self):
+        pass
+
+class FakeCollection:
+    """Just enough of a pymongo collection for the code paths under test
+    
+    aggregate() applies a leading $match and hands the matching documents and the
+    pipeline to `aggregate_handler`, which the test provides.
+    """
+    def __init__(self, documents=(), database=None, name=None):
+        self.documents = list(documents)
+        self.database = database
+        self.name = name
+        self.batches = []
+        self.indexes = {}
+        self.aggregate_handler = None
+
+    def find(self, query=None, projection=None, **kwargs):
+        return FakeCursor(copy.deepcopy(doc) for doc in self.documents if matches(doc, query))
+
+    def find_one(self, query=None, projection=None, sort=None):
+        cursor = self.find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        return cursor[0] if cursor else None
+
+    def aggregate(self, pipeline, **kwargs):
+        documents = self.documents
+        if pipeline and "$match" in pipeline[0]:
+            documents = [doc for doc in documents if matches(doc, pipeline[0]["$match"])]
+        return list(self.aggregate_handler(documents, pipeline)) if self.aggregate_handler else []
+
+    def count_documents(self, query):
+        return len(self.find(query))
+
+    def estimated_document_count(self):
+        return len(self.documents)
+
+    def insert_one(self, document):
+        self.insert_many([document])
+
+    def insert_many(self, documents, ordered=True):
+        documents = list(documents)
+        self.batches.append(len(documents))
+        for document in documents:
+            document.setdefault("_id", ObjectId())
+            if any(doc["_id"] == document["_id"] for doc in self.documents):
+                raise DuplicateKeyError("E11000 duplicate key")
+            self.documents.append(copy.deepcopy(document))
+        return types.SimpleNamespace(inserted_ids=[document["_id"] for document in documents])
+
+    def replace_one(self, query, document, upsert=False):
+        matched = self.count_documents(query)
+        if matched or upsert:
+            self.delete_many(query)
+            self.documents.append(copy.deepcopy(dict(document, _id=query.get("_id", document.get("_id")))))
+        return types.SimpleNamespace(matched_count=min(matched, 1), modified_count=min(matched, 1))
+
+    def update_one(self, query, update, upsert=False):
+        document = next((doc for doc in self.documents if matches(doc, query)), None)
+        if document is None:
+            if not upsert:
+                return types.SimpleNamespace(matched_count=0, modified_count=0)
+            if "_id" in query and any(doc["_id"] == query["_id"] for doc in self.documents):
+                raise DuplicateKeyError("E11000 duplicate key")
+            document = {field: value for field, value in query.items() if not isinstance(value, dict) or field == "_id"}
+            document.update(update.get("$setOnInsert", {}))
+            self.documents.append(document)
+        document.update(copy.deepcopy(update.get("$set", {})))
+        for field, count in update.get("$inc", {}).items():
+            document[field] = document.get(field, 0) + count
+        for field in update.get("$unset", {}):
+            document.pop(field, None)
+        return types.SimpleNamespace(matched_count=1, modified_count=1)
+
+    def update_many(self, query, update):
+        for document in [doc for doc in self.documents if matches(doc, query)]:
+            self.update_one({"_id": document["_id"]}, update)
+
+    def bulk_write(self, operations, ordered=True):
+        errors, matched = [], 0
+        for index, operation in enumerate(operations):
+            try:
+                if isinstance(operation, DeleteOne):
+                    self.delete_many(operation._filter)
+                elif isinstance(operation, ReplaceOne):
+                    matched += self.replace_one(operation._filter, operation._doc, operation._upsert).matched_count
+                else:
+                    matched += self.update_one(operation._filter, operation._doc, operation._upsert).matched_count
+            except DuplicateKeyError as e:
+                errors.append({"index": index, "code": 11000, "errmsg": str(e)})
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": 0})
+        return types.SimpleNamespace(matched_count=matched, modified_count=matched)
+
+    def delete_many(self, query):
+        self.documents = [doc for doc in self.documents if not matches(doc, query)]
+
+    def create_index(self, keys, name=None, **kwargs):
+        keys = [(keys, 1)] if isinstance(keys, str) else list(keys)
+        name = name or "_".join(f"{field}_{direction}" for field, direction in keys)
+        self.indexes[name] = dict(kwargs, key=keys)
+        return name
+
+    def index_information(self):
+        return dict({"_id_": {"key": [("_id", 1)]}}, **copy.deepcopy(self.indexes))
+
+    def drop(self):
+        self.documents, self.indexes, self.batches = [], {}, []
+
+    def rename(self, new_name, dropTarget=False):
+        if not dropTarget and self.database.__dict__.get(new_name, FakeCollection()).documents:
+            raise ValueError(f"target namespace exists: {new_name}")
+        target = self.database.collection(new_name, self.documents)
+        target.indexes, target.batches = self.indexes, self.batches
+        self.drop()
+
+class FakeDB:
+    def __init__(self, polls=(), votes=()):
+        self.collection("polls", polls)
+        self.collection("votes", votes)
+
+    def collection(self, name, documents=()):
+        collection = FakeCollection(documents, self, name)
+        setattr(self, name, collection)
+        return collection
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return self.collection(name)
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+def object_id_at(moment, serial):
+    """An ObjectId whose embedded time is `moment`, made unique by `serial`"""
+    return ObjectId(ObjectId.from_datetime(moment).binary[:4] + serial.to_bytes(8, "big"))
+
+def group_vote_rollups(votes, pipeline):
+    """The hourly (poll, hour, selection, network) counts the rollup pipeline produces"""
+    counts = {}
+    for vote in votes:
+        hour = vote["timestamp"].replace(minute=0, second=0, microsecond=0, tzinfo=None)
+        selections = vote.get("options") or ([vote["option"]] if vote.get("option") else [])
+        for selection in [None] + selections:
+            key = (vote["pollId"], hour, selection, vote.get("network", "mainnet"))
+            counts[key] = counts.get(key, 0) + 1
+    for (poll_id, hour, selection, network), count in counts.items():
+        yield {"_id": {"p": poll_id, "t": hour, "o": selection, "n": network}, "count": count}
+
+class RollupsTest(unittest.TestCase):
+    def setUp(self):
+        self.manager = db_manager.DBManager(connect=False)
+        self.manager.db = FakeDB()
+        self.manager.db.votes.aggregate_handler = group_vote_rollups
+        self.poll_id = ObjectId()
+        self.serial = 0
+
+    def add_votes(self, count, minutes_ago):
+        moment = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(minutes=minutes_ago)
+        for _ in range(count):
+            self.serial += 1
+            self.manager.db.votes.documents.append({"_id": object_id_at(moment, self.serial), "pollId": self.poll_id,
+                                                    "option": "Yes", "timestamp": moment})
+
+    def ballots(self):
+        return sum(row["count"] for row in self.manager.db.vote_rollups.documents
+                   if row["granularity"] == "day" and row["option"] is None)
+
+    def test_incremental_runs(self):
+        self.add_votes(3, minutes_ago=30)
+        self.assertEqual(self.manager.update_rollups(), 3)
+        self.add_votes(2, minutes_ago=20)
+        self.assertEqual(self.manager.update_rollups(), 2)
+        self.assertEqual(self.manager.update_rollups(), 0)
+        self.assertEqual(self.ballots(), 5)
+
+    def test_votes_inside_the_safety_lag_wait(self):
+        self.add_votes(2, minutes_ago=0)
+        self.manager.update_rollups()
+        self.assertEqual(self.ballots(), 0)
+
+    def test_rerun_after_crash_with_new_votes(self):
+        self.add_votes(3, minutes_ago=30)
+        state = self.manager.db.rollup_state
+        update_state = state.update_one
+
+        def crash_before_watermark(query, update, upsert=False):
+            if "watermark" in update.get("$set", {}):
+                raise RuntimeError("killed")
+            update_state(query, update, upsert)
+
+        # Rows are written, but the run dies before the watermark is advanced
+        state.update_one = crash_before_watermark
+        self.assertIsNone(self.manager.update_rollups())
+        state.update_one = update_state
+        self.assertEqual(self.ballots(), 3)
+
+        self.add_votes(2, minutes_ago=20)
+        self.manager.update_rollups()
+        self.assertEqual(self.ballots(), 5)
+        self.assertNotIn("pendingUpper", state.find_one({"_id": "vote_rollups"}))
+
+    def test_core_returns_a_result_without_printing(self):
+        self.add_votes(3, minutes_ago=30)
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            result = self.manager.rollup()
+        self.assertEqual(stdout.getvalue(), "")
+        self.assertIsInstance(result, db_manager.RollupResult)
+        self.assertTrue(result.ok)
+        self.assertEqual(result.counts["votes"], 3)
+        self.assertFalse(result.resumed)
+
+def scan_pipeline_rows(votes, pipeline):
+    """What the two scan_duplicates pipelines return: sorted ballots or (poll, prefix, time) rows"""
+    votes = [vote for vote in votes if isinstance(vote.get("voter"), str)]
+    project = next(stage["$project"] for stage in pipeline if "$project" in stage)
+    if "prefix" not in project:
+        return sorted(votes, key=lambda vote: (vote["pollId"], vote["voter"]))
+    prefix_length = project["prefix"]["$substrCP"][2]
+    rows = [{"_id": vote["_id"], "pollId": vote["pollId"], "prefix": vote["voter"][:prefix_length],
+             "time": vote["timestamp"]} for vote in votes]
+    return sorted(rows, key=lambda row: (row["pollId"], row["prefix"], row["time"]))
+
+class ScanDuplicatesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.manager = db_manager.DBManager(connect=False)
+        self.manager.db = FakeDB()
+        self.manager.db.votes.aggregate_handler = scan_pipeline_rows
+        self.poll_id = ObjectId()
+        self.start = datetime.datetime(2025, 4, 1, 12, 0)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def add_vote(self, voter, seconds):
+        self.manager.db.votes.documents.append({"_id": ObjectId(), "pollId": self.poll_id, "voter": voter,
+                                                "option": "Yes",
+                                                "timestamp": self.start + datetime.timedelta(seconds=seconds)})
+
+    def scan(self, **kwargs):
+        with mock.patch.object(db_manager, "EXPORT_DIR", self.tmp_dir):
+            stats = self.manager.scan_duplicates(**kwargs)
+        report_file = next(os.path.join(self.tmp_dir, name) for name in os.listdir(self.tmp_dir))
+        with open(report_file) as f:
+            return stats, [json.loads(line) for line in f]
+
+    def test_duplicates_and_one_burst(self):
+        # Load-test style voters all share one 10-character prefix
+        for i in range(30):
+            self.add_vote(f"addr_test1voter{i:06d}", seconds=60 * i)
+        for i in range(6):
+            self.add_vote(f"addr_test1voter{100 + i:06d}", seconds=5000 + i)
+        self.add_vote("addr_test1voter000003", seconds=7000)
+
+        stats, records = self.scan(window_seconds=10, threshold=5)
+
+        self.assertEqual(stats["votes"], 37)
+        self.assertEqual((stats["duplicate_groups"], stats["duplicate_votes"]), (1, 1))
+        bursts = [record for record in records if record["kind"] == "burst"]
+        self.assertEqual(len(bursts), 1)
+        self.assertEqual((bursts[0]["prefix"], bursts[0]["count"]), ("addr_test1", 6))
+
+    def test_spread_out_votes_are_not_a_burst(self):
+        for i in range(50):
+            self.add_vote(f"addr_test1voter{i:06d}", seconds=3 * i)
+        stats, _ = self.scan(window_seconds=10, threshold=5)
+        self.assertEqual(stats["bursts"], 0)
+
+def count_selections(votes, pipeline):
+    """What the migration's per-batch aggregation returns: ballots (o=None) and selections per poll"""
+    counts = {}
+    for vote in votes:
+        selections = vote.get("options") or ([vote["option"]] if vote.get("option") else [])
+        for selection in [None] + selections:
+            counts[vote["pollId"], selection] = counts.get((vote["pollId"], selection), 0) + 1
+    for (poll_id, selection), count in counts.items():
+        yield {"_id": {"p": poll_id, "o": selection}, "count": count}
+
+class MigrationTest(unittest.TestCase):
+    def setUp(self):
+        self.manager = db_manager.DBManager(connect=False)
+        self.polls = [{"_id": ObjectId(), "title": f"Poll {i}", "status": "ACTIVE", "options": ["Yes", "No"]}
+                      for i in range(5)]
+        votes = [{"_id": ObjectId(), "pollId": poll["_id"], "option": "Yes"} for poll in self.polls]
+        self.manager.db = FakeDB(self.polls, votes)
+        self.manager.db.votes.aggregate_handler = count_selections
+
+    def migrate(self, **kwargs):
+        return self.manager.migrate(batch_size=2, pause_ms=0, **kwargs)
+
+    def test_resumes_after_the_last_checkpoint(self):
+        polls = self.manager.db.polls
+        bulk_write = polls.bulk_write
+        writes = []
+
+        def crash_on_second_batch(operations, ordered=True):
+            writes.append(len(operations))
+            if len(writes) == 2:
+                raise RuntimeError("killed")
+            return bulk_write(operations, ordered)
+
+        polls.bulk_write = crash_on_second_batch
+        self.assertFalse(self.migrate())
+        polls.bulk_write = bulk_write
+
+        result = self.migrate()
+        self.assertTrue(result.ok)
+        self.assertEqual(result.resumed_after, self.polls[1]["_id"])
+        self.assertEqual(result.counts, {"scanned": 3, "updated": 3, "conflicts": 0})
+        for poll in polls.documents:
+            self.assertEqual(poll["options"], [{"text": "Yes", "votes": 1}, {"text": "No", "votes": 0}])
+            self.assertEqual(poll["totalVotes"], 1)
+
+        self.assertEqual(self.migrate().counts["scanned"], 0)
+        self.assertEqual(self.migrate(restart=True).counts, {"scanned": 5, "updated": 0, "conflicts": 0})
+
+    def test_dry_run_writes_nothing(self):
+        result = self.migrate(dry_run=True)
+        self.assertEqual(result.counts["updated"], 5)
+        self.assertEqual(len(result.samples), 5)
+        self.assertEqual([poll["options"] for poll in self.manager.db.polls.documents], [["Yes", "No"]] * 5)
+        self.assertEqual(self.manager.db.migration_state.documents, [])
+
+    def test_concurrent_option_change_is_a_conflict(self):
+        polls = self.manager.db.polls
+        bulk_write = polls.bulk_write
+
+        def api_write_first(operations, ordered=True):
+            polls.documents[0]["options"] = ["Yes", "No", "Maybe"]
+            return bulk_write(operations, ordered)
+
+        polls.bulk_write = api_write_first
+        result = self.migrate()
+        self.assertEqual(result.counts["conflicts"], 1)
+        self.assertEqual(polls.documents[0]["options"], ["Yes", "No", "Maybe"])
+        self.assertTrue(result.warnings)
+
+class SqliteExportTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.manager = db_manager.DBManager(connect=False)
+        self.manager.db = FakeDB()
+        self.now = datetime.datetime.now(datetime.timezone.utc)
+        self.serial = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def add_poll(self, title, **fields):
+        poll = dict({"_id": ObjectId(), "title": title, "options": [{"text": "Yes", "votes": 0}]}, **fields)
+        self.manager.db.polls.documents.append(poll)
+        return poll
+
+    def add_vote(self, poll, seconds_ago):
+        self.serial += 1
+        moment = self.now - datetime.timedelta(seconds=seconds_ago)
+        self.manager.db.votes.documents.append({"_id": object_id_at(moment, self.serial), "pollId": poll["_id"],
+                                                "option": "Yes", "timestamp": moment})
+
+    def export(self, refresh):
+        with mock.patch.object(db_manager, "EXPORT_DIR", self.tmp_dir), \
+             mock.patch("sys.stdout", new_callable=io.StringIO):
+            output_file = self.manager.export_to_sqlite(refresh=refresh)
+        import sqlite3
+        conn = sqlite3.connect(output_file)
+        try:
+            polls = dict(conn.execute("SELECT id, title FROM polls"))
+            votes = [row[0] for row in conn.execute("SELECT id FROM votes ORDER BY id")]
+        finally:
+            conn.close()
+        return polls, votes
+
+    def test_refresh_appends_votes_past_the_watermark_and_the_lag(self):
+        old = datetime.datetime.utcnow() - datetime.timedelta(days=1)
+        poll = self.add_poll("Before", updatedAt=old)
+        unchanged = self.add_poll("Unchanged", updatedAt=old)
+        for seconds_ago in (600, 590, 580, 30):
+            self.add_vote(poll, seconds_ago)
+        votes = [str(vote["_id"]) for vote in self.manager.db.votes.documents]
+
+        polls, exported = self.export(refresh=False)
+        self.assertEqual(exported, votes[:3])
+        self.assertEqual(polls, {str(poll["_id"]): "Before", str(unchanged["_id"]): "Unchanged"})
+
+        poll.update(title="After", updatedAt=datetime.datetime.utcnow())
+        new_poll = self.add_poll("New")
+        self.add_vote(poll, 300)
+        votes = sorted(str(vote["_id"]) for vote in self.manager.db.votes.documents)
+
+        polls, exported = self.export(refresh=True)
+        self.assertEqual(polls[str(poll["_id"])], "After")
+        self.assertEqual(polls[str(new_poll["_id"])], "New")
+        # The newest vote is still inside the safety lag
+        self.assertEqual(exported, votes[:4])
+
+        with mock.patch.object(db_manager, "ROLLUP_SAFETY_LAG_SECONDS", 0):
+            polls, exported = self.export(refresh=True)
+        self.assertEqual(exported, votes)
+        self.assertEqual(len(polls), 3)
+
+class BackupCatalogTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.catalog_file = os.path.join(self.tmp_dir, "catalog.json")
+        patches = [mock.patch.object(db_manager, "BACKUP_DIR", self.tmp_dir),
+                   mock.patch.object(db_manager, "BACKUP_CATALOG", self.catalog_file)]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.manager = db_manager.DBManager(connect=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_listing_legacy_backups_does_not_write_the_catalog(self):
+        write_backup(os.path.join(self.tmp_dir, "partivotes_backup_20250331_163044.json"), [])
+        write_backup(os.path.join(self.tmp_dir, "partivotes_backup_before_migration.json"), [])
+
+        self.assertEqual(self.manager.list_backups(), ["partivotes_backup_20250331_163044.json"])
+        self.assertFalse(os.path.exists(self.catalog_file))
+
+class PublishSnapshotsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.manager = db_manager.DBManager(connect=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_full_run_removes_deleted_polls(self):
+        now = datetime.datetime(2025, 4, 1)
+        polls = [{"_id": "%024x" % i, "title": f"Poll {i}", "status": "ACTIVE", "type": "SINGLE_CHOICE",
+                  "options": [{"text": "Yes", "votes": 0}], "updatedAt": now} for i in range(1, 3)]
+        self.manager.db = FakeDB(polls)
+        self.manager.publish_snapshots(self.tmp_dir)
+
+        self.manager.db = FakeDB(polls[:1])
+        result = self.manager.publish_snapshots(self.tmp_dir, full=True)
+
+        self.assertEqual(result["removed"], 1)
+        polls_dir = os.path.join(self.tmp_dir, "polls")
+        self.assertFalse(os.path.exists(os.path.join(polls_dir, polls[1]["_id"] + ".json")))
+        self.assertFalse(os.path.exists(os.path.join(polls_dir, polls[1]["_id"] + ".json.gz")))
+        with open(os.path.join(polls_dir, "index.json")) as f:
+            self.assertEqual([poll["_id"] for poll in json.load(f)], [polls[0]["_id"]])
+
+class FakeS3:
+    def __init__(self, data):
+        self.data = data
+
+    def head_object(self, Bucket, Key):
+        return {"ContentLength": len(self.data)}
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.data)}
+
+class RestoreBackupTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.manager = db_manager.DBManager(connect=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_s3_restore_streams_in_batches(self):
+        polls = [{"_id": "%024x" % i, "title": f"Poll {i}"} for i in range(1, 4)]
+        votes = [{"_id": "%024x" % (100 + i), "pollId": "%024x" % 1, "voter": f"addr{i}"} for i in range(5)]
+        backup_file = os.path.join(self.tmp_dir, "backup.json")
+        write_backup(backup_file, polls, votes)
+        with open(backup_file, "rb") as f:
+            s3 = FakeS3(f.read())
+        self.manager.db = FakeDB()
+        self.manager._offsite_client = lambda: s3
+
+        with mock.patch.object(db_manager, "RESTORE_BATCH_SIZE", 2):
+            self.assertTrue(self.manager.restore_backup("s3://bucket/backup.json", force=True))
+
+        self.assertEqual(len(self.manager.db.polls.documents), 3)
+        self.assertEqual(len(self.manager.db.votes.documents), 5)
+        self.assertEqual(self.manager.db.votes.batches, [2, 2, 1])
+
+    def live_db(self):
+        poll_id = ObjectId()
+        db = FakeDB([{"_id": poll_id, "title": "Live"}], [{"_id": ObjectId(), "pollId": poll_id, "voter": "live"}])
+        db.votes.create_index([("pollId", 1), ("_id", 1)])
+        return db
+
+    def restore(self, backup_file):
+        """Restore with the backup directory (and so the safety backup and catalog) in tmp_dir"""
+        with mock.patch.object(db_manager, "BACKUP_DIR", self.tmp_dir), \
+             mock.patch.object(db_manager, "BACKUP_CATALOG", os.path.join(self.tmp_dir, "catalog.json")), \
+             mock.patch("sys.stdout", new_callable=io.StringIO):
+            return self.manager.restore_backup(backup_file, force=True)
+
+    def test_truncated_backup_leaves_the_live_data(self):
+        polls = [{"_id": "%024x" % i, "title": f"Poll {i}"} for i in range(1, 4)]
+        votes = [{"_id": "%024x" % (100 + i), "pollId": "%024x" % 1, "voter": f"addr{i}"} for i in range(5)]
+        backup_file = os.path.join(self.tmp_dir, "backup.json")
+        write_backup(backup_file, polls, votes)
+        with open(backup_file, "rb") as f:
+            s3 = FakeS3(f.read()[:-40])
+        self.manager._offsite_client = lambda: s3
+        self.manager.db = live = self.live_db()
+        live_polls, live_votes = copy.deepcopy(live.polls.documents), copy.deepcopy(live.votes.documents)
+
+        with mock.patch.object(db_manager, "RESTORE_BATCH_SIZE", 2):
+            self.assertFalse(self.restore("s3://bucket/backup.json"))
+
+        self.assertEqual(self.manager.db.polls.documents, live_polls)
+        self.assertEqual(self.manager.db.votes.documents, live_votes)
+        self.assertEqual(self.manager.db.polls_restore.documents + self.manager.db.votes_restore.documents, [])
+        self.assertEqual(os.listdir(self.tmp_dir), ["backup.json"])
+
+    def test_checksum_mismatch_leaves_the_live_data(self):
+        backup_file = os.path.join(self.tmp_dir, "partivotes_backup_20250101_000000.json")
+        write_backup(backup_file, [{"_id": "%024x" % 1, "title": "Poll"}])
+        with open(os.path.join(self.tmp_dir, "catalog.json"), "w") as f:
+            json.dump([{"file": os.path.basename(backup_file), "createdAt": "2025-01-01T00:00:00", "kind": "full",
+                        "codec": "json", "polls": 1, "votes": 0, "size": os.path.getsize(backup_file),
+                        "checksum": "sha256:" + "0" * 64, "indexed": False, "offsite": None}], f)
+        self.manager.db = self.live_db()
+
+        self.assertFalse(self.restore(backup_file))
+        self.assertEqual([poll["title"] for poll in self.manager.db.polls.documents], ["Live"])
+
+    def test_local_restore_converts_types_and_keeps_indexes(self):
+        polls = [{"_id": "%024x" % 1, "title": "Poll", "startDate": "2025-03-31T15:37:48.591000",
+                  "endDate": "2025-04-30T00:00:00+00:00"}]
+        votes = [{"_id": "%024x" % 100, "pollId": "%024x" % 1, "voter": "addr", "timestamp": "2025-04-01T12:00:00"}]
+        backup_file = os.path.join(self.tmp_dir, "backup.json")
+        write_backup(backup_file, polls, votes)
+        self.manager.db = self.live_db()
+
+        self.assertTrue(self.restore(backup_file))
+
+        poll, = self.manager.db.polls.documents
+        vote, = self.manager.db.votes.documents
+        self.assertEqual(poll["_id"], ObjectId("%024x" % 1))
+        self.assertEqual(poll["startDate"], datetime.datetime(2025, 3, 31, 15, 37, 48, 591000, datetime.timezone.utc))
+        self.assertEqual(poll["endDate"].utcoffset(), datetime.timedelta(0))
+        self.assertEqual((vote["pollId"], vote["timestamp"].hour), (poll["_id"], 12))
+        self.assertIn("pollId_1__id_1", self.manager.db.votes.index_information())
+        self.assertEqual(self.manager.db.polls_restore.documents, [])
+
+class FakeChangeStream:
+    """A change stream that returns the given events, then dies once they run out"""
+    def __init__(self, events):
+        self.events = list(events)
+        self.resume_token = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    @property
+    def alive(self):
+        return bool(self.events)
+
+    def try_next(self):
+        if not self.events:
+            return None
+        event = self.events.pop(0)
+        self.resume_token = {"_data": "%08x" % event["clusterTime"].time}
+        return event
+
+class TailBackupTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        tail_dir = os.path.join(self.tmp_dir, "tail")
+        for name, value in (("BACKUP_DIR", self.tmp_dir), ("TAIL_DIR", tail_dir),
+                            ("TAIL_STATE_FILE", os.path.join(tail_dir, "state.json")), ("TAIL_FLUSH_SECONDS", 0.01)):
+            patcher = mock.patch.object(db_manager, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.manager = db_manager.DBManager(connect=False)
+        self.poll = {"_id": ObjectId(), "title": "Base"}
+        self.votes = [{"_id": ObjectId(), "pollId": self.poll["_id"], "voter": f"addr{i}"} for i in range(3)]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def change(self, time, op, coll, doc):
+        return {"clusterTime": Timestamp(time, 1), "operationType": op, "ns": {"coll": coll},
+                "documentKey": {"_id": doc["_id"]}, "fullDocument": None if op == "delete" else doc}
+
+    def tail(self, events):
+        """Run tail-backup over a fake change stream opened at cluster time 100"""
+        self.manager.db = FakeDB([self.poll])
+        self.manager.db.command = lambda name: {"operationTime": Timestamp(100, 0)}
+        self.manager.db.watch = lambda **options: FakeChangeStream(events)
+        with mock.patch("signal.signal"), mock.patch("sys.stdout", new_callable=io.StringIO):
+            self.assertTrue(self.manager.tail_backup(batch_size=2, segment_max_bytes=1))
+        base, = self.manager._read_tail_state()["bases"]
+        return base["file"]
+
+    def replay(self, base_file, until=None):
+        self.manager.db = FakeDB()
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            self.assertTrue(self.manager.replay_tail(base_file, until, force=True))
+        return stdout.getvalue()
+
+    def test_replay_up_to_a_point_in_time(self):
+        events = [self.change(99, "insert", "votes", self.votes[0]),
+                  self.change(101, "insert", "votes", self.votes[1]),
+                  self.change(102, "update", "polls", dict(self.poll, title="Edited")),
+                  self.change(103, "insert", "votes", self.votes[2]),
+                  self.change(104, "delete", "votes", self.votes[1])]
+        base_file = self.tail(events)
+        self.assertEqual(len([f for f in os.listdir(db_manager.TAIL_DIR) if f.startswith("segment_")]), 3)
+        self.assertIsNotNone(self.manager._read_tail_state()["resume_token"])
+
+        self.replay(base_file, until=datetime.datetime.fromtimestamp(103, datetime.timezone.utc))
+        self.assertEqual([poll["title"] for poll in self.manager.db.polls.documents], ["Edited"])
+        self.assertEqual([vote["voter"] for vote in self.manager.db.votes.documents], ["addr1", "addr2"])
+
+        self.replay(base_file)
+        self.assertEqual([vote["voter"] for vote in self.manager.db.votes.documents], ["addr2"])
+
+    def test_truncated_segment_replays_up_to_the_damage(self):
+        base_file = self.tail([self.change(101, "insert", "votes", self.votes[1])])
+        segment = os.path.join(db_manager.TAIL_DIR, "segment_99999999_000000_000000.bson.gz")
+        with open(segment, "wb") as f:
+            member = gzip.compress(BSON.encode({"ct": Timestamp(102, 1), "op": "insert", "coll": "votes",
+                                                "key": self.votes[2]["_id"], "doc": self.votes[2]}))
+            f.write(member[:len(member) // 2])
+
+        output = self.replay(base_file)
+        self.assertIn("is truncated", output)
+        self.assertEqual([vote["voter"] for vote in self.manager.db.votes.documents], ["addr1"])
+
+class RunScriptTest(unittest.TestCase):
+    def test_file_writing_steps_run_alone(self):
+        class Manager(db_manager.DBManager):
+            running = 0
+            overlapped = False
+
+            def diff_backups(self, backup_a, backup_b, output_file=None):
+                Manager.running += 1
+                Manager.overlapped = Manager.overlapped or Manager.running > 1
+                time.sleep(0.05)
+                Manager.running -= 1
+                return {}
+
+        parser = db_manager.build_parser()
+        steps = [(n, "diff-backups a b", parser.parse_args(["diff-backups", "a", "b"])) for n in range(1, 4)]
+        reports = db_manager.run_script(Manager(connect=False), steps, concurrency=4)
+
+        self.assertTrue(all(report["ok"] for report in reports))
+        self.assertFalse(Manager.overlapped)
+
+    def test_prompting_steps_need_force_when_concurrent(self):
+        class Manager(db_manager.DBManager):
+            def delete_all_polls(self, force=False):
+                return force
+
+        manager = Manager(connect=False)
+        manager.client = mock.Mock()
+        parser = db_manager.build_parser()
+        steps = [(1, "delete-all", parser.parse_args(["delete-all"]))]
+        with mock.patch("sys.stdout", new_callable=io.StringIO), mock.patch("builtins.input") as prompt:
+            self.assertIsNone(db_manager.run_script(manager, steps, concurrency=2))
+        prompt.assert_not_called()
+
+        steps = [(1, "delete-all --force", parser.parse_args(["delete-all", "--force"]))]
+        with mock.patch("sys.stdout", new_callable=io.StringIO):
+            reports = db_manager.run_script(manager, steps, concurrency=2)
+        self.assertTrue(reports[0]["ok"])
+
+    def test_tail_backup_cannot_run_inside_a_script(self):
+        with mock.patch("sys.stdin", io.StringIO("health\ntail-backup\n")):
+            with self.assertRaisesRegex(ValueError, "line 2: tail-backup cannot run inside a script"):
+                db_manager.load_script("-")
+
+if __name__ == "__main__":
+    unittest.main()